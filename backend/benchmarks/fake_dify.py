@@ -0,0 +1,123 @@
+# backend/benchmarks/fake_dify.py
+"""
+Local stand-in for Dify's /v1/chat-messages, for benchmarks and offline development.
+
+Answers every query with the same JSON-in-markdown shape the real app produces, in
+blocking or streaming mode. Latency is modelled as a time to first token plus a fixed
+delay per streamed chunk, each with uniform jitter.
+
+Run standalone from the backend folder:
+    python -m benchmarks.fake_dify --port 5001 --first-token-ms 300 --jitter-ms 50
+"""
+import json
+import uuid
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_ANSWER = (
+    "Để thoa kem nền cho da dầu, bạn nên dùng kem lót kiềm dầu trước, "
+    "sau đó tán kem nền mỏng bằng mút ẩm và khoá lại bằng phấn phủ dạng bột."
+)
+
+
+@dataclass
+class FakeDifyConfig:
+    first_token_ms: float = 300.0
+    chunk_ms: float = 20.0
+    jitter_ms: float = 0.0
+    chunk_chars: int = 8
+    answer: str = DEFAULT_ANSWER
+    answer_type: str = "qa"
+    error_rate: float = 0.0
+
+
+def _delay(ms: float, jitter_ms: float) -> float:
+    return max(0.0, ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+
+
+def _answer_json(config: FakeDifyConfig) -> str:
+    body = json.dumps({"response": config.answer, "type": config.answer_type}, ensure_ascii=False)
+    return f"```json\n{body}\n```"
+
+
+def create_app(config: FakeDifyConfig) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat-messages")
+    async def chat_messages(request: Request):
+        payload = await request.json()
+        conversation_id = payload.get("conversation_id") or str(uuid.uuid4())
+        message_id = str(uuid.uuid4())
+        answer = _answer_json(config)
+
+        if config.error_rate and random.random() < config.error_rate:
+            await asyncio.sleep(_delay(config.first_token_ms, config.jitter_ms))
+            return JSONResponse({"code": "internal_error", "message": "fake upstream failure"}, status_code=500)
+
+        if payload.get("response_mode") != "streaming":
+            chunks = max(1, len(answer) // config.chunk_chars)
+            await asyncio.sleep(
+                _delay(config.first_token_ms, config.jitter_ms) + chunks * _delay(config.chunk_ms, 0)
+            )
+            return {
+                "event": "message",
+                "message_id": message_id,
+                "conversation_id": conversation_id,
+                "answer": answer,
+            }
+
+        async def events():
+            await asyncio.sleep(_delay(config.first_token_ms, config.jitter_ms))
+            for i in range(0, len(answer), config.chunk_chars):
+                if i:
+                    await asyncio.sleep(_delay(config.chunk_ms, config.jitter_ms))
+                event = {
+                    "event": "message",
+                    "message_id": message_id,
+                    "conversation_id": conversation_id,
+                    "answer": answer[i:i + config.chunk_chars],
+                }
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            end = {"event": "message_end", "message_id": message_id, "conversation_id": conversation_id}
+            yield f"data: {json.dumps(end)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def serve(host: str, port: int, config: FakeDifyConfig):
+    import uvicorn
+
+    uvicorn.run(create_app(config), host=host, port=port, log_level="warning")
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="Delay before the first token")
+    parser.add_argument("--chunk-ms", type=float, default=20.0, help="Delay between streamed chunks")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform jitter applied to each delay")
+    parser.add_argument("--chunk-chars", type=int, default=8, help="Characters per streamed chunk")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+
+
+def config_from_args(args) -> FakeDifyConfig:
+    return FakeDifyConfig(
+        first_token_ms=args.first_token_ms,
+        chunk_ms=args.chunk_ms,
+        jitter_ms=args.jitter_ms,
+        chunk_chars=args.chunk_chars,
+        error_rate=args.error_rate,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    add_arguments(parser)
+    args = parser.parse_args()
+    serve(args.host, args.port, config_from_args(args))
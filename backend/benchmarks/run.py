@@ -0,0 +1,324 @@
+# backend/benchmarks/run.py
+"""
+Load-tests the FastAPI app offline: a fake Dify runs in a child process, every model is
+replaced by a stub (benchmarks/stubs.py) and the app is served by uvicorn in a
+background thread, then driven over HTTP with a fixed concurrency.
+
+For each endpoint this reports throughput, p50/p95/p99 latency (and time to first byte
+for streaming endpoints), the error count and process RSS, as JSON for comparing runs.
+Inputs are unique per request and the answer cache is off so every chat reaches the fake
+Dify; pass --repeat-inputs to measure the cached paths instead.
+
+Run from the backend folder:
+    python -m benchmarks.run --endpoints chat,intent --requests 200 --concurrency 16 --output run.json
+    python -m benchmarks.run --baseline run.json     # prints the change against an earlier run
+"""
+import io
+import os
+import sys
+import json
+import time
+import wave
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import multiprocessing as mp
+from dataclasses import dataclass
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from benchmarks.fake_dify import add_arguments as add_fake_dify_arguments, config_from_args, serve  # noqa: E402
+from benchmarks.stubs import StubCosts  # noqa: E402
+
+QUESTIONS = [
+    "Làm sao để thoa kem nền cho da dầu?",
+    "Tôi nên dùng phấn phủ dạng bột hay dạng nén?",
+    "Cách kẻ eyeliner khi không nhìn thấy gương?",
+    "Son lì có làm khô môi không?",
+]
+SPEECH = [
+    "Chào bạn! Hôm nay mình sẽ hướng dẫn bạn cách trang điểm tự nhiên.",
+    "Đầu tiên, hãy làm sạch da và thoa kem dưỡng ẩm. Sau đó dùng kem lót để lớp nền bền hơn.",
+]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    path: str
+    streaming: bool = False
+
+
+ENDPOINTS = {
+    "chat": Endpoint("chat", "/routes/chat"),
+    "chat_stream": Endpoint("chat_stream", "/routes/chat/stream", streaming=True),
+    "synthesize": Endpoint("synthesize", "/routes/synthesize"),
+    "synthesize_stream": Endpoint("synthesize_stream", "/routes/synthesize/stream", streaming=True),
+    "transcribe": Endpoint("transcribe", "/routes/transcribe"),
+    "intent": Endpoint("intent", "/routes/intent/classify"),
+}
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(sorted_values: list, q: float) -> float | None:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize_ms(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "mean": round(sum(values) / len(values) * 1000, 2),
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p95": round(percentile(values, 95) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+def wav_clip(seconds: float, sample_rate: int = 16000) -> bytes:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = (0.1 * np.sin(2 * np.pi * 220 * t) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def request_kwargs(endpoint: Endpoint, i: int, args) -> dict:
+    suffix = "" if args.repeat_inputs else f" (#{i})"
+    if endpoint.name in ("chat", "chat_stream"):
+        return {"json": {"question": QUESTIONS[i % len(QUESTIONS)] + suffix, "session_id": f"bench-{i}"}}
+    if endpoint.name in ("synthesize", "synthesize_stream"):
+        return {"data": {"text": SPEECH[i % len(SPEECH)] + suffix}}
+    if endpoint.name == "transcribe":
+        return {"files": {"file": ("clip.wav", args.clip, "audio/wav")}}
+    return {"json": {"text": QUESTIONS[i % len(QUESTIONS)] + suffix}}
+
+
+async def one_request(client: httpx.AsyncClient, endpoint: Endpoint, i: int, args) -> tuple[float, float | None, bool]:
+    start = time.perf_counter()
+    first_byte = None
+    try:
+        async with client.stream("POST", endpoint.path, **request_kwargs(endpoint, i, args)) as response:
+            async for _ in response.aiter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+            ok = response.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    return time.perf_counter() - start, first_byte, ok
+
+
+async def run_endpoint(base_url: str, endpoint: Endpoint, args) -> dict:
+    # No cookie jar: a conversation cookie would make every later chat turn bypass the caches
+    no_cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, cookies=no_cookies, limits=limits, timeout=args.timeout) as client:
+        for i in range(args.warmup):
+            await one_request(client, endpoint, -1 - i, args)
+
+        latencies, first_bytes, errors = [], [], 0
+        counter = iter(range(args.requests))
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                latency, first_byte, ok = await one_request(client, endpoint, i, args)
+                if not ok:
+                    errors += 1
+                    continue
+                latencies.append(latency)
+                if first_byte is not None:
+                    first_bytes.append(first_byte)
+
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    result = {
+        "requests": args.requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize_ms(latencies),
+        "rss_mb_before": round(rss_before, 1),
+        "rss_mb_after": round(rss_mb(), 1),
+    }
+    if endpoint.streaming:
+        result["first_byte_ms"] = summarize_ms(first_bytes)
+    return result
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+def start_app(port: int, costs, model_workers=()):
+    """Imports the app with stub models and serves it from a daemon thread."""
+    import uvicorn
+    from main import app
+    from benchmarks.stubs import install_stubs
+
+    install_stubs(costs, skip=model_workers)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="bench-app", daemon=True)
+    thread.start()
+    wait_for_port(port)
+    return server, thread
+
+
+def print_comparison(baseline: dict, current: dict):
+    print(f"{'endpoint':<18} {'rps':>16} {'p50 ms':>20} {'p95 ms':>20}", file=sys.stderr)
+    for name, result in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+
+        def cell(old, new):
+            if not old or new is None:
+                return f"{new}"
+            return f"{old}->{new} ({(new - old) / old * 100:+.0f}%)"
+
+        print(
+            f"{name:<18} {cell(before['throughput_rps'], result['throughput_rps']):>16} "
+            f"{cell(before['latency_ms'].get('p50'), result['latency_ms'].get('p50')):>20} "
+            f"{cell(before['latency_ms'].get('p95'), result['latency_ms'].get('p95')):>20}",
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per endpoint")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--clip-seconds", type=float, default=3.0, help="Length of the audio sent to /transcribe")
+    parser.add_argument("--repeat-inputs", action="store_true", help="Reuse inputs so the caches are exercised")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--tts-rtf", type=float, default=0.05, help="Stub TTS compute seconds per audio second")
+    parser.add_argument("--stt-rtf", type=float, default=0.05, help="Stub STT compute seconds per audio second")
+    parser.add_argument("--intent-ms", type=float, default=2.0, help="Stub intent cost per batch")
+    parser.add_argument(
+        "--model-workers", default="",
+        help="Comma-separated families (tts,stt,intent) whose stubs run in model worker processes",
+    )
+    add_fake_dify_arguments(parser)
+    args = parser.parse_args()
+    costs = StubCosts(tts_rtf=args.tts_rtf, stt_rtf=args.stt_rtf, intent_ms=args.intent_ms)
+
+    names = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+    args.clip = wav_clip(args.clip_seconds)
+    model_workers = [name.strip() for name in args.model_workers.split(",") if name.strip()]
+
+    dify_port, app_port = free_port(), free_port()
+    fake_dify = mp.get_context("spawn").Process(
+        target=serve, args=("127.0.0.1", dify_port, config_from_args(args)), daemon=True
+    )
+    fake_dify.start()
+
+    # The app reads its configuration at import time
+    os.environ["DIFY_API_BASE_URL"] = f"http://127.0.0.1:{dify_port}"
+    os.environ.setdefault("DIFY_API_KEY", "benchmark")
+    os.environ.setdefault("MODEL_LOAD_MODE", "lazy")
+    os.environ.setdefault("TTS_CACHE_DISK_DIR", "")
+    if not args.repeat_inputs:
+        # Numbered variants of one question are near-duplicates to the semantic cache
+        os.environ.setdefault("ANSWER_CACHE_ENABLED", "0")
+    os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "benchmark_app.log"))
+    os.environ.setdefault("INTERACTION_LOG_DB", os.path.join(tempfile.gettempdir(), "benchmark_rag_app.db"))
+    if model_workers:
+        stub_classes = {"tts": "StubTTSPipeline", "stt": "StubASRPipeline", "intent": "StubIntentClassifier"}
+        os.environ["MODEL_WORKERS"] = ",".join(model_workers)
+        os.environ["STUB_COSTS"] = json.dumps(vars(costs))
+        for family in model_workers:
+            os.environ[f"MODEL_WORKER_SPEC_{family.upper()}"] = f"benchmarks.stubs:{stub_classes[family]}"
+
+    try:
+        wait_for_port(dify_port)
+        server, server_thread = start_app(app_port, costs, model_workers)
+        base_url = f"http://127.0.0.1:{app_port}"
+
+        report = {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "config": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "warmup": args.warmup,
+                "repeat_inputs": args.repeat_inputs,
+                "clip_seconds": args.clip_seconds,
+                "stub_costs": vars(costs),
+                "model_workers": model_workers,
+                "fake_dify": {k: v for k, v in vars(config_from_args(args)).items() if k != "answer"},
+            },
+            "endpoints": {},
+        }
+        for name in names:
+            print(f"Benchmarking {name}...", file=sys.stderr)
+            report["endpoints"][name] = asyncio.run(run_endpoint(base_url, ENDPOINTS[name], args))
+        server.should_exit = True
+        server_thread.join(timeout=10)
+    finally:
+        fake_dify.terminate()
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
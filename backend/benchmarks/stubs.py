@@ -0,0 +1,125 @@
+# backend/benchmarks/stubs.py
+"""
+Tiny stand-ins for the Kokoro, Whisper, intent and embedding models.
+
+They have the same call signatures as the real models and simulate inference cost with
+a configurable real-time factor or fixed delay, so the app's own overhead (routing,
+batching, caching, encoding) can be measured offline on any CPU.
+"""
+import os
+import re
+import json
+import time
+import zlib
+import numpy as np
+from dataclasses import dataclass
+from utils.model_registry import registry
+
+TTS_SAMPLE_RATE = 24000
+STT_SAMPLE_RATE = 16000
+SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+@dataclass
+class StubCosts:
+    # Seconds of compute per second of produced / consumed audio
+    tts_rtf: float = 0.05
+    stt_rtf: float = 0.05
+    # Fixed cost per forward pass
+    intent_ms: float = 2.0
+    embedding_ms: float = 2.0
+    # Speaking rate used to size the synthesized audio
+    tts_chars_per_second: float = 15.0
+
+    @classmethod
+    def from_env(cls) -> "StubCosts":
+        """Costs passed to stubs built inside model worker processes (STUB_COSTS, JSON)."""
+        return cls(**json.loads(os.getenv("STUB_COSTS", "{}")))
+
+
+class StubTTSPipeline:
+    """Yields (graphemes, phonemes, audio) per sentence, like kokoro.KPipeline."""
+
+    def __init__(self, costs: StubCosts | None = None):
+        self.costs = costs or StubCosts.from_env()
+
+    def __call__(self, text: str, voice: str = "af_heart", speed: float = 1.0):
+        for sentence in SENTENCE_RE.split(text.strip()) or [text]:
+            if not sentence:
+                continue
+            seconds = max(0.2, len(sentence) / self.costs.tts_chars_per_second / speed)
+            time.sleep(seconds * self.costs.tts_rtf)
+            t = np.arange(int(seconds * TTS_SAMPLE_RATE), dtype=np.float32) / TTS_SAMPLE_RATE
+            yield sentence, "", (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+class StubASRPipeline:
+    """Accepts the same inputs as a transformers ASR pipeline and returns [{"text": ...}]."""
+
+    def __init__(self, costs: StubCosts | None = None):
+        self.costs = costs or StubCosts.from_env()
+
+    def __call__(self, inputs, batch_size: int = 1, **kwargs):
+        single = isinstance(inputs, dict)
+        inputs = [inputs] if single else inputs
+        audio_seconds = sum(len(item["raw"]) / item["sampling_rate"] for item in inputs)
+        time.sleep(audio_seconds * self.costs.stt_rtf)
+        outputs = [{"text": f"Câu hỏi thử nghiệm dài {len(item['raw']) / item['sampling_rate']:.1f} giây"} for item in inputs]
+        return outputs[0] if single else outputs
+
+
+class StubIntentClassifier:
+    """Keyword rules standing in for the fine-tuned classifier's predict_batch."""
+
+    RULES = [
+        (re.compile(r"\b(xin chào|chào bạn|hello|hi)\b"), "greeting"),
+        (re.compile(r"\b(cảm ơn|thanks?)\b"), "thank_you"),
+    ]
+
+    def __init__(self, costs: StubCosts | None = None):
+        self.costs = costs or StubCosts.from_env()
+        self.labels = ["greeting", "thank_you", "qa"]
+
+    def predict_batch(self, texts):
+        time.sleep(self.costs.intent_ms / 1000)
+        results = []
+        for text in texts:
+            lowered = text.lower()
+            label = next((label for pattern, label in self.RULES if pattern.search(lowered)), "qa")
+            results.append((label, 0.99 if label != "qa" else 0.95))
+        return results
+
+
+class StubEmbedder:
+    """Hashed bag-of-words vectors with SentenceTransformer's encode() signature."""
+
+    def __init__(self, costs: StubCosts | None = None, dim: int = 256):
+        self.costs = costs or StubCosts.from_env()
+        self.dim = dim
+
+    def encode(self, text: str, normalize_embeddings: bool = False):
+        time.sleep(self.costs.embedding_ms / 1000)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode()) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        if normalize_embeddings and norm > 0:
+            vector /= norm
+        return vector
+
+
+def install_stubs(costs: StubCosts | None = None, skip=()):
+    """
+    Replaces every registered model with its stub. Call after the app is imported.
+    Families in `skip` keep their loader, e.g. because they run stubs in model workers.
+    """
+    costs = costs or StubCosts()
+    stubs = {
+        "tts": StubTTSPipeline(costs),
+        "stt": StubASRPipeline(costs),
+        "intent": StubIntentClassifier(costs),
+        "embedding": StubEmbedder(costs),
+    }
+    for name, stub in stubs.items():
+        if name not in skip:
+            registry.override(name, stub)
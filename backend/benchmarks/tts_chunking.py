@@ -0,0 +1,166 @@
+# backend/benchmarks/tts_chunking.py
+"""
+Measures TTS wall time per answer for several chunking strategies on real transcripts.
+
+Answers are extracted from the application log (the `answer` fields the chat controller
+logged), then each one is synthesized with every strategy and parallelism level:
+
+    raw        the unnormalized text in one call (what synthesize_speech used to do)
+    whole      normalized text in one call
+    sentence   one call per sentence
+    balanced   length-balanced chunks from chunk_text(), first chunk kept short
+
+For each combination this reports total and per-answer wall time, time to the first
+chunk of audio, and chunk count and length spread, as JSON. The stub backend only
+checks the harness (its cost is linear in text length); use --backend kokoro, optionally
+with MODEL_WORKERS=tts and MODEL_WORKER_PROCESSES_TTS=N, for real numbers.
+
+Run from the backend folder:
+    python -m benchmarks.tts_chunking --backend kokoro --limit 40 --parallelism 1,2,4
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Keep the benchmark away from the shared on-disk audio cache
+os.environ.setdefault("TTS_CACHE_DISK_DIR", "")
+
+from benchmarks.stubs import StubCosts, StubTTSPipeline  # noqa: E402
+from utils.model_registry import registry  # noqa: E402
+from utils.text_normalizer import chunk_text, normalize_for_speech, split_sentences  # noqa: E402
+from controllers.tts_controller import (  # noqa: E402
+    TTS_CHUNK_MAX_CHARS,
+    TTS_CHUNK_TARGET_CHARS,
+    TTS_FIRST_CHUNK_CHARS,
+    TTS_TEXT_LANG,
+    synthesize_chunks,
+)
+
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "logs", "app.log")
+# Python reprs of the Dify/LangChain results logged by the chat controller
+ANSWER_RES = [
+    re.compile(r"'answer': '((?:[^'\\]|\\.)*)'"),
+    re.compile(r"'answer': \"((?:[^\"\\]|\\.)*)\""),
+]
+STRATEGIES = ["raw", "whole", "sentence", "balanced"]
+
+
+def load_transcripts(path: str, min_chars: int, limit: int) -> list:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        log = f.read()
+    seen, transcripts = set(), []
+    for pattern in ANSWER_RES:
+        for match in pattern.finditer(log):
+            try:
+                text = json.loads(f'"{match.group(1)}"')
+            except ValueError:
+                text = match.group(1).replace("\\n", "\n")
+            if len(text) >= min_chars and text not in seen:
+                seen.add(text)
+                transcripts.append(text)
+    # Longest first, so a small --limit still covers the answers that hurt the most
+    transcripts.sort(key=len, reverse=True)
+    return transcripts[:limit] if limit else transcripts
+
+
+def make_chunks(text: str, strategy: str, target_chars: int, max_chars: int, first_chars: int) -> list:
+    if strategy == "raw":
+        return [text]
+    speech = normalize_for_speech(text, TTS_TEXT_LANG)
+    if strategy == "whole":
+        return [speech]
+    if strategy == "sentence":
+        return split_sentences(speech)
+    return chunk_text(speech, target_chars=target_chars, max_chars=max_chars, first_chars=first_chars)
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def run(transcripts: list, strategy: str, parallelism: int, args) -> dict:
+    walls, firsts, counts, lengths = [], [], [], []
+    for text in transcripts:
+        chunks = make_chunks(text, strategy, args.target_chars, args.max_chars, args.first_chars)
+        if not chunks:
+            continue
+        start = time.perf_counter()
+        first = None
+        for _ in synthesize_chunks(chunks, parallelism=parallelism):
+            if first is None:
+                first = time.perf_counter() - start
+        walls.append(time.perf_counter() - start)
+        firsts.append(first)
+        counts.append(len(chunks))
+        lengths.extend(len(chunk) for chunk in chunks)
+
+    return {
+        "strategy": strategy,
+        "parallelism": parallelism,
+        "answers": len(walls),
+        "total_seconds": round(sum(walls), 3),
+        "wall_ms_p50": round(percentile(walls, 50) * 1000, 1),
+        "wall_ms_p95": round(percentile(walls, 95) * 1000, 1),
+        "first_audio_ms_p50": round(percentile(firsts, 50) * 1000, 1),
+        "first_audio_ms_p95": round(percentile(firsts, 95) * 1000, 1),
+        "chunks_per_answer": round(statistics.mean(counts), 2),
+        "chunk_chars_mean": round(statistics.mean(lengths), 1),
+        "chunk_chars_stdev": round(statistics.pstdev(lengths), 1),
+        "chunk_chars_max": max(lengths),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default=DEFAULT_LOG, help="Application log to take answers from")
+    parser.add_argument("--limit", type=int, default=40, help="Answers to synthesize (0 = all)")
+    parser.add_argument("--min-chars", type=int, default=80, help="Skip answers shorter than this")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--parallelism", default="1,2,4", help="Chunks in flight per answer")
+    parser.add_argument("--target-chars", type=int, default=TTS_CHUNK_TARGET_CHARS)
+    parser.add_argument("--max-chars", type=int, default=TTS_CHUNK_MAX_CHARS)
+    parser.add_argument("--first-chars", type=int, default=TTS_FIRST_CHUNK_CHARS)
+    parser.add_argument("--backend", choices=["stub", "kokoro"], default="stub")
+    parser.add_argument("--stub-rtf", type=float, default=0.05, help="Stub compute seconds per audio second")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    transcripts = load_transcripts(args.log, args.min_chars, args.limit)
+    if not transcripts:
+        parser.error(f"No answers of at least {args.min_chars} characters found in {args.log}")
+    if args.backend == "stub":
+        registry.override("tts", StubTTSPipeline(StubCosts(tts_rtf=args.stub_rtf)))
+    else:
+        registry.get("tts")
+
+    results = []
+    for strategy in [name.strip() for name in args.strategies.split(",") if name.strip()]:
+        for parallelism in [int(value) for value in args.parallelism.split(",")]:
+            print(f"{strategy} x{parallelism}...", file=sys.stderr)
+            results.append(run(transcripts, strategy, parallelism, args))
+
+    report = {
+        "backend": args.backend,
+        "answers": len(transcripts),
+        "answer_chars_mean": round(statistics.mean(len(t) for t in transcripts), 1),
+        "model_workers": os.getenv("MODEL_WORKERS", ""),
+        "config": {"target_chars": args.target_chars, "max_chars": args.max_chars, "first_chars": args.first_chars},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
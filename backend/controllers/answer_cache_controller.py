@@ -0,0 +1,83 @@
+import os
+import uuid
+import importlib.util
+import logging
+from starlette.concurrency import run_in_threadpool
+from models.entities import QueryInput, QueryResponse, EmbeddingModelName
+from utils.answer_cache import AnswerCache, InMemoryVectorIndex, QdrantVectorIndex
+from utils.model_registry import registry
+from utils.metrics import cache_stats
+
+logger = logging.getLogger("app.answer_cache_controller")
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+# The semantic tier needs the optional sentence-transformers package; without it only exact matches are cached
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "1") == "1" and importlib.util.find_spec("sentence_transformers") is not None
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+# "memory" keeps vectors in-process; "qdrant" stores them in the Qdrant service from compose.yaml
+ANSWER_CACHE_INDEX = os.getenv("ANSWER_CACHE_INDEX", "memory")
+ANSWER_CACHE_COLLECTION = os.getenv("ANSWER_CACHE_COLLECTION", "answer_cache")
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+
+def load_embedding_model():
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Loading embedding model: {EmbeddingModelName.VIETNAMSE_EMBEDDING.value}")
+    return SentenceTransformer(EmbeddingModelName.VIETNAMSE_EMBEDDING.value)
+
+if ANSWER_CACHE_ENABLED and ANSWER_CACHE_SEMANTIC:
+    # Optional: the cache falls back to exact matches while the embedding model is unavailable
+    registry.register("embedding", load_embedding_model, warmup=lambda model: model.encode("Xin chào"), required=False)
+
+def embed_query(text: str):
+    return registry.get("embedding").encode(text, normalize_embeddings=True)
+
+def build_index():
+    if ANSWER_CACHE_INDEX == "qdrant":
+        try:
+            return QdrantVectorIndex(QDRANT_URL, ANSWER_CACHE_COLLECTION, ttl_seconds=ANSWER_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.error(f"Could not use Qdrant at {QDRANT_URL}, falling back to the in-memory index: {e}")
+    return InMemoryVectorIndex(ANSWER_CACHE_MAX_ENTRIES)
+
+answer_cache = AnswerCache(
+    embed=embed_query if ANSWER_CACHE_SEMANTIC else None,
+    index=build_index(),
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=ANSWER_CACHE_SIMILARITY,
+)
+cache_stats.add(
+    "answer",
+    answer_cache.stats,
+    {"hit_exact": "exact_hits", "hit_semantic": "semantic_hits", "miss": "misses", "bypass": "bypassed"},
+)
+
+async def lookup_answer(query_input: QueryInput, conversation_id: str | None, has_context: bool) -> QueryResponse | None:
+    """`has_context`: earlier turns of the session may change the answer, so skip the cache."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if has_context:
+        answer_cache.record_bypass()
+        return None
+
+    cached = await run_in_threadpool(answer_cache.lookup, query_input.question)
+    if cached is None:
+        return None
+
+    logger.info(f"Answer cache hit for query: {query_input.question}")
+    return QueryResponse(
+        response=cached["response"],
+        session_id=query_input.session_id or str(uuid.uuid4()),
+        query=query_input.question,
+        conversation_id=conversation_id,
+        type=cached["type"],
+    )
+
+async def store_answer(qr: QueryResponse, has_context: bool):
+    # Only successfully parsed answers carry a type; error messages must not be cached
+    if not ANSWER_CACHE_ENABLED or has_context or not qr.type:
+        return
+    await run_in_threadpool(answer_cache.store, qr.query, {"response": qr.response, "type": qr.type})
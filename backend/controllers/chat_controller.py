@@ -1,23 +1,91 @@
 import uuid
 import logging
-import requests
+import httpx
 import json
+from contextlib import aclosing
 from models.entities import QueryInput, QueryResponse
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-
-DIFY_API_BASE_URL = os.getenv("DIFY_API_BASE_URL", "http://localhost:80")
-DIFY_API_KEY = os.getenv("DIFY_API_KEY")
-DIFY_CHAT_ENDPOINT = f"{DIFY_API_BASE_URL}/v1/chat-messages"
+from utils.dify_client import DIFY_API_KEY, DIFY_CHAT_ENDPOINT, post_chat_message, stream_chat_message
+from utils.answer_stream import StreamingAnswerParser
+from utils.metrics import CHAT_ERRORS
+from utils.resilience import CircuitOpenError, QueueTimeoutError
 
 logger = logging.getLogger("app.chat_controller")
 
 if not DIFY_API_KEY:
     logger.error("DIFY_API_KEY is not set. Please configure it in your environment.")
 
-def handle_chat(query_input: QueryInput, conversation_id: str) -> QueryResponse:
+def _build_payload(query: str, session_id: str, conversation_id: str | None, response_mode: str) -> dict:
+    payload = {
+        "inputs": {},
+        "query": query,
+        "response_mode": response_mode,
+        "user": session_id,
+    }
+
+    # Only include conversation_id if it exists
+    if conversation_id:
+        payload["conversation_id"] = conversation_id
+    return payload
+
+def _parse_answer(answer: str) -> tuple[str, str | None]:
+    """
+    Strips the ```json fence from a Dify answer and extracts its response and type fields.
+    """
+    response_type = None
+    try:
+        # Preprocess the answer to remove markdown code block markers
+        cleaned_answer = answer.strip()
+        if cleaned_answer.startswith("```json"):
+            cleaned_answer = cleaned_answer.replace("```json", "").replace("```", "").strip()
+
+        # Parse the JSON string
+        parsed_answer = json.loads(cleaned_answer)
+
+        # Extract type and response
+        answer_text = parsed_answer.get("response", "No response provided in the answer.")
+        response_type = parsed_answer.get("type")
+
+        logger.info(f"Successfully parsed Dify answer: response='{answer_text[:100]}...', type='{response_type}'")
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse Dify answer as JSON: {answer} - Error: {e}")
+        answer_text = "Sorry, the AI response was not in the expected JSON format."
+    except Exception as e:
+        logger.error(f"Error processing Dify answer: {e}")
+        answer_text = "Sorry, an error occurred while processing the AI response."
+    return answer_text, response_type
+
+def _describe_upstream_error(e: Exception, query: str) -> str:
+    """
+    Maps an exception raised while talking to Dify to the user-facing answer text.
+    """
+    CHAT_ERRORS.labels(type(e).__name__).inc()
+    if isinstance(e, CircuitOpenError):
+        logger.warning(f"Dify circuit is open, failing fast for query: {query}")
+        return "Sorry, I could not connect to the AI service. Please check if Dify is running."
+    if isinstance(e, QueueTimeoutError):
+        logger.warning(f"Too many concurrent Dify requests, rejecting query: {query}")
+        return "Sorry, the AI service is busy right now. Please try again in a moment."
+    if isinstance(e, httpx.TimeoutException):
+        logger.error(f"Request to Dify timed out for query: {query}")
+        return "Sorry, the request to the AI service timed out."
+    if isinstance(e, httpx.NetworkError):
+        logger.error(f"Could not connect to Dify at {DIFY_CHAT_ENDPOINT}. Is Dify running and accessible?")
+        return "Sorry, I could not connect to the AI service. Please check if Dify is running."
+    if isinstance(e, httpx.HTTPStatusError):
+        logger.error(f"Dify API HTTP error: {e.response.status_code} - {e.response.text}")
+        try:
+            error_details = e.response.json()
+            msg = error_details.get("message", e.response.text)
+            return f"AI service error ({e.response.status_code}): {msg}"
+        except ValueError:
+            return f"AI service error ({e.response.status_code}): {e.response.text}"
+    if isinstance(e, httpx.RequestError):
+        logger.error(f"Dify API request error: {e}")
+        return f"Sorry, there was an issue communicating with the AI service: {e}"
+    logger.error(f"An unexpected error occurred during Dify interaction: {e}", exc_info=e)
+    return "An unexpected error occurred while I was trying to get an answer."
+
+async def handle_chat(query_input: QueryInput, conversation_id: str) -> QueryResponse:
     logger.info(f"handle_chat received query: {query_input.question} for session: {query_input.session_id}")
     session_id = query_input.session_id or str(uuid.uuid4())
     query = query_input.question
@@ -37,29 +105,16 @@ def handle_chat(query_input: QueryInput, conversation_id: str) -> QueryResponse:
             conversation_id=returned_conversation_id
         )
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DIFY_API_KEY}"
-    }
-
-    payload = {
-        "inputs": {},
-        "query": query,
-        "response_mode": "blocking",
-        "user": session_id,
-    }
-
-    # Only include conversation_id if it exists
-    if conversation_id:
-        payload["conversation_id"] = conversation_id
+    payload = _build_payload(query, session_id, conversation_id, "blocking")
 
     try:
-        logger.debug(f"Sending request to Dify: {DIFY_CHAT_ENDPOINT} with payload: {payload}")
-        response = requests.post(DIFY_CHAT_ENDPOINT, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Sending request to Dify: {DIFY_CHAT_ENDPOINT} with payload: {payload}")
+        response = await post_chat_message(payload)
+
         dify_response_data = response.json()
-        logger.debug(f"Dify raw response data: {dify_response_data}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Dify raw response data: {dify_response_data}")
 
         # Get the answer and conversation_id
         answer = dify_response_data.get("answer")
@@ -77,47 +132,10 @@ def handle_chat(query_input: QueryInput, conversation_id: str) -> QueryResponse:
                 logger.warning("Dify response did not contain an 'answer' key and no clear error message. Using fallback.")
                 answer_text = "Sorry, I received a response, but it was not in the expected format."
         else:
-            try:
-                # Preprocess the answer to remove markdown code block markers
-                cleaned_answer = answer.strip()
-                if cleaned_answer.startswith("```json"):
-                    cleaned_answer = cleaned_answer.replace("```json", "").replace("```", "").strip()
-                
-                # Parse the JSON string
-                parsed_answer = json.loads(cleaned_answer)
-                
-                # Extract type and response
-                answer_text = parsed_answer.get("response", "No response provided in the answer.")
-                response_type = parsed_answer.get("type")
-                
-                logger.info(f"Successfully parsed Dify answer: response='{answer_text[:100]}...', type='{response_type}'")
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse Dify answer as JSON: {answer} - Error: {e}")
-                answer_text = "Sorry, the AI response was not in the expected JSON format."
-            except Exception as e:
-                logger.error(f"Error processing Dify answer: {e}")
-                answer_text = "Sorry, an error occurred while processing the AI response."
-
-    except requests.exceptions.Timeout:
-        logger.error(f"Request to Dify timed out for query: {query}")
-        answer_text = "Sorry, the request to the AI service timed out."
-    except requests.exceptions.ConnectionError:
-        logger.error(f"Could not connect to Dify at {DIFY_CHAT_ENDPOINT}. Is Dify running and accessible?")
-        answer_text = "Sorry, I could not connect to the AI service. Please check if Dify is running."
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"Dify API HTTP error: {e.response.status_code} - {e.response.text}")
-        try:
-            error_details = e.response.json()
-            msg = error_details.get("message", e.response.text)
-            answer_text = f"AI service error ({e.response.status_code}): {msg}"
-        except ValueError:
-            answer_text = f"AI service error ({e.response.status_code}): {e.response.text}"
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Dify API request error: {e}")
-        answer_text = f"Sorry, there was an issue communicating with the AI service: {e}"
+            answer_text, response_type = _parse_answer(answer)
+
     except Exception as e:
-        logger.error(f"An unexpected error occurred during Dify interaction: {e}", exc_info=True)
-        answer_text = "An unexpected error occurred while I was trying to get an answer."
+        answer_text = _describe_upstream_error(e, query)
 
     # Ensure answer_text is always a string
     if answer_text is None:
@@ -132,4 +150,96 @@ def handle_chat(query_input: QueryInput, conversation_id: str) -> QueryResponse:
         query=query,
         conversation_id=returned_conversation_id,
         type=response_type
-    )
\ No newline at end of file
+    )
+
+async def stream_chat(query_input: QueryInput, conversation_id: str | None):
+    """
+    Streams a chat turn from Dify's streaming response mode.
+
+    Yields event dicts:
+      {"event": "start", "conversation_id": ...}  once the conversation is known, before any delta
+      {"event": "delta", "text": ...}             newly generated characters of the "response" field
+      {"event": "type", "type": ...}              as soon as the "type" field is complete
+      {"event": "done", **QueryResponse}          always last, with the authoritative parse
+    """
+    logger.info(f"stream_chat received query: {query_input.question} for session: {query_input.session_id}")
+    session_id = query_input.session_id or str(uuid.uuid4())
+    query = query_input.question
+
+    answer_text = "Sorry, I encountered an error while processing your request."
+    response_type = None
+    returned_conversation_id = conversation_id
+
+    def done_event() -> dict:
+        qr = QueryResponse(
+            response=answer_text,
+            session_id=session_id,
+            query=query,
+            conversation_id=returned_conversation_id,
+            type=response_type
+        )
+        logger.info(f"Returning streamed QueryResponse: response='{answer_text[:100]}...', session_id='{session_id}', type='{response_type}', conversation_id='{returned_conversation_id}'")
+        return {"event": "done", **qr.model_dump()}
+
+    if not DIFY_API_KEY:
+        answer_text = "AI service is not configured (API key missing)."
+        yield done_event()
+        return
+
+    payload = _build_payload(query, session_id, conversation_id, "streaming")
+    parser = StreamingAnswerParser()
+    started = False
+    type_sent = False
+    dify_error = None
+
+    try:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Streaming request to Dify: {DIFY_CHAT_ENDPOINT} with payload: {payload}")
+        async with aclosing(stream_chat_message(payload)) as events:
+            async for event in events:
+                event_name = event.get("event")
+
+                if not started and event.get("conversation_id"):
+                    returned_conversation_id = event["conversation_id"]
+                    started = True
+                    yield {"event": "start", "conversation_id": returned_conversation_id}
+
+                if event_name in ("message", "agent_message"):
+                    text = parser.feed(event.get("answer") or "")
+                    if text:
+                        yield {"event": "delta", "text": text}
+                    if parser.type is not None and not type_sent:
+                        type_sent = True
+                        yield {"event": "type", "type": parser.type}
+                elif event_name == "message_replace":
+                    # Dify replaces the whole answer when output moderation triggers
+                    parser = StreamingAnswerParser()
+                    parser.feed(event.get("answer") or "")
+                elif event_name == "error":
+                    dify_error = event.get("message") or "unknown error"
+                    logger.error(f"Dify stream returned an error: {event}")
+                    break
+                elif event_name == "message_end":
+                    break
+
+        if dify_error:
+            answer_text = f"AI service error: {dify_error}"
+        elif parser.raw:
+            answer_text, response_type = _parse_answer(parser.raw)
+        else:
+            logger.warning("Dify stream ended without an answer. Using fallback.")
+            answer_text = "Sorry, I received a response, but it was not in the expected format."
+
+    except Exception as e:
+        answer_text = _describe_upstream_error(e, query)
+
+    yield done_event()
+
+
+async def query_response_events(qr: QueryResponse):
+    """Streams an already complete QueryResponse with the same frames as stream_chat."""
+    if qr.conversation_id:
+        yield {"event": "start", "conversation_id": qr.conversation_id}
+    yield {"event": "delta", "text": qr.response}
+    yield {"event": "type", "type": qr.type}
+    yield {"event": "done", **qr.model_dump()}
@@ -0,0 +1,103 @@
+import os
+import re
+import uuid
+import logging
+import itertools
+from models.entities import QueryInput, QueryResponse
+from controllers.intent_controller import predict_intent
+from prompt import (
+    greeting_responses,
+    thank_you_responses,
+    smalltalk_responses,
+    feedback_responses,
+    fallback_responses,
+)
+
+logger = logging.getLogger("app.fast_path_controller")
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+# Intents answered from templates; everything else (qa, unknown labels) goes to Dify
+FAST_PATH_INTENTS = {
+    intent.strip() for intent in os.getenv("FAST_PATH_INTENTS", "greeting,thank_you,smalltalk,feedback").split(",")
+    if intent.strip()
+}
+FAST_PATH_PRESYNTHESIZE = os.getenv("FAST_PATH_PRESYNTHESIZE", "0") == "1"
+
+RESPONSE_POOLS = {
+    "greeting": greeting_responses,
+    "thank_you": thank_you_responses,
+    "smalltalk": smalltalk_responses,
+    "feedback": feedback_responses,
+    "fallback": fallback_responses,
+}
+
+# Spellings the classifier's id2label may use for the same intent
+LABEL_ALIASES = {
+    "greetings": "greeting",
+    "hello": "greeting",
+    "thanks": "thank_you",
+    "thankyou": "thank_you",
+    "thank": "thank_you",
+    "small_talk": "smalltalk",
+    "chitchat": "smalltalk",
+    "chit_chat": "smalltalk",
+}
+
+NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+# Rotate through each pool so repeated greetings don't sound canned
+_rotations = {intent: itertools.cycle(pool) for intent, pool in RESPONSE_POOLS.items()}
+
+def canonical_intent(label: str) -> str:
+    key = NON_WORD_RE.sub("_", label.lower()).strip("_")
+    return LABEL_ALIASES.get(key, key)
+
+async def answer_fast_path(query_input: QueryInput, conversation_id: str | None, turn: dict | None = None) -> QueryResponse | None:
+    """
+    Answers trivial intents (greeting, thanks, small talk, feedback) from a template pool.
+    Returns None when the query should go to Dify instead. The classification is
+    recorded in `turn` when given.
+    """
+    if not FAST_PATH_ENABLED or not query_input.question.strip():
+        return None
+
+    try:
+        label, confidence = await predict_intent(query_input.question)
+    except Exception as e:
+        logger.error(f"Intent classification failed, forwarding to Dify: {e}")
+        return None
+
+    intent = canonical_intent(label)
+    if turn is not None:
+        turn["intent"] = intent
+        turn["intent_confidence"] = confidence
+    if intent not in FAST_PATH_INTENTS or intent not in RESPONSE_POOLS or confidence < FAST_PATH_MIN_CONFIDENCE:
+        logger.info(f"Fast path skipped: intent='{label}', confidence={confidence:.3f}")
+        return None
+
+    answer_text = next(_rotations[intent])
+    logger.info(f"Fast path answered intent='{intent}' (confidence={confidence:.3f}) without calling Dify")
+    return QueryResponse(
+        response=answer_text,
+        session_id=query_input.session_id or str(uuid.uuid4()),
+        query=query_input.question,
+        conversation_id=conversation_id,
+        type=intent,
+    )
+
+def presynthesize_responses():
+    """
+    Synthesizes every templated response into the TTS audio cache so /routes/synthesize
+    serves them without running Kokoro.
+    """
+    from controllers.tts_controller import synthesize_pcm
+
+    count = 0
+    for intent, pool in RESPONSE_POOLS.items():
+        if intent not in FAST_PATH_INTENTS:
+            continue
+        for text in pool:
+            if synthesize_pcm(text):
+                count += 1
+    logger.info(f"Pre-synthesized {count} fast-path responses")
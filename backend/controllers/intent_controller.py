@@ -1,16 +1,66 @@
 # backend/controllers/intent_controller.py
 
+import os
+from typing import List
 from fastapi import APIRouter
 from pydantic import BaseModel
-from utils.intent_classifier import IntentClassifier
+from utils.micro_batcher import MicroBatcher
+from utils.model_registry import registry
+from utils.model_workers import remote_loader, runs_in_worker
+from utils.metrics import IN_FLIGHT, INTENT_INFERENCE_SECONDS, INTENT_BATCH_SIZE, Timer
+
+INTENT_MAX_BATCH_SIZE = int(os.getenv("INTENT_MAX_BATCH_SIZE", "32"))
+INTENT_BATCH_WAIT_MS = float(os.getenv("INTENT_BATCH_WAIT_MS", "5"))
 
 class IntentRequest(BaseModel):
     text: str
 
+class IntentBatchRequest(BaseModel):
+    texts: List[str]
+
 router = APIRouter()
-classifier = IntentClassifier()
+
+def load_classifier():
+    # Imported here so an API process serving intent from model workers never loads torch
+    from utils.intent_classifier import IntentClassifier
+
+    return IntentClassifier()
+
+registry.register(
+    "intent",
+    remote_loader("intent") if runs_in_worker("intent") else load_classifier,
+    warmup=lambda classifier: classifier.predict_batch(["Xin chào"]),
+)
+
+def predict_batch(texts: List[str]) -> List[tuple[str, float]]:
+    classifier = registry.get("intent")
+    with IN_FLIGHT.labels("intent").track_inprogress(), Timer() as timer:
+        results = classifier.predict_batch(texts)
+    INTENT_INFERENCE_SECONDS.observe(timer.seconds)
+    INTENT_BATCH_SIZE.observe(len(texts))
+    return results
+
+# Concurrent classify calls are coalesced into one forward pass per batch
+batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=INTENT_MAX_BATCH_SIZE,
+    max_wait_ms=INTENT_BATCH_WAIT_MS,
+    name="intent-batcher",
+)
+
+async def predict_intent(text: str) -> tuple[str, float]:
+    return await batcher.submit(text)
 
 @router.post("/classify")
-def classify_intent(request: IntentRequest):
-    intent = classifier.classify(request.text)
-    return {"intent": intent}
\ No newline at end of file
+async def classify_intent(request: IntentRequest):
+    intent, confidence = await predict_intent(request.text)
+    return {"intent": intent, "confidence": confidence}
+
+@router.post("/classify_batch")
+async def classify_intent_batch(request: IntentBatchRequest):
+    results = await batcher.submit_many(request.texts)
+    return {"intents": [{"intent": intent, "confidence": confidence} for intent, confidence in results]}
+
+@router.get("/stats")
+def intent_stats():
+    return batcher.stats()
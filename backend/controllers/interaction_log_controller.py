@@ -0,0 +1,55 @@
+import os
+import logging
+from starlette.concurrency import run_in_threadpool
+from models.entities import QueryResponse
+from utils.interaction_log import InteractionLogWriter, rollup, utc_timestamp
+from utils.request_context import get_request_id
+
+logger = logging.getLogger("app.interaction_log_controller")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INTERACTION_LOG_ENABLED = os.getenv("INTERACTION_LOG_ENABLED", "1") == "1"
+INTERACTION_LOG_DB = os.getenv("INTERACTION_LOG_DB", os.path.join(BASE_DIR, "..", "..", "rag_app.db"))
+INTERACTION_LOG_MAX_QUEUE = int(os.getenv("INTERACTION_LOG_MAX_QUEUE", "10000"))
+INTERACTION_LOG_BATCH_SIZE = int(os.getenv("INTERACTION_LOG_BATCH_SIZE", "200"))
+INTERACTION_LOG_FLUSH_SECONDS = float(os.getenv("INTERACTION_LOG_FLUSH_SECONDS", "1.0"))
+# "drop" never delays a request; "block" waits briefly for queue space first (off the event
+# loop, so only the turn being logged is delayed)
+INTERACTION_LOG_POLICY = os.getenv("INTERACTION_LOG_POLICY", "drop")
+
+interaction_log = InteractionLogWriter(
+    INTERACTION_LOG_DB,
+    max_queue=INTERACTION_LOG_MAX_QUEUE,
+    batch_size=INTERACTION_LOG_BATCH_SIZE,
+    flush_interval=INTERACTION_LOG_FLUSH_SECONDS,
+    policy=INTERACTION_LOG_POLICY,
+)
+
+async def record_turn(qr: QueryResponse, turn: dict, latency_seconds: float):
+    """
+    Queues one chat turn for application_logs. `turn` carries what the pipeline learned
+    along the way: the answering stage ("model") and the intent classification.
+    """
+    if not INTERACTION_LOG_ENABLED:
+        return
+    response = qr.response if isinstance(qr.response, str) else "\n".join(qr.response)
+    # Rows that do not fit in the queue are dropped and counted in the writer stats
+    await interaction_log.log_async({
+        "session_id": qr.session_id,
+        "user_query": qr.query,
+        "response": response,
+        "model": turn.get("model"),
+        "created_at": utc_timestamp(),
+        "conversation_id": qr.conversation_id,
+        "request_id": get_request_id(),
+        "intent": turn.get("intent"),
+        "intent_confidence": turn.get("intent_confidence"),
+        "response_type": qr.type,
+        "latency_ms": round(latency_seconds * 1000, 1),
+    })
+
+async def interaction_rollup(since: str | None, until: str | None, top_sessions: int) -> dict:
+    result = await run_in_threadpool(rollup, INTERACTION_LOG_DB, since, until, top_sessions)
+    result["writer"] = interaction_log.stats()
+    return result
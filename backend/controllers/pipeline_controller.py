@@ -0,0 +1,79 @@
+import time
+import logging
+from contextlib import aclosing
+from models.entities import QueryInput, QueryResponse
+from controllers.chat_controller import handle_chat, stream_chat, query_response_events
+from controllers.fast_path_controller import answer_fast_path
+from controllers.answer_cache_controller import lookup_answer, store_answer
+from controllers.interaction_log_controller import record_turn
+from controllers.session_controller import load_session, session_conversation_id, has_context, remember_turn
+from utils.metrics import IN_FLIGHT
+
+logger = logging.getLogger("app.pipeline_controller")
+
+async def _start_turn(query_input: QueryInput, conversation_id: str | None) -> tuple[str | None, bool]:
+    """
+    Looks up the session to find the conversation to continue (the cookie's, else the
+    session's) and whether it rules out shared caches.
+    """
+    session = await load_session(query_input.session_id)
+    conversation_id = session_conversation_id(session, conversation_id)
+    return conversation_id, has_context(conversation_id)
+
+async def _ready_answer(query_input: QueryInput, conversation_id: str | None, context: bool, turn: dict) -> QueryResponse | None:
+    """Answers from the templated fast path or the answer cache, or returns None."""
+    qr = await answer_fast_path(query_input, conversation_id=conversation_id, turn=turn)
+    if qr is not None:
+        turn["model"] = "fast_path"
+        return qr
+    qr = await lookup_answer(query_input, conversation_id=conversation_id, has_context=context)
+    if qr is not None:
+        turn["model"] = "answer_cache"
+    return qr
+
+async def answer_query(query_input: QueryInput, conversation_id: str | None) -> QueryResponse:
+    """
+    Runs one chat turn through the full pipeline: templated fast path, then the answer
+    cache, then a blocking Dify generation whose answer is stored in the cache.
+    """
+    start = time.perf_counter()
+    turn = {}
+    with IN_FLIGHT.labels("chat").track_inprogress():
+        conversation_id, context = await _start_turn(query_input, conversation_id)
+        qr = await _ready_answer(query_input, conversation_id, context, turn)
+        if qr is None:
+            turn["model"] = "dify"
+            qr = await handle_chat(query_input, conversation_id=conversation_id)
+            await store_answer(qr, context)
+        await record_turn(qr, turn, time.perf_counter() - start)
+        await remember_turn(qr, turn)
+        return qr
+
+async def answer_events(query_input: QueryInput, conversation_id: str | None):
+    """
+    Streaming counterpart of answer_query; yields stream_chat-style frames.
+    """
+    start = time.perf_counter()
+    turn = {}
+    conversation_id, context = await _start_turn(query_input, conversation_id)
+    ready_qr = await _ready_answer(query_input, conversation_id, context, turn)
+
+    if ready_qr is not None:
+        await record_turn(ready_qr, turn, time.perf_counter() - start)
+        await remember_turn(ready_qr, turn)
+        async for event in query_response_events(ready_qr):
+            yield event
+        return
+
+    turn["model"] = "dify"
+    with IN_FLIGHT.labels("chat").track_inprogress():
+        async with aclosing(stream_chat(query_input, conversation_id=conversation_id)) as events:
+            async for event in events:
+                if event["event"] == "done":
+                    qr = QueryResponse(**{k: v for k, v in event.items() if k != "event"})
+                    await record_turn(qr, turn, time.perf_counter() - start)
+                    await remember_turn(qr, turn)
+                    yield event
+                    await store_answer(qr, context)
+                else:
+                    yield event
@@ -0,0 +1,124 @@
+import os
+import hmac
+import uuid
+import hashlib
+import logging
+import secrets
+from models.entities import QueryInput, QueryResponse
+from utils.session_store import InMemorySessionStore, RedisSessionStore, Session
+
+logger = logging.getLogger("app.session_controller")
+
+# "memory" keeps sessions in this process; "redis" shares them through the Redis service from compose.yaml
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "6"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+# Stored answers are cut to this length; Dify keeps the full conversation itself
+SESSION_MAX_ANSWER_CHARS = int(os.getenv("SESSION_MAX_ANSWER_CHARS", "1000"))
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None
+SESSION_REDIS_PREFIX = os.getenv("SESSION_REDIS_PREFIX", "session:")
+# Signs the session IDs this server issues. Set it when several workers or replicas share
+# the session store; the random per-process default only recognizes its own IDs.
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+if not SESSION_SECRET:
+    logger.warning("SESSION_SECRET is not set; session IDs are signed with a per-process key")
+    SESSION_SECRET = secrets.token_hex(32)
+
+def build_store():
+    if SESSION_STORE == "redis":
+        try:
+            return RedisSessionStore(
+                REDIS_HOST,
+                REDIS_PORT,
+                max_turns=SESSION_MAX_TURNS,
+                ttl_seconds=SESSION_TTL_SECONDS,
+                prefix=SESSION_REDIS_PREFIX,
+                password=REDIS_PASSWORD,
+            )
+        except Exception as e:
+            logger.error(f"Could not use Redis at {REDIS_HOST}:{REDIS_PORT}, falling back to in-memory sessions: {e}")
+    return InMemorySessionStore(
+        max_turns=SESSION_MAX_TURNS,
+        ttl_seconds=SESSION_TTL_SECONDS,
+        max_sessions=SESSION_MAX_SESSIONS,
+        max_bytes=SESSION_MAX_BYTES,
+    )
+
+session_store = build_store()
+
+def _signature(token: str) -> str:
+    return hmac.new(SESSION_SECRET.encode(), token.encode(), hashlib.sha256).hexdigest()[:32]
+
+def new_session_id() -> str:
+    """A fresh session ID of the form "<uuid>.<signature>"."""
+    token = uuid.uuid4().hex
+    return f"{token}.{_signature(token)}"
+
+def is_issued(session_id: str | None) -> bool:
+    """True for session IDs this server signed; anything else is just a client-chosen label."""
+    token, _, signature = (session_id or "").partition(".")
+    return bool(token and signature) and hmac.compare_digest(signature, _signature(token))
+
+def resolve_session_id(query_input: QueryInput, cookie_session_id: str | None) -> str:
+    """The session_id from the request body, else the session cookie, else a new one."""
+    session_id = query_input.session_id or cookie_session_id or new_session_id()
+    query_input.session_id = session_id
+    return session_id
+
+async def load_session(session_id: str | None) -> Session | None:
+    """
+    The stored session, only for IDs this server issued: the body's session_id is
+    client-supplied, so an unsigned one never restores another client's conversation.
+    """
+    if not is_issued(session_id):
+        return None
+    try:
+        return await session_store.get(session_id)
+    except Exception as e:
+        # A session backend outage degrades to stateless chat instead of failing the turn
+        logger.warning(f"Could not load session {session_id}: {type(e).__name__}: {e}")
+        return None
+
+def session_conversation_id(session: Session | None, cookie_conversation_id: str | None) -> str | None:
+    """
+    The conversation to continue. The conversation_id cookie is set by this server for this
+    browser, so it wins; the session's copy serves clients without cookies (the voice
+    socket, API callers) that send back a session_id this server issued and signed.
+    """
+    stored = session.conversation_id if session is not None else None
+    if cookie_conversation_id:
+        if stored and stored != cookie_conversation_id:
+            logger.warning(f"Session {session.session_id} names another conversation than its cookie; using the cookie's")
+        return cookie_conversation_id
+    return stored
+
+def has_context(conversation_id: str | None) -> bool:
+    """
+    True when earlier turns may change the answer, so shared caches must be bypassed.
+    Only Dify turns start a conversation; greetings and cached answers leave none behind.
+    """
+    return bool(conversation_id)
+
+async def remember_turn(qr: QueryResponse, turn: dict):
+    # Unsigned IDs can never load their session back, so there is nothing to keep
+    if not is_issued(qr.session_id):
+        return
+    response = qr.response if isinstance(qr.response, str) else "\n".join(qr.response)
+    metadata = {key: turn[key] for key in ("model", "intent") if turn.get(key)}
+    try:
+        await session_store.record_turn(
+            qr.session_id,
+            qr.conversation_id,
+            qr.query,
+            response[:SESSION_MAX_ANSWER_CHARS],
+            metadata,
+        )
+    except Exception as e:
+        logger.warning(f"Could not store turn for session {qr.session_id}: {type(e).__name__}: {e}")
+
+async def close_session_store():
+    await session_store.close()
@@ -1,15 +1,82 @@
+import os
+import logging
 from fastapi import UploadFile, File, HTTPException
-from llm_models.STT.whisper import transcribe_audio
+from starlette.concurrency import run_in_threadpool
+from models.entities import SpeechToTextModel
+from utils.micro_batcher import BatcherFullError
+from utils.stt_service import TranscriptionService, AudioDecodeError, build_pipeline, decode_audio, read_upload, SAMPLE_RATE
+from utils.model_registry import registry
+from utils.model_workers import remote_loader, runs_in_worker
+import numpy as np
+
+logger = logging.getLogger("app.stt_controller")
+
+STT_MODEL = os.getenv("STT_MODEL", SpeechToTextModel.PHO_WHISPER.value)
+STT_DEVICE = os.getenv("STT_DEVICE", "cpu")
+STT_BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "8"))
+STT_BATCH_WAIT_MS = float(os.getenv("STT_BATCH_WAIT_MS", "20"))
+STT_BATCH_MAX_SECONDS = float(os.getenv("STT_BATCH_MAX_SECONDS", "30"))
+STT_MAX_PENDING = int(os.getenv("STT_MAX_PENDING", "32"))
+STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))
+# Batch size of the separate background queue (long-audio jobs); smaller than STT_BATCH_SIZE
+# so a job's forward pass holds the model for less time while interactive batches wait
+STT_BACKGROUND_BATCH_SIZE = int(os.getenv("STT_BACKGROUND_BATCH_SIZE", str(max(1, STT_BATCH_SIZE // 2))))
+STT_MAX_UPLOAD_BYTES = int(os.getenv("STT_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+STT_RETRY_AFTER_SECONDS = os.getenv("STT_RETRY_AFTER_SECONDS", "2")
+
+registry.register(
+    "stt",
+    remote_loader("stt") if runs_in_worker("stt") else lambda: build_pipeline(STT_MODEL, device=STT_DEVICE),
+    warmup=lambda pipe: pipe({"raw": np.zeros(SAMPLE_RATE, dtype=np.float32), "sampling_rate": SAMPLE_RATE}),
+)
+
+stt_service = TranscriptionService(
+    lambda: registry.get("stt"),
+    batch_size=STT_BATCH_SIZE,
+    batch_wait_ms=STT_BATCH_WAIT_MS,
+    batch_max_seconds=STT_BATCH_MAX_SECONDS,
+    max_pending=STT_MAX_PENDING,
+    num_workers=STT_WORKERS,
+    background_batch_size=STT_BACKGROUND_BATCH_SIZE,
+)
+
+async def transcribe_audio(audio, background: bool = False) -> str:
+    """
+    Transcribes decoded 16 kHz mono audio with the shared model; `background` work
+    takes its own queue so it does not delay interactive requests.
+    Raises HTTPException(503) when the transcription queue is full.
+    """
+    try:
+        return await stt_service.transcribe(audio, background=background)
+    except BatcherFullError as e:
+        logger.warning(f"Rejecting transcription: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription service is busy. Please retry shortly.",
+            headers={"Retry-After": STT_RETRY_AFTER_SECONDS},
+        )
 
 # This is now just a regular function containing your business logic.
 # It does not know it's being used by an API.
-def handle_transcription(file: UploadFile = File(...)):
+async def handle_transcription(file: UploadFile = File(...)):
     """
     Takes an audio file and returns the transcribed text.
     """
     try:
-        text = transcribe_audio(file)
+        data = await read_upload(file, STT_MAX_UPLOAD_BYTES)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=f"Audio file too large: {e}")
+
+    try:
+        audio = await run_in_threadpool(decode_audio, data)
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode audio: {e}")
+
+    try:
+        text = await transcribe_audio(audio)
         return {"text": text}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error during transcription: {e}")
-        raise HTTPException(status_code=500, detail="Audio transcription failed.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Audio transcription failed.")
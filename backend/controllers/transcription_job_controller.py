@@ -0,0 +1,181 @@
+"""
+Asynchronous transcription of long recordings.
+
+submit_job() decodes the upload, splits it on silence into overlapping windows and
+returns a job right away; a background task feeds the windows through transcribe_audio
+(several in flight, so they are batched and, with MODEL_WORKERS=stt, each batch is
+spread over the worker processes) and stitches the results as they land. Clients poll
+the job or follow job_events() for progress and partial text.
+
+Windows go to the STT service's background queue, not the one interactive /transcribe
+and voice clips use, so an hour of audio never fills the batches those are waiting for.
+Both queues still share the model: a job's batch (STT_BACKGROUND_BATCH_SIZE windows)
+runs alongside interactive ones and slows them somewhat, and jobs finish more slowly
+than they would with the model to themselves. STT_JOB_PARALLELISM caps the windows a
+job has in flight; more than one background batch only makes other jobs wait.
+"""
+import os
+import time
+import asyncio
+import logging
+from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
+from controllers.stt_controller import transcribe_audio, STT_BACKGROUND_BATCH_SIZE, STT_BATCH_MAX_SECONDS, STT_RETRY_AFTER_SECONDS
+from utils.long_audio import split_on_silence, stitch_transcripts
+from utils.stt_service import AudioDecodeError, decode_audio, read_upload, SAMPLE_RATE
+from utils.transcription_jobs import (
+    TranscriptionJobStore,
+    TranscriptionJob,
+    JobStoreFullError,
+    RUNNING,
+    DONE,
+    FAILED,
+    CANCELLED,
+)
+
+logger = logging.getLogger("app.transcription_job_controller")
+
+STT_JOB_MAX_UPLOAD_BYTES = int(os.getenv("STT_JOB_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+STT_JOB_MAX_SECONDS = float(os.getenv("STT_JOB_MAX_SECONDS", "3600"))
+# Windows stay under STT_BATCH_MAX_SECONDS so they take the batched short-clip path
+STT_JOB_WINDOW_SECONDS = float(os.getenv("STT_JOB_WINDOW_SECONDS", str(min(25.0, STT_BATCH_MAX_SECONDS))))
+STT_JOB_OVERLAP_SECONDS = float(os.getenv("STT_JOB_OVERLAP_SECONDS", "1.5"))
+STT_JOB_SILENCE_DB = float(os.getenv("STT_JOB_SILENCE_DB", "-45"))
+# Windows in flight per job: one background batch
+STT_JOB_PARALLELISM = int(os.getenv("STT_JOB_PARALLELISM", str(STT_BACKGROUND_BATCH_SIZE)))
+STT_JOB_MAX_ACTIVE = int(os.getenv("STT_JOB_MAX_ACTIVE", "2"))
+STT_JOB_MAX_JOBS = int(os.getenv("STT_JOB_MAX_JOBS", "100"))
+STT_JOB_TTL_SECONDS = float(os.getenv("STT_JOB_TTL_SECONDS", "3600"))
+STT_JOB_RETRIES = int(os.getenv("STT_JOB_RETRIES", "5"))
+STT_JOB_EVENT_HEARTBEAT_SECONDS = float(os.getenv("STT_JOB_EVENT_HEARTBEAT_SECONDS", "15"))
+
+job_store = TranscriptionJobStore(max_jobs=STT_JOB_MAX_JOBS, max_active=STT_JOB_MAX_ACTIVE, ttl_seconds=STT_JOB_TTL_SECONDS)
+
+async def submit_job(file: UploadFile) -> dict:
+    try:
+        data = await read_upload(file, STT_JOB_MAX_UPLOAD_BYTES)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=f"Audio file too large: {e}")
+
+    try:
+        audio = await run_in_threadpool(decode_audio, data)
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode audio: {e}")
+    del data
+
+    duration = len(audio) / SAMPLE_RATE
+    if duration > STT_JOB_MAX_SECONDS:
+        raise HTTPException(status_code=413, detail=f"Audio is {duration:.0f}s long; the limit is {STT_JOB_MAX_SECONDS:.0f}s.")
+
+    windows = await run_in_threadpool(
+        split_on_silence,
+        audio,
+        SAMPLE_RATE,
+        window_s=STT_JOB_WINDOW_SECONDS,
+        overlap_s=STT_JOB_OVERLAP_SECONDS,
+        silence_db=STT_JOB_SILENCE_DB,
+    )
+    try:
+        job = job_store.create(duration, windows, SAMPLE_RATE)
+    except JobStoreFullError as e:
+        logger.warning(f"Rejecting transcription job: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Too many transcription jobs in progress. Please retry later.",
+            headers={"Retry-After": STT_RETRY_AFTER_SECONDS},
+        )
+
+    job.task = asyncio.create_task(run_job(job, audio, windows))
+    logger.info(f"Transcription job {job.job_id}: {duration:.1f}s of audio in {len(windows)} window(s)")
+    return job.to_dict()
+
+async def _transcribe_window(clip) -> str:
+    # A full batcher queue is back-pressure, not failure: wait for room and try again
+    for attempt in range(STT_JOB_RETRIES + 1):
+        try:
+            return await transcribe_audio(clip, background=True)
+        except HTTPException as e:
+            if e.status_code != 503 or attempt == STT_JOB_RETRIES:
+                raise
+            await asyncio.sleep(min(8.0, 0.5 * 2 ** attempt))
+
+async def run_job(job: TranscriptionJob, audio, windows: list):
+    job.status = RUNNING
+    job.started_at = time.time()
+    job.touch()
+    limit = asyncio.Semaphore(STT_JOB_PARALLELISM)
+
+    async def transcribe(index: int, start: int, end: int, silent: bool):
+        async with limit:
+            text = "" if silent else await _transcribe_window(audio[start:end])
+        job.texts[index] = text
+        job.completed += 1
+        # Partial text covers the finished windows up to the first one still running
+        ready = []
+        for done in job.texts:
+            if done is None:
+                break
+            ready.append(done)
+        job.partial_text = stitch_transcripts(ready)
+        job.touch()
+
+    tasks = [asyncio.create_task(transcribe(i, *window)) for i, window in enumerate(windows)]
+    try:
+        await asyncio.gather(*tasks)
+        job.text = stitch_transcripts(job.texts)
+        job.partial_text = job.text
+        job.status = DONE
+    except asyncio.CancelledError:
+        job.status = CANCELLED
+    except Exception as e:
+        logger.error(f"Transcription job {job.job_id} failed: {type(e).__name__}: {e}")
+        job.status = FAILED
+        job.error = e.detail if isinstance(e, HTTPException) else "Audio transcription failed."
+    finally:
+        for task in tasks:
+            task.cancel()
+        job.finished_at = time.time()
+        job.touch()
+        logger.info(f"Transcription job {job.job_id} {job.status} in {job.finished_at - job.started_at:.1f}s")
+
+def get_job(job_id: str, include_windows: bool = False) -> dict:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcription job not found or expired.")
+    return job.to_dict(include_windows)
+
+def cancel_job(job_id: str) -> dict:
+    job = job_store.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcription job not found or expired.")
+    return job.to_dict()
+
+async def job_events(job_id: str):
+    """
+    Yields `progress` events (with the stitched partial text) whenever the job changes,
+    `ping` while nothing does, and a final `done`, `failed` or `cancelled` event.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Transcription job not found or expired.")
+
+    version = -1
+    while True:
+        if job.version != version:
+            version = job.version
+            if job.finished:
+                yield {"event": job.status, **job.to_dict()}
+                return
+            yield {
+                "event": "progress",
+                "job_id": job.job_id,
+                "status": job.status,
+                "progress": job.progress(),
+                "partial_text": job.partial_text,
+            }
+        else:
+            yield {"event": "ping"}
+        await job.watch(version, STT_JOB_EVENT_HEARTBEAT_SECONDS)
+
+def shutdown_jobs():
+    job_store.shutdown()
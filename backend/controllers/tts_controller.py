@@ -1,30 +1,218 @@
-import uuid
 import os
+import time
+import logging
+import struct
 import numpy as np
-import soundfile as sf
-from kokoro import KPipeline
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from utils.audio_cache import AudioCache, make_key, purge_stale_files
+from utils.model_registry import registry
+from utils.model_workers import pool_config, remote_loader, runs_in_worker
+from utils.text_normalizer import chunk_text, normalize_for_speech
+from utils.metrics import IN_FLIGHT, TTS_SYNTHESIS_SECONDS, TTS_REAL_TIME_FACTOR, Timer, cache_stats
 
-# Initialize the Kokoro TTS pipeline for American English
-pipeline = KPipeline(lang_code="a")  # 'a' = American English
+logger = logging.getLogger("app.tts_controller")
+
+def load_pipeline():
+    from kokoro import KPipeline
+
+    # Initialize the Kokoro TTS pipeline for American English
+    return KPipeline(lang_code="a")  # 'a' = American English
+
+def warmup_pipeline(pipeline):
+    for _ in pipeline("Hello.", voice="af_heart"):
+        pass
+
+# MODEL_WORKERS=tts serves Kokoro from a worker process pool through a proxy with the same signature
+registry.register("tts", remote_loader("tts") if runs_in_worker("tts") else load_pipeline, warmup=warmup_pipeline)
+
+SAMPLE_RATE = 24000
 
 OUTPUT_DIR = "tmp"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def synthesize_speech(text: str, voice="af_heart", speed=1.0) -> str:
-    filename = f"kokoro{uuid.uuid4().hex[:8]}.wav"
-    filepath = os.path.join(OUTPUT_DIR, filename)
+STREAM_FORMATS = {
+    "wav": "audio/wav",
+    "pcm": "audio/L16;rate=24000;channels=1",
+}
+
+# Audio cache: in-memory LRU plus an optional on-disk tier (set TTS_CACHE_DISK_DIR="" to disable)
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TTS_CACHE_TTL_SECONDS = float(os.getenv("TTS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+TTS_CACHE_DISK_DIR = os.getenv("TTS_CACHE_DISK_DIR", os.path.join(OUTPUT_DIR, "tts_cache"))
+TTS_CACHE_DISK_MAX_BYTES = int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+# Expired entries are swept at most this often, from cache reads and writes
+TTS_CACHE_SWEEP_SECONDS = float(os.getenv("TTS_CACHE_SWEEP_SECONDS", "60"))
+
+audio_cache = AudioCache(
+    max_bytes=TTS_CACHE_MAX_BYTES,
+    ttl_seconds=TTS_CACHE_TTL_SECONDS,
+    disk_dir=TTS_CACHE_DISK_DIR or None,
+    disk_max_bytes=TTS_CACHE_DISK_MAX_BYTES,
+    sweep_interval_seconds=TTS_CACHE_SWEEP_SECONDS,
+)
+cache_stats.add("tts_audio", audio_cache.stats, {"hit_memory": "hits_memory", "hit_disk": "hits_disk", "miss": "misses"})
+
+# Audio files written per request by earlier versions were never removed
+purge_stale_files(OUTPUT_DIR, ["kokoro*.wav", "gtts_*.mp3"], TTS_CACHE_TTL_SECONDS)
+
+# Text is normalized (markdown, ranges, units, numbers) and cut into length-balanced chunks
+# "vi", "en" or "auto" (Vietnamese when the text has Vietnamese letters)
+TTS_TEXT_LANG = os.getenv("TTS_TEXT_LANG", "auto")
+TTS_CHUNK_TARGET_CHARS = int(os.getenv("TTS_CHUNK_TARGET_CHARS", "180"))
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", "300"))
+# A short first chunk lets streamed audio start sooner
+TTS_FIRST_CHUNK_CHARS = int(os.getenv("TTS_FIRST_CHUNK_CHARS", "80"))
+# Chunks of one request synthesized at once. Above 1 this pays off when Kokoro runs in
+# several model worker processes (MODEL_WORKERS=tts), hence that default.
+TTS_CHUNK_PARALLELISM = int(os.getenv(
+    "TTS_CHUNK_PARALLELISM", str(pool_config("tts")["processes"] if runs_in_worker("tts") else 1)
+))
+TTS_CHUNK_THREADS = int(os.getenv("TTS_CHUNK_THREADS", "16"))
+
+chunk_executor = ThreadPoolExecutor(max_workers=TTS_CHUNK_THREADS, thread_name_prefix="tts-chunk")
+
+def wav_header(data_size: int, sample_rate: int = SAMPLE_RATE, channels: int = 1, bits: int = 16) -> bytes:
+    byte_rate = sample_rate * channels * bits // 8
+    block_align = channels * bits // 8
+    riff_size = min(data_size + 36, 0xFFFFFFFF)
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits)
+        + b"data" + struct.pack("<I", min(data_size, 0xFFFFFFFF))
+    )
+
+def wav_stream_header(sample_rate: int = SAMPLE_RATE, channels: int = 1, bits: int = 16) -> bytes:
+    """
+    RIFF header for a 16-bit PCM WAV of unknown length. The size fields are set to the
+    maximum value, which players treat as "read until the stream ends".
+    """
+    return wav_header(0xFFFFFFFF, sample_rate, channels, bits)
+
+def to_pcm16(audio) -> bytes:
+    samples = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+    return (samples * 32767).astype("<i2").tobytes()
+
+def record_synthesis(mode: str, seconds: float, pcm_bytes: int):
+    TTS_SYNTHESIS_SECONDS.labels(mode).observe(seconds)
+    audio_seconds = pcm_bytes / 2 / SAMPLE_RATE
+    if audio_seconds > 0:
+        TTS_REAL_TIME_FACTOR.labels(mode).observe(seconds / audio_seconds)
+
+def synthesize_chunk(chunk: str, voice="af_heart", speed=1.0) -> bytes:
+    return b"".join(to_pcm16(audio) for _, _, audio in registry.get("tts")(chunk, voice=voice, speed=speed) if audio is not None)
+
+def synthesize_chunks(chunks, voice="af_heart", speed=1.0, parallelism: int = TTS_CHUNK_PARALLELISM):
+    """
+    Yields the PCM of each chunk in order. Up to `parallelism` chunks are synthesized
+    ahead of the one being consumed; a consumer that stops early cancels the rest.
+    """
+    if parallelism <= 1:
+        for chunk in chunks:
+            yield synthesize_chunk(chunk, voice, speed)
+        return
+
+    remaining = iter(chunks)
+    pending = deque(chunk_executor.submit(synthesize_chunk, chunk, voice, speed) for chunk in islice(remaining, parallelism))
+    try:
+        while pending:
+            pcm = pending.popleft().result()
+            following = next(remaining, None)
+            if following is not None:
+                pending.append(chunk_executor.submit(synthesize_chunk, following, voice, speed))
+            yield pcm
+    finally:
+        for future in pending:
+            future.cancel()
+
+def speech_text(text: str) -> str:
+    """normalize_for_speech(), or the raw text on one line if normalization fails."""
+    try:
+        return normalize_for_speech(text, TTS_TEXT_LANG)
+    except Exception:
+        logger.exception("Text normalization failed; synthesizing the raw text")
+        return " ".join(text.split())
+
+def synthesize_pcm(text: str, voice="af_heart", speed=1.0) -> bytes:
+    """
+    Returns 16-bit mono PCM for `text`, served from the audio cache when possible.
+    """
+    speech = speech_text(text)
+    if not speech:
+        return b""
+    key = make_key(speech, voice, speed, SAMPLE_RATE)
+    pcm = audio_cache.get(key)
+    if pcm is not None:
+        return pcm
 
     try:
-        gen = pipeline(text, voice=voice, speed=speed)
-        audio_parts = [audio for _, _, audio in gen]
-        audio = np.concatenate(audio_parts)
-        sf.write(filepath, audio, 24000)
-        return filepath
-    except Exception as e:
-        print(f"[TTS Error] {e}")
-        return ""
+        with IN_FLIGHT.labels("tts").track_inprogress(), Timer() as timer:
+            chunks = chunk_text(speech, target_chars=TTS_CHUNK_TARGET_CHARS, max_chars=TTS_CHUNK_MAX_CHARS)
+            pcm = b"".join(synthesize_chunks(chunks, voice=voice, speed=speed))
+    except Exception:
+        logger.exception("TTS synthesis failed")
+        return b""
+
+    record_synthesis("full", timer.seconds, len(pcm))
+    audio_cache.put(key, pcm)
+    return pcm
+
+def synthesize_speech(text: str, voice="af_heart", speed=1.0) -> bytes:
+    """
+    Returns a complete WAV file for `text` as bytes, or b"" when synthesis fails.
+    """
+    pcm = synthesize_pcm(text, voice=voice, speed=speed)
+    if not pcm:
+        return b""
+    return wav_header(len(pcm)) + pcm
+
+def synthesize_speech_stream(text: str, voice="af_heart", speed=1.0, fmt="wav"):
+    """
+    Yields encoded audio as soon as each text chunk is synthesized, so playback can
+    start after the short first chunk. Nothing is written to disk.
+    """
+    if fmt == "wav":
+        yield wav_stream_header()
+
+    speech = speech_text(text)
+    if not speech:
+        return
+    key = make_key(speech, voice, speed, SAMPLE_RATE)
+    cached = audio_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    # Time spent waiting on the client between chunks is excluded
+    synthesis_seconds = 0.0
+    try:
+        with IN_FLIGHT.labels("tts").track_inprogress():
+            chunks = chunk_text(
+                speech,
+                target_chars=TTS_CHUNK_TARGET_CHARS,
+                max_chars=TTS_CHUNK_MAX_CHARS,
+                first_chars=TTS_FIRST_CHUNK_CHARS,
+            )
+            resumed = time.perf_counter()
+            for chunk in synthesize_chunks(chunks, voice=voice, speed=speed):
+                parts.append(chunk)
+                synthesis_seconds += time.perf_counter() - resumed
+                yield chunk
+                resumed = time.perf_counter()
+            synthesis_seconds += time.perf_counter() - resumed
+    except Exception:
+        # Headers are already sent, so the stream just ends early
+        logger.exception("TTS stream synthesis failed")
+        return
+
+    pcm = b"".join(parts)
+    record_synthesis("stream", synthesis_seconds, len(pcm))
+    # Only complete syntheses are cached; a client disconnect closes the generator before this
+    audio_cache.put(key, pcm)
 
 # Example use
 if __name__ == "__main__":
-    path = synthesize_speech("Hello! This is Kokoro speaking.")
-    print("Audio saved at:", path)
+    wav = synthesize_speech("Hello! This is Kokoro speaking.")
+    print("Synthesized bytes:", len(wav))
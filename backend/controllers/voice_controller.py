@@ -0,0 +1,233 @@
+"""
+Full-duplex voice loop over a WebSocket: VAD -> transcription -> chat -> streaming TTS.
+
+Client -> server
+  binary                               16-bit little-endian mono PCM at 16 kHz, any chunk size
+  {"type": "config", "session_id": ..., "conversation_id": ...}
+  {"type": "end"}                      end the current utterance now (push-to-talk release)
+  {"type": "cancel"}                   stop the response in progress
+
+Server -> client
+  {"type": "session", "session_id": ...}  sent on connect; send it back in "config" to resume later
+  {"type": "vad", "speaking": bool}
+  {"type": "partial", "text": ...}     interim transcript while the user is speaking
+  {"type": "transcript", "text": ...}  final transcript of the utterance
+  {"type": "response_delta", "text": ...}
+  {"type": "response_done", "data": QueryResponse}
+  {"type": "audio_start", "sample_rate": 24000, "format": "pcm16"}
+  binary                               16-bit little-endian mono PCM at 24 kHz, sentence by sentence
+  {"type": "audio_end"}
+  {"type": "interrupted"}              a new utterance (barge-in) cancelled the previous response
+  {"type": "error", "message": ...}
+"""
+import os
+import json
+import asyncio
+import logging
+from fastapi import WebSocket, WebSocketDisconnect, HTTPException
+from starlette.concurrency import run_in_threadpool
+from models.entities import QueryInput
+from controllers.stt_controller import transcribe_audio, stt_service
+from controllers.tts_controller import synthesize_pcm, SAMPLE_RATE as TTS_SAMPLE_RATE
+from controllers.pipeline_controller import answer_events
+from controllers.session_controller import new_session_id, is_issued
+from utils.vad import EnergyVAD
+from utils.text_normalizer import SentenceSplitter
+from utils.long_audio import stitch_transcripts
+from utils.stt_service import SAMPLE_RATE as STT_SAMPLE_RATE
+
+logger = logging.getLogger("app.voice_controller")
+
+VOICE_END_SILENCE_MS = int(os.getenv("VOICE_END_SILENCE_MS", "700"))
+VOICE_MIN_UTTERANCE_MS = int(os.getenv("VOICE_MIN_UTTERANCE_MS", "300"))
+VOICE_PARTIALS = os.getenv("VOICE_PARTIALS", "1") == "1"
+VOICE_PARTIAL_INTERVAL_MS = int(os.getenv("VOICE_PARTIAL_INTERVAL_MS", "1000"))
+# Partials only transcribe this much trailing audio and stitch it onto the previous partial,
+# so each costs the same however long the user talks
+VOICE_PARTIAL_WINDOW_MS = int(os.getenv("VOICE_PARTIAL_WINDOW_MS", "6000"))
+# Partials are skipped while this many clips are already waiting for the STT model
+VOICE_PARTIAL_MAX_BACKLOG = int(os.getenv("VOICE_PARTIAL_MAX_BACKLOG", "1"))
+AUDIO_FRAME_BYTES = 32 * 1024
+
+class VoiceSession:
+    def __init__(self, websocket: WebSocket, conversation_id: str | None = None):
+        self.websocket = websocket
+        self.session_id = new_session_id()
+        self.conversation_id = conversation_id
+        self.vad = EnergyVAD(sample_rate=STT_SAMPLE_RATE, end_silence_ms=VOICE_END_SILENCE_MS)
+
+        self._send_lock = asyncio.Lock()
+        self._turn: asyncio.Task | None = None
+        self._partial: asyncio.Task | None = None
+        self._partial_samples = 0
+        self._partial_text = ""
+
+    async def send_json(self, data: dict):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(data, ensure_ascii=False, default=str))
+
+    async def send_bytes(self, data: bytes):
+        async with self._send_lock:
+            await self.websocket.send_bytes(data)
+
+    async def run(self):
+        try:
+            await self.send_json({"type": "session", "session_id": self.session_id})
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    await self.on_audio(message["bytes"])
+                elif message.get("text") is not None:
+                    await self.on_control(message["text"])
+        except WebSocketDisconnect:
+            pass
+        except Exception:
+            logger.exception(f"Voice session {self.session_id} failed")
+            try:
+                await self.send_json({"type": "error", "message": "Voice session failed."})
+                await self.websocket.close(code=1011)
+            except Exception:
+                pass  # the socket is already gone
+        finally:
+            for task in (self._turn, self._partial):
+                if task and not task.done():
+                    task.cancel()
+            logger.info(f"Voice session {self.session_id} closed")
+
+    async def on_control(self, text: str):
+        try:
+            message = json.loads(text)
+        except json.JSONDecodeError:
+            await self.send_json({"type": "error", "message": "Control messages must be JSON."})
+            return
+
+        kind = message.get("type")
+        if kind == "config":
+            session_id = message.get("session_id")
+            if session_id and not is_issued(session_id):
+                await self.send_json({"type": "error", "message": "Unknown session_id; keeping the one this server issued."})
+            elif session_id:
+                self.session_id = session_id
+            self.conversation_id = message.get("conversation_id") or self.conversation_id
+        elif kind == "end":
+            event = self.vad.flush()
+            if event:
+                await self.send_json({"type": "vad", "speaking": False})
+                await self.finish_utterance(event[1])
+        elif kind == "cancel":
+            await self.barge_in()
+
+    async def on_audio(self, data: bytes):
+        for kind, audio in self.vad.feed(data):
+            if kind == "start":
+                await self.barge_in()
+                self._partial_samples = 0
+                self._partial_text = ""
+                await self.send_json({"type": "vad", "speaking": True})
+            elif kind == "end":
+                await self.send_json({"type": "vad", "speaking": False})
+                await self.finish_utterance(audio)
+
+        if VOICE_PARTIALS and self.vad.speaking:
+            utterance = self.vad.utterance()
+            interval = STT_SAMPLE_RATE * VOICE_PARTIAL_INTERVAL_MS // 1000
+            if len(utterance) - self._partial_samples >= interval and (self._partial is None or self._partial.done()):
+                self._partial_samples = len(utterance)
+                # Final transcripts come first: no interim work while the STT queue is backed up
+                if stt_service.pending() < VOICE_PARTIAL_MAX_BACKLOG:
+                    self._partial = asyncio.create_task(self._send_partial(utterance))
+
+    async def _send_partial(self, utterance):
+        window = STT_SAMPLE_RATE * VOICE_PARTIAL_WINDOW_MS // 1000
+        try:
+            text = await transcribe_audio(utterance[-window:])
+            if len(utterance) > window:
+                # The window overlaps the audio behind the previous partial; keep one copy
+                text = stitch_transcripts([self._partial_text, text], max_words=40)
+            if text and self.vad.speaking:
+                self._partial_text = text
+                await self.send_json({"type": "partial", "text": text})
+        except HTTPException:
+            # Interim results are best effort; skip them when the STT queue is full
+            pass
+        except Exception as e:
+            logger.warning(f"Partial transcription failed: {e}")
+
+    async def barge_in(self):
+        if self._turn and not self._turn.done():
+            self._turn.cancel()
+            try:
+                await self._turn
+            except (asyncio.CancelledError, Exception):
+                pass
+            logger.info(f"Voice session {self.session_id}: response interrupted by new speech")
+            await self.send_json({"type": "interrupted"})
+
+    async def finish_utterance(self, audio):
+        if self._partial and not self._partial.done():
+            self._partial.cancel()
+        if len(audio) < STT_SAMPLE_RATE * VOICE_MIN_UTTERANCE_MS // 1000:
+            return
+        await self.barge_in()
+        # Runs as a task so the receive loop keeps listening for barge-in
+        self._turn = asyncio.create_task(self._run_turn(audio))
+        self._turn.add_done_callback(self._log_turn_failure)
+
+    def _log_turn_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Voice session {self.session_id}: turn failed", exc_info=task.exception())
+
+    async def _run_turn(self, audio):
+        try:
+            text = await transcribe_audio(audio)
+        except HTTPException as e:
+            await self.send_json({"type": "error", "message": e.detail})
+            return
+        except Exception as e:
+            logger.error(f"Voice transcription failed: {e}")
+            await self.send_json({"type": "error", "message": "Audio transcription failed."})
+            return
+
+        if not text:
+            return
+        await self.send_json({"type": "transcript", "text": text})
+
+        sentences: asyncio.Queue = asyncio.Queue()
+        speaker = asyncio.create_task(self._speak(sentences))
+        splitter = SentenceSplitter()
+        streamed = False
+        try:
+            query_input = QueryInput(question=text, session_id=self.session_id)
+            async for event in answer_events(query_input, self.conversation_id):
+                if event["event"] == "delta":
+                    streamed = True
+                    await self.send_json({"type": "response_delta", "text": event["text"]})
+                    for sentence in splitter.feed(event["text"]):
+                        sentences.put_nowait(sentence)
+                elif event["event"] == "done":
+                    data = {k: v for k, v in event.items() if k != "event"}
+                    self.conversation_id = data.get("conversation_id") or self.conversation_id
+                    await self.send_json({"type": "response_done", "data": data})
+                    # Error answers arrive without deltas; speak the final text instead
+                    remaining = splitter.flush() if streamed else splitter.feed(data["response"]) + splitter.flush()
+                    for sentence in remaining:
+                        sentences.put_nowait(sentence)
+            sentences.put_nowait(None)
+            await speaker
+        finally:
+            if not speaker.done():
+                speaker.cancel()
+
+    async def _speak(self, sentences: asyncio.Queue):
+        """Synthesizes sentences as they arrive, overlapping with the rest of the generation."""
+        await self.send_json({"type": "audio_start", "sample_rate": TTS_SAMPLE_RATE, "format": "pcm16"})
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                break
+            pcm = await run_in_threadpool(synthesize_pcm, sentence)
+            for i in range(0, len(pcm), AUDIO_FRAME_BYTES):
+                await self.send_bytes(pcm[i:i + AUDIO_FRAME_BYTES])
+        await self.send_json({"type": "audio_end"})
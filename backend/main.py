@@ -1,25 +1,73 @@
 """
 FastAPI application for document-based RAG system with Qdrant and MongoDB.
 """
+import os
+import queue
+import asyncio
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routes import chat_routes, tts_routes, intent_routes, stt_routes
+from routes import chat_routes, tts_routes, intent_routes, stt_routes, voice_routes, health_routes, metrics_routes, interaction_log_routes, admin_routes
+from routes.health_routes import MODEL_LOAD_MODE, preload_names
 from fastapi.middleware.cors import CORSMiddleware
+from utils.dify_client import close_client
+from controllers.fast_path_controller import FAST_PATH_PRESYNTHESIZE, presynthesize_responses
+from utils.model_registry import registry
+from utils.model_workers import shutdown_pools
+from utils.request_context import RequestContextMiddleware, RequestIdFilter
+from controllers.interaction_log_controller import interaction_log
+from controllers.session_controller import close_session_store
+from controllers.transcription_job_controller import shutdown_jobs
 
 
 # Set up logging
 logger = logging.getLogger('app')
-logger.setLevel('DEBUG')
-file_handler = logging.FileHandler('/Users/yosakoi/Documents/Work/Makeup/logs/app.log')
+logger.setLevel(os.getenv('LOG_LEVEL', 'DEBUG'))
+file_handler = logging.FileHandler(os.getenv('LOG_FILE', '/Users/yosakoi/Documents/Work/Makeup/logs/app.log'))
 console_handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
 file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+# Request handlers only enqueue records; a listener thread does the file and console I/O
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+# Tags each line with the ID of the request that produced it (must run on the request's thread)
+queue_handler.addFilter(RequestIdFilter())
+logger.addHandler(queue_handler)
+log_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+log_listener.start()
+
+# Load models at import so that `gunicorn --preload` forks workers that share the
+# weights copy-on-write instead of each loading its own copy
+if os.getenv("MODELS_PRELOAD_ON_IMPORT", "0") == "1":
+    registry.load_all(preload_names())
+
+def warm_start():
+    if MODEL_LOAD_MODE == "eager":
+        registry.load_all(preload_names())
+    if FAST_PATH_PRESYNTHESIZE:
+        # Fill the TTS cache with the templated answers once the TTS model is up
+        presynthesize_responses()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models load in parallel in the background; /health/ready reports when they are done
+    asyncio.get_running_loop().run_in_executor(None, warm_start)
+    yield
+    # Release pooled upstream connections
+    await close_client()
+    await close_session_store()
+    # Cancel long-audio transcription jobs still running
+    shutdown_jobs()
+    # Stop model worker processes (no-op when every model runs in-process)
+    shutdown_pools()
+    # Flush pending interaction rows and log lines; nothing else is running at this point
+    interaction_log.close()
+    log_listener.stop()
 
 # Initialize fastapi
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Define the exact origins that are allowed to connect.
 origins = [
@@ -33,9 +81,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+app.add_middleware(RequestContextMiddleware)
 
 app.include_router(chat_routes.router, prefix="/routes")
 app.include_router(tts_routes.router, prefix="/routes")
 app.include_router(intent_routes.router, prefix="/routes", tags=["intent"])
-app.include_router(stt_routes.router, prefix="/routes", tags=["stt"])
\ No newline at end of file
+app.include_router(stt_routes.router, prefix="/routes", tags=["stt"])
+app.include_router(voice_routes.router, prefix="/routes", tags=["voice"])
+app.include_router(health_routes.router, tags=["health"])
+app.include_router(metrics_routes.router, tags=["metrics"])
+app.include_router(interaction_log_routes.router, prefix="/routes", tags=["logs"])
+app.include_router(admin_routes.router, prefix="/routes", tags=["admin"])
\ No newline at end of file
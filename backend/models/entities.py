@@ -4,7 +4,7 @@ Entities for systems.
 from pydantic import BaseModel, Field
 from datetime import datetime
 from enum import Enum
-from typing import List, Union
+from typing import List, Optional, Union
 
 class GenerationModelName(str, Enum):
     """Model names for text generation"""
@@ -40,8 +40,8 @@ class QueryResponse(BaseModel):
     response: Union[str, List[str]]
     session_id: str
     query: str
-    conversation_id:str
-    type: str
+    conversation_id: Optional[str] = None
+    type: Optional[str] = None
 
 class Document(BaseModel):
     id: int
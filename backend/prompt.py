@@ -98,3 +98,34 @@ fallback_system_prompt = (
     "về các chủ đề trang điểm hoặc chăm sóc da."
     "Câu trả lời phải là một đoạn văn duy nhất, tự nhiên như đang nói, không phải danh sách hay tài liệu."
 )
+
+
+# Câu trả lời mẫu cho các ý định đơn giản (trả lời trực tiếp, không gọi LLM)
+greeting_responses = [
+    "Xin chào! Rất vui được gặp bạn. Bạn muốn tìm hiểu điều gì về trang điểm hoặc chăm sóc da hôm nay?",
+    "Chào bạn! Mình luôn sẵn sàng hướng dẫn bạn từng bước trang điểm. Bạn muốn bắt đầu với sản phẩm nào?",
+    "Xin chào, mình ở đây để giúp bạn trang điểm tự tin hơn. Bạn có câu hỏi nào về trang điểm hay chăm sóc da không?",
+]
+
+thank_you_responses = [
+    "Không có gì đâu! Nếu bạn cần thêm hướng dẫn về trang điểm hay chăm sóc da, cứ hỏi mình nhé.",
+    "Rất vui vì đã giúp được bạn. Bạn có thể hỏi tiếp bất cứ lúc nào, mình luôn sẵn sàng.",
+    "Cảm ơn bạn nhé! Bạn đang làm rất tốt, nếu cần thêm mẹo nào cứ nói với mình.",
+]
+
+smalltalk_responses = [
+    "Nghe thú vị quá! Nhân tiện, bạn có muốn mình chia sẻ một mẹo trang điểm nhanh cho hôm nay không?",
+    "Mình rất thích trò chuyện cùng bạn. Khi nào bạn sẵn sàng, mình có thể hướng dẫn bạn một bước trang điểm đơn giản.",
+    "Cảm ơn bạn đã chia sẻ. Nếu bạn muốn, chúng ta có thể cùng tìm hiểu về cách chăm sóc da hoặc trang điểm nhé.",
+]
+
+feedback_responses = [
+    "Cảm ơn bạn đã góp ý, điều đó giúp mình hỗ trợ bạn tốt hơn. Bạn có muốn mình giải thích lại phần nào không?",
+    "Mình ghi nhận phản hồi của bạn, cảm ơn bạn rất nhiều. Nếu cần thêm trợ giúp, bạn cứ hỏi mình nhé.",
+    "Cảm ơn bạn đã chia sẻ trải nghiệm. Mình luôn sẵn sàng hướng dẫn thêm nếu bạn cần.",
+]
+
+fallback_responses = [
+    "Mình chưa hiểu rõ ý bạn lắm. Bạn có thể nói cụ thể hơn về sản phẩm hoặc bước trang điểm bạn đang quan tâm không?",
+    "Bạn có thể nói lại câu hỏi một chút được không? Mình muốn chắc chắn sẽ hướng dẫn bạn đúng về trang điểm hoặc chăm sóc da.",
+]
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException
+from utils.admin_auth import require_admin
+from utils.model_registry import registry
+
+# Operator actions; every route needs X-Admin-Token and is disabled while ADMIN_TOKEN is unset
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+@router.post("/models/{name}/reload")
+def reload_model(name: str):
+    """Retries loading a failed model now instead of waiting out its backoff."""
+    if name not in registry.names():
+        raise HTTPException(status_code=404, detail=f"Unknown model '{name}'.")
+    try:
+        registry.reload(name)
+    except Exception:
+        pass  # recorded in the entry state
+    return {name: registry.status()[name]}
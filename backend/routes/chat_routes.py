@@ -1,6 +1,11 @@
 from fastapi import APIRouter, Response, Cookie, Depends
-from controllers.chat_controller import handle_chat
+from fastapi.responses import StreamingResponse
+from controllers.answer_cache_controller import answer_cache
+from controllers.pipeline_controller import answer_query, answer_events
+from controllers.session_controller import session_store, resolve_session_id
+from utils.dify_client import upstream_stats
 from models.entities import QueryInput, QueryResponse
+import json
 import logging
 
 router = APIRouter()
@@ -10,24 +15,12 @@ def get_conversation_id(conversation_id: str | None = Cookie(default=None)) -> s
     logger.info(f"Retrieved conversation_id from cookie: {conversation_id}")
     return conversation_id
 
-@router.post("/chat", response_model=QueryResponse)
-def chat(
-    query_input: QueryInput,
-    response: Response,
-    conversation_id: str | None = Depends(get_conversation_id),
-):
-    logger.info(f"Chat endpoint called with conversation_id: {conversation_id}")
-    
-    # Pass the existing conversation_id (from cookie) to the chat handler
-    qr: QueryResponse = handle_chat(query_input, conversation_id=conversation_id)
-    
-    logger.info(f"Chat handler returned conversation_id: {qr.conversation_id}")
-
-    if qr.conversation_id and (not conversation_id or qr.conversation_id != conversation_id):
-        logger.info(f"Setting conversation_id cookie: {qr.conversation_id}")
+def set_conversation_cookie(response: Response, new_conversation_id: str | None, conversation_id: str | None):
+    if new_conversation_id and (not conversation_id or new_conversation_id != conversation_id):
+        logger.info(f"Setting conversation_id cookie: {new_conversation_id}")
         response.set_cookie(
             key="conversation_id",
-            value=qr.conversation_id,
+            value=new_conversation_id,
             httponly=True,
             secure=False,      # Keep False for HTTP (localhost) development
             samesite="Lax",    # 'Lax' is fine for dev now that CORS is handled
@@ -36,6 +29,85 @@ def chat(
     else:
         logger.info(f"Not setting cookie - conversation_id unchanged or missing")
 
+def get_session_cookie(session_id: str | None = Cookie(default=None)) -> str | None:
+    return session_id
+
+def set_session_cookie(response: Response, session_id: str, cookie_session_id: str | None):
+    # Lets clients that do not send a session_id keep one session across requests
+    if session_id != cookie_session_id:
+        response.set_cookie(key="session_id", value=session_id, httponly=True, secure=False, samesite="Lax", path="/")
+
+def to_sse(event: dict) -> str:
+    name = event.get("event", "message")
+    data = {k: v for k, v in event.items() if k != "event"}
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@router.post("/chat", response_model=QueryResponse)
+async def chat(
+    query_input: QueryInput,
+    response: Response,
+    conversation_id: str | None = Depends(get_conversation_id),
+    cookie_session_id: str | None = Depends(get_session_cookie),
+):
+    logger.info(f"Chat endpoint called with conversation_id: {conversation_id}")
+    session_id = resolve_session_id(query_input, cookie_session_id)
+
+    # Trivial intents and cached answers skip Dify; everything else goes to the chat handler
+    qr: QueryResponse = await answer_query(query_input, conversation_id=conversation_id)
+
+    logger.info(f"Chat handler returned conversation_id: {qr.conversation_id}")
+
+    set_conversation_cookie(response, qr.conversation_id, conversation_id)
+    set_session_cookie(response, session_id, cookie_session_id)
+
     return qr
 
-    return qr
\ No newline at end of file
+@router.post("/chat/stream")
+async def chat_stream(
+    query_input: QueryInput,
+    conversation_id: str | None = Depends(get_conversation_id),
+    cookie_session_id: str | None = Depends(get_session_cookie),
+):
+    """
+    Server-sent events variant of /chat. Emits `start`, `delta`, `type` and a final `done`
+    frame carrying the full QueryResponse.
+    """
+    logger.info(f"Chat stream endpoint called with conversation_id: {conversation_id}")
+    session_id = resolve_session_id(query_input, cookie_session_id)
+
+    events = answer_events(query_input, conversation_id=conversation_id)
+
+    # Wait for the first frame so the cookie can be set before the headers go out.
+    # Dify reports conversation_id with its first event, so this does not delay the first delta.
+    first = await anext(events)
+
+    async def body():
+        try:
+            yield to_sse(first)
+            async for event in events:
+                yield to_sse(event)
+        finally:
+            await events.aclose()
+
+    response = StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    set_conversation_cookie(response, first.get("conversation_id"), conversation_id)
+    set_session_cookie(response, session_id, cookie_session_id)
+    return response
+
+@router.get("/chat/cache")
+def chat_cache_stats():
+    return answer_cache.stats()
+
+@router.get("/chat/sessions")
+def chat_session_stats():
+    """Session store size, hit/miss counts and evictions."""
+    return session_store.stats()
+
+@router.get("/chat/upstream")
+def chat_upstream_stats():
+    """Dify circuit breaker state, concurrency limiter and retry/hedging settings."""
+    return upstream_stats()
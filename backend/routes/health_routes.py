@@ -0,0 +1,45 @@
+import os
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from utils.model_registry import registry
+from utils.model_workers import worker_stats
+
+router = APIRouter()
+
+# "eager" loads every registered model in the background at startup; "lazy" loads each on first use
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager")
+# Comma-separated subset of models to preload in eager mode (default: all registered)
+MODELS_PRELOAD = [name.strip() for name in os.getenv("MODELS_PRELOAD", "").split(",") if name.strip()]
+# Models that must be loaded before /health/ready reports ready (default: the preloaded ones not registered as optional)
+HEALTH_REQUIRED_MODELS = [name.strip() for name in os.getenv("HEALTH_REQUIRED_MODELS", "").split(",") if name.strip()]
+
+def preload_names() -> list:
+    return MODELS_PRELOAD or registry.names()
+
+def required_models() -> list:
+    if HEALTH_REQUIRED_MODELS:
+        return HEALTH_REQUIRED_MODELS
+    if MODEL_LOAD_MODE != "eager":
+        return []
+    required = set(registry.required_names())
+    return [name for name in preload_names() if name in required]
+
+@router.get("/health")
+@router.get("/health/live")
+def liveness():
+    """The process is up and serving requests; models may still be loading."""
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+def readiness():
+    """200 once every required model is loaded and warmed up, 503 until then."""
+    required = required_models()
+    ready = registry.is_ready(required)
+    body = {
+        "status": "ready" if ready else "loading",
+        "required": required,
+        "models": registry.status(),
+        "model_workers": worker_stats(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
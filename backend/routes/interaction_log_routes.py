@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, Query
+from controllers.interaction_log_controller import interaction_rollup
+from utils.admin_auth import require_admin
+
+router = APIRouter()
+
+@router.get("/logs/rollup", dependencies=[Depends(require_admin)])
+async def logs_rollup(
+    since: str | None = Query(default=None, description='UTC lower bound, e.g. "2025-01-31" or "2025-01-31 08:00:00"'),
+    until: str | None = Query(default=None, description="UTC upper bound (exclusive)"),
+    top_sessions: int = Query(default=20, ge=1, le=500),
+):
+    """Turns per session, latency per answering stage and intent distribution. Needs X-Admin-Token."""
+    return await interaction_rollup(since, until, top_sessions)
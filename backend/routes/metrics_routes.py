@@ -0,0 +1,22 @@
+import os
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, generate_latest
+from utils.metrics import LOCAL_COLLECTORS
+
+router = APIRouter()
+
+@router.get("/metrics")
+def metrics():
+    # With several worker processes, set PROMETHEUS_MULTIPROC_DIR so every worker's samples are merged
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # Cache counters and the circuit state are not shared between workers; these come
+        # from whichever worker serves this scrape
+        for collector in LOCAL_COLLECTORS:
+            registry.register(collector)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
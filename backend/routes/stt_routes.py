@@ -1,8 +1,50 @@
 from fastapi import APIRouter, UploadFile, File
-from controllers.stt_controller import handle_transcription
+from fastapi.responses import StreamingResponse
+from controllers.stt_controller import handle_transcription, stt_service
+from controllers.transcription_job_controller import submit_job, get_job, cancel_job, job_events, job_store
+from routes.chat_routes import to_sse
 
 router = APIRouter()
 
 @router.post("/transcribe")
-def transcribe_endpoint(file: UploadFile = File(...)):
-    return handle_transcription(file)
\ No newline at end of file
+async def transcribe_endpoint(file: UploadFile = File(...)):
+    return await handle_transcription(file)
+
+@router.get("/transcribe/stats")
+def transcribe_stats():
+    return {**stt_service.stats(), "jobs": job_store.stats()}
+
+@router.post("/transcribe/jobs", status_code=202)
+async def submit_transcription_job(file: UploadFile = File(...)):
+    """Starts transcribing a long recording; poll the job or follow its events for the result."""
+    return await submit_job(file)
+
+@router.get("/transcribe/jobs/{job_id}")
+def transcription_job(job_id: str, windows: bool = False):
+    return get_job(job_id, include_windows=windows)
+
+@router.delete("/transcribe/jobs/{job_id}")
+def cancel_transcription_job(job_id: str):
+    """Cancels a job in progress; it stays pollable as "cancelled" until it expires."""
+    return cancel_job(job_id)
+
+@router.get("/transcribe/jobs/{job_id}/events")
+async def transcription_job_events(job_id: str):
+    """Server-sent `progress` events with partial text, then `done`, `failed` or `cancelled`."""
+    events = job_events(job_id)
+    # Raises 404 here, before the stream starts, for unknown jobs
+    first = await anext(events)
+
+    async def body():
+        try:
+            yield to_sse(first)
+            async for event in events:
+                yield to_sse(event)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Form
-from fastapi.responses import FileResponse
-from controllers.tts_controller import synthesize_speech
+from fastapi import APIRouter, Form, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from controllers.tts_controller import synthesize_speech, synthesize_speech_stream, audio_cache, STREAM_FORMATS
 from pydantic import BaseModel
 # from models.entities import Message
 
@@ -12,5 +12,31 @@ class SynthesizeRequest(BaseModel):
 # 2. Update your endpoint to expect an instance of this model.
 @router.post("/synthesize")
 def synthesize_endpoint(text: str = Form(...)):
-    filepath = synthesize_speech(text)
-    return FileResponse(filepath, media_type="audio/wav", filename=filepath.split("/")[-1])
+    audio = synthesize_speech(text)
+    if not audio:
+        raise HTTPException(status_code=500, detail="Speech synthesis failed.")
+    return Response(
+        content=audio,
+        media_type="audio/wav",
+        headers={"Content-Disposition": 'attachment; filename="speech.wav"'},
+    )
+
+
+@router.post("/synthesize/stream")
+def synthesize_stream_endpoint(text: str = Form(...), format: str = Form("wav")):
+    """
+    Streams audio segment by segment as chunked 16-bit mono PCM, either inside a WAV
+    container of unknown length (`wav`) or raw (`pcm`).
+    """
+    if format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'. Use one of: {', '.join(STREAM_FORMATS)}")
+    return StreamingResponse(
+        synthesize_speech_stream(text, fmt=format),
+        media_type=STREAM_FORMATS[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/synthesize/cache")
+def synthesize_cache_stats():
+    return audio_cache.stats()
@@ -0,0 +1,10 @@
+from fastapi import APIRouter, WebSocket
+from controllers.voice_controller import VoiceSession
+
+router = APIRouter()
+
+@router.websocket("/voice")
+async def voice_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    session = VoiceSession(websocket, conversation_id=websocket.cookies.get("conversation_id"))
+    await session.run()
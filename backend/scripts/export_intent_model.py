@@ -0,0 +1,198 @@
+# backend/scripts/export_intent_model.py
+"""
+Exports the fine-tuned intent model to ONNX and compares the available CPU backends.
+
+For every backend (torch, quantized, onnx) this reports label agreement with the
+full-precision model on a sample set, single-text latency, batch throughput and
+resident memory. Each backend is measured in a fresh process so RSS numbers are not
+polluted by the others. Exits non-zero when a backend's agreement is below --threshold.
+
+Run from the backend folder:
+    python -m scripts.export_intent_model --export-onnx --samples samples.txt
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.intent_classifier import IntentClassifier, default_model_path, MAX_LENGTH  # noqa: E402
+from utils.intent_backends import BACKENDS, ONNX_FILENAME  # noqa: E402
+
+DEFAULT_SAMPLES = [
+    "Xin chào",
+    "Chào bạn, hôm nay bạn thế nào?",
+    "Cảm ơn bạn nhiều nhé",
+    "Cảm ơn, hướng dẫn rất hữu ích",
+    "Làm sao để thoa kem nền cho da dầu?",
+    "Tôi nên dùng phấn phủ dạng bột hay dạng nén?",
+    "Cách kẻ eyeliner khi không nhìn thấy gương?",
+    "Son lì có làm khô môi không?",
+    "Tôi có nên dùng kem lót trước khi trang điểm không?",
+    "Hôm nay trời đẹp quá",
+    "Bạn thích màu gì?",
+    "Ứng dụng này dùng khá tốt",
+    "Hướng dẫn lúc nãy hơi khó hiểu",
+    "Ừm",
+    "Mua vé máy bay ở đâu?",
+    "How do I apply foundation for oily skin?",
+    "Thanks a lot!",
+    "Hello there",
+]
+
+
+def read_rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def export_onnx(model_path: str, onnx_path: str, opset: int):
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+
+    sample = tokenizer(DEFAULT_SAMPLES[:2], return_tensors="pt", padding=True, truncation=True, max_length=MAX_LENGTH)
+    input_names = list(sample.keys())
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *args):
+            return self.inner(**dict(zip(input_names, args))).logits
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            LogitsOnly(model),
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"Exported ONNX model to {onnx_path}")
+
+
+def measure_backend(backend: str, model_path: str, samples: list, batch_size: int, repeats: int) -> dict:
+    rss_start = read_rss_kb()
+    load_start = time.perf_counter()
+    classifier = IntentClassifier(backend=backend, model_path=model_path)
+    load_seconds = time.perf_counter() - load_start
+    rss_loaded = read_rss_kb()
+
+    classifier.classify_batch(samples[:1])  # warmup
+
+    labels = []
+    for i in range(0, len(samples), batch_size):
+        labels.extend(classifier.classify_batch(samples[i:i + batch_size]))
+
+    single = []
+    for _ in range(repeats):
+        for text in samples:
+            start = time.perf_counter()
+            classifier.predict_batch([text])
+            single.append((time.perf_counter() - start) * 1000)
+
+    batch_start = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(samples), batch_size):
+            classifier.predict_batch(samples[i:i + batch_size])
+    batch_seconds = time.perf_counter() - batch_start
+
+    single.sort()
+    return {
+        "backend": backend,
+        "labels": labels,
+        "load_seconds": round(load_seconds, 3),
+        "latency_ms_p50": round(statistics.median(single), 2),
+        "latency_ms_p95": round(single[int(0.95 * (len(single) - 1))], 2),
+        "batch_throughput_per_s": round(repeats * len(samples) / batch_seconds, 1),
+        "rss_model_mb": round((rss_loaded - rss_start) / 1024, 1),
+        "rss_total_mb": round(read_rss_kb() / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", default=default_model_path())
+    parser.add_argument("--export-onnx", action="store_true", help=f"export <model-path>/{ONNX_FILENAME} before measuring")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--samples", help="text file with one sample per line (defaults to a built-in set)")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated backends to compare")
+    parser.add_argument("--threshold", type=float, default=0.98, help="minimum label agreement with the torch backend")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.export_onnx:
+        export_onnx(args.model_path, os.path.join(args.model_path, ONNX_FILENAME), args.opset)
+
+    samples = DEFAULT_SAMPLES
+    if args.samples:
+        with open(args.samples, encoding="utf-8") as f:
+            samples = [line.strip() for line in f if line.strip()]
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "torch" not in backends:
+        backends.insert(0, "torch")
+
+    # One fresh process per backend so memory is measured in isolation
+    ctx = mp.get_context("spawn")
+    results = {}
+    for backend in backends:
+        with ctx.Pool(1) as pool:
+            try:
+                results[backend] = pool.apply(measure_backend, (backend, args.model_path, samples, args.batch_size, args.repeats))
+            except Exception as e:
+                print(f"Skipping backend '{backend}': {e}", file=sys.stderr)
+
+    if "torch" not in results:
+        print("The torch reference backend could not be measured.", file=sys.stderr)
+        sys.exit(2)
+
+    reference = results["torch"]["labels"]
+    failed = False
+    for backend, result in results.items():
+        labels = result.pop("labels")
+        result["agreement"] = round(sum(a == b for a, b in zip(labels, reference)) / len(reference), 4)
+        result["passed"] = result["agreement"] >= args.threshold
+        failed = failed or not result["passed"]
+
+    if args.json:
+        print(json.dumps(list(results.values()), indent=2))
+    else:
+        header = f"{'backend':<10} {'agree':>7} {'p50 ms':>8} {'p95 ms':>8} {'batch/s':>9} {'load s':>7} {'model MB':>9} {'RSS MB':>8}"
+        print(header)
+        print("-" * len(header))
+        for r in results.values():
+            print(
+                f"{r['backend']:<10} {r['agreement']:>7.2%} {r['latency_ms_p50']:>8} {r['latency_ms_p95']:>8} "
+                f"{r['batch_throughput_per_s']:>9} {r['load_seconds']:>7} {r['rss_model_mb']:>9} {r['rss_total_mb']:>8}"
+                + ("" if r["passed"] else "  < threshold")
+            )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
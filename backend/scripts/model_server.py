@@ -0,0 +1,70 @@
+# backend/scripts/model_server.py
+"""
+Serves model worker pools to any number of API processes on the same host.
+
+Every family listed starts its own pool (sized by MODEL_WORKER_PROCESSES_<FAMILY>,
+MODEL_WORKER_CORES_<FAMILY> and MODEL_WORKER_THREADS_<FAMILY>) and loads its model once
+per worker. API processes started with MODEL_WORKERS=<families> and
+MODEL_WORKERS_ADDRESS=<host>:<port> send requests here instead of loading the models,
+so uvicorn/gunicorn workers can be added without another copy of every model. Audio
+still moves through shared memory, which is why the server must run on the API host.
+
+The connection is authenticated with MODEL_WORKERS_AUTHKEY, which server and API
+processes must share. Requests are unpickled, so the key is what stands between the
+port and code execution: generate one per deployment, e.g.
+    export MODEL_WORKERS_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+
+Run from the backend folder:
+    MODEL_WORKER_PROCESSES_TTS=2 MODEL_WORKER_CORES_TTS=0-3 \\
+        MODEL_WORKERS_AUTHKEY=... python -m scripts.model_server --families tts,stt,intent --port 50051
+"""
+import os
+import sys
+import argparse
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.model_workers import (  # noqa: E402
+    MODEL_WORKERS,
+    MODEL_WORKERS_AUTHKEY,
+    MIN_AUTHKEY_BYTES,
+    ModelServer,
+    ModelServerManager,
+    ModelWorkerPool,
+    pool_config,
+)
+
+logger = logging.getLogger("app.model_server")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--families", default=",".join(sorted(MODEL_WORKERS)) or "tts,stt,intent")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=50051)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    if len(MODEL_WORKERS_AUTHKEY) < MIN_AUTHKEY_BYTES:
+        parser.error(f"MODEL_WORKERS_AUTHKEY must be set to a secret of at least {MIN_AUTHKEY_BYTES} bytes")
+
+    pools = {}
+    try:
+        for family in [name.strip() for name in args.families.split(",") if name.strip()]:
+            pools[family] = ModelWorkerPool(family, **pool_config(family))
+            pools[family].start()
+
+        server = ModelServer(pools)
+        ModelServerManager.register("model_server", callable=lambda: server)
+        manager = ModelServerManager(address=(args.host, args.port), authkey=MODEL_WORKERS_AUTHKEY)
+        logger.info(f"Serving {', '.join(pools)} on {args.host}:{args.port}")
+        manager.get_server().serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
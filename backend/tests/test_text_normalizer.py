@@ -0,0 +1,108 @@
+# backend/tests/test_text_normalizer.py
+"""
+Run from the backend folder:
+    python -m unittest discover tests        (or: python -m pytest tests)
+"""
+import unittest
+
+from utils.text_normalizer import canonical_key, chunk_text, normalize_for_speech, split_sentences, vi_number
+
+
+class VietnameseNumbersTest(unittest.TestCase):
+    def test_vi_number(self):
+        self.assertEqual(vi_number(0), "không")
+        self.assertEqual(vi_number(15), "mười lăm")
+        self.assertEqual(vi_number(21), "hai mươi mốt")
+        self.assertEqual(vi_number(105), "một trăm linh năm")
+        self.assertEqual(vi_number(2024), "hai nghìn không trăm hai mươi tư")
+        self.assertEqual(vi_number(1_000_000), "một triệu")
+
+    def test_thousands_separators_and_decimals(self):
+        self.assertEqual(normalize_for_speech("Giá 1.500.000 một bộ", "vi"), "Giá một triệu năm trăm nghìn một bộ.")
+        self.assertEqual(normalize_for_speech("Dùng 3,5 ml", "vi"), "Dùng ba phẩy năm mi li lít.")
+
+    def test_numbers_beyond_range_are_read_digit_by_digit(self):
+        self.assertEqual(
+            normalize_for_speech("Giá 1.000.000.000.000 đồng", "vi"),
+            "Giá một " + "không " * 12 + "đồng.",
+        )
+        self.assertEqual(
+            normalize_for_speech("số 1234567890123,5", "vi"),
+            "số một hai ba bốn năm sáu bảy tám chín không một hai ba phẩy năm.",
+        )
+
+
+class RangeTest(unittest.TestCase):
+    def test_ranges(self):
+        self.assertEqual(normalize_for_speech("Thoa 20-40 giây", "vi"), "Thoa hai mươi đến bốn mươi giây.")
+        self.assertEqual(normalize_for_speech("Giảm 10 - 20%", "vi"), "Giảm mười đến hai mươi phần trăm.")
+        self.assertEqual(normalize_for_speech("wait 20-40 s", "en"), "wait 20 to 40 seconds.")
+
+    def test_phone_numbers_are_not_ranges(self):
+        self.assertEqual(
+            normalize_for_speech("Gọi 0912-345-678", "vi"),
+            "Gọi không chín một hai, ba bốn năm, sáu bảy tám.",
+        )
+        self.assertEqual(normalize_for_speech("Call 0912-345-678", "en"), "Call 0912-345-678.")
+
+    def test_dates_are_not_ranges(self):
+        expected = "Hẹn ngày mười hai tháng năm năm hai nghìn không trăm hai mươi tư."
+        self.assertEqual(normalize_for_speech("Hẹn ngày 12-5-2024", "vi"), expected)
+        self.assertEqual(normalize_for_speech("Hẹn 12/5/2024", "vi"), expected)
+        self.assertEqual(normalize_for_speech("Due 12-5-2024", "en"), "Due 12-5-2024.")
+
+
+class DatesTimesCurrencyTest(unittest.TestCase):
+    def test_short_date_and_fraction(self):
+        self.assertEqual(normalize_for_speech("Sale ngày 12/5", "vi"), "Sale ngày mười hai tháng năm.")
+        self.assertEqual(normalize_for_speech("Pha 1/2 thìa", "vi"), "Pha một phần hai thìa.")
+
+    def test_times(self):
+        self.assertEqual(normalize_for_speech("Mở cửa 8:30", "vi"), "Mở cửa tám giờ ba mươi phút.")
+        self.assertEqual(normalize_for_speech("Đóng cửa 21h", "vi"), "Đóng cửa hai mươi mốt giờ.")
+        self.assertEqual(normalize_for_speech("Từ 8h30 sáng", "vi"), "Từ tám giờ ba mươi phút sáng.")
+        self.assertEqual(normalize_for_speech("Open at 8:30", "en"), "Open at 8:30.")
+
+    def test_currency(self):
+        self.assertEqual(normalize_for_speech("Giá 150.000đ", "vi"), "Giá một trăm năm mươi nghìn đồng.")
+        self.assertEqual(normalize_for_speech("Combo 150k", "vi"), "Combo một trăm năm mươi nghìn.")
+        self.assertEqual(normalize_for_speech("Chỉ 2.000.000 VND", "vi"), "Chỉ hai triệu đồng.")
+        self.assertEqual(normalize_for_speech("Từ 100.000-200.000đ", "vi"), "Từ một trăm nghìn đến hai trăm nghìn đồng.")
+
+
+class MarkupAndLanguageTest(unittest.TestCase):
+    def test_markup_is_stripped(self):
+        text = "## Bước 1\n- **Làm sạch** da 😊\n- Xem [hướng dẫn](https://example.com)"
+        self.assertEqual(normalize_for_speech(text, "vi"), "Bước một. Làm sạch da. Xem hướng dẫn.")
+
+    def test_json_answer_is_unwrapped(self):
+        self.assertEqual(normalize_for_speech('```json\n{"response": "Chào bạn", "type": "text"}\n```'), "Chào bạn.")
+
+    def test_auto_language(self):
+        self.assertEqual(normalize_for_speech("Ngày 12/5/2024 và sau đó"), "Ngày mười hai tháng năm năm hai nghìn không trăm hai mươi tư và sau đó.")
+        self.assertEqual(normalize_for_speech("Apply 2 layers"), "Apply 2 layers.")
+
+
+class CanonicalKeyTest(unittest.TestCase):
+    def test_equivalent_questions_share_a_key(self):
+        self.assertEqual(canonical_key("Giá 150.000đ?"), canonical_key("giá một trăm năm mươi nghìn đồng"))
+        self.assertEqual(canonical_key("**Son lì** có khô môi không?"), canonical_key("son lì có khô môi không"))
+
+    def test_different_numbers_differ(self):
+        self.assertNotEqual(canonical_key("Giá 150k"), canonical_key("Giá 250k"))
+
+
+class SegmentationTest(unittest.TestCase):
+    def test_abbreviations_do_not_end_sentences(self):
+        self.assertEqual(split_sentences("Dùng son, phấn v.v. rất tiện. Xong."), ["Dùng son, phấn v.v. rất tiện.", "Xong."])
+
+    def test_chunks_are_bounded_and_lossless(self):
+        text = " ".join(f"Câu số {i} nói về cách chăm sóc da mỗi ngày." for i in range(30))
+        chunks = chunk_text(text, target_chars=120, max_chars=200, first_chars=60)
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        self.assertLessEqual(len(chunks[0]), 60)
+        self.assertEqual(" ".join(chunks), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+# backend/tests/test_vad.py
+"""
+Run from the backend folder:
+    python -m unittest discover tests        (or: python -m pytest tests)
+"""
+import unittest
+
+import numpy as np
+
+from utils.vad import EnergyVAD
+
+SAMPLE_RATE = 16000
+
+
+def pcm16(seconds: float, amplitude: float) -> bytes:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t) * 32767).astype("<i2").tobytes()
+
+
+class OddChunkTest(unittest.TestCase):
+    def test_odd_sized_chunk_does_not_raise(self):
+        vad = EnergyVAD(sample_rate=SAMPLE_RATE)
+        self.assertEqual(vad.feed(b"\x00" * 3201), [])
+        self.assertEqual(vad.feed(b"\x00" * 3199), [])
+
+    def test_odd_chunks_match_whole_stream(self):
+        audio = pcm16(0.5, 0.0) + pcm16(1.0, 0.5) + pcm16(1.0, 0.0)
+
+        whole = EnergyVAD(sample_rate=SAMPLE_RATE).feed(audio)
+
+        vad = EnergyVAD(sample_rate=SAMPLE_RATE)
+        split = []
+        for offset in range(0, len(audio), 1001):
+            split += vad.feed(audio[offset:offset + 1001])
+
+        self.assertEqual([kind for kind, _ in split], ["start", "end"])
+        self.assertEqual([kind for kind, _ in whole], ["start", "end"])
+        np.testing.assert_array_equal(split[1][1], whole[1][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+# backend/utils/admin_auth.py
+
+import os
+import hmac
+from fastapi import Header, HTTPException
+
+# Shared secret for operator endpoints (log rollups, model reloads). Unset disables them.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)):
+    """
+    FastAPI dependency for operator-only routes: the request must carry
+    `X-Admin-Token: $ADMIN_TOKEN`. Without ADMIN_TOKEN the routes answer 404.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
@@ -0,0 +1,269 @@
+# backend/utils/answer_cache.py
+
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, List
+import numpy as np
+from utils.text_normalizer import canonical_key
+
+logger = logging.getLogger("app.answer_cache")
+
+
+
+def normalize_query(text: str) -> str:
+    """
+    Exact-match key of a question: its lower-cased, punctuation-free spoken form, so
+    markdown, emoji and "2" vs "hai" do not split one question into several entries.
+    Falls back to the lower-cased raw text if normalization fails.
+    """
+    try:
+        return canonical_key(text)
+    except Exception:
+        logger.exception("Query normalization failed; keying on the raw text")
+        return " ".join(text.lower().split())
+
+
+class InMemoryVectorIndex:
+    """
+    Brute-force cosine index over unit vectors held in one preallocated matrix.
+    Suitable for the few thousand entries an answer cache holds.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._vectors: np.ndarray | None = None
+        self._keys: List[str | None] = [None] * capacity
+        self._slots: dict[str, int] = {}
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def add(self, key: str, vector: np.ndarray):
+        if self._vectors is None:
+            self._vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+        if key in self._slots:
+            slot = self._slots[key]
+        elif self._free:
+            slot = self._free.pop()
+        else:
+            return
+        self._vectors[slot] = vector
+        self._keys[slot] = key
+        self._slots[key] = slot
+
+    def remove(self, key: str):
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._vectors[slot] = 0.0
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def search(self, vector: np.ndarray) -> tuple[str | None, float]:
+        if self._vectors is None or not self._slots:
+            return None, 0.0
+        # Empty slots are zero vectors, so they score 0 and never beat a real match
+        scores = self._vectors @ vector
+        best = int(np.argmax(scores))
+        return self._keys[best], float(scores[best])
+
+
+class QdrantVectorIndex:
+    """
+    Vector index stored in a Qdrant collection (see the qdrant service in compose.yaml).
+    Points carry their creation time, and points older than `ttl_seconds` (left behind
+    by earlier runs, whose cache entries died with the process) are deleted on startup.
+    """
+
+    def __init__(self, url: str, collection: str, ttl_seconds: float = 0):
+        from qdrant_client import QdrantClient
+
+        self.client = QdrantClient(url=url)
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self._ready = False
+        if ttl_seconds > 0:
+            try:
+                self.prune(time.time() - ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Could not prune expired points from {collection}: {e}")
+
+    def prune(self, cutoff: float):
+        """Deletes points created before `cutoff`, and points without a creation time."""
+        from qdrant_client.models import FieldCondition, Filter, FilterSelector, IsEmptyCondition, PayloadField, Range
+
+        if not self.client.collection_exists(self.collection):
+            return
+        stale = Filter(should=[
+            FieldCondition(key="created_at", range=Range(lt=cutoff)),
+            IsEmptyCondition(is_empty=PayloadField(key="created_at")),
+        ])
+        self.client.delete(self.collection, points_selector=FilterSelector(filter=stale))
+
+    def _point_id(self, key: str) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+    def _ensure_collection(self, dim: int):
+        if self._ready:
+            return
+        from qdrant_client.models import Distance, VectorParams
+
+        if not self.client.collection_exists(self.collection):
+            self.client.create_collection(self.collection, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+        self._ready = True
+
+    def add(self, key: str, vector: np.ndarray):
+        from qdrant_client.models import PointStruct
+
+        self._ensure_collection(vector.shape[0])
+        self.client.upsert(self.collection, points=[PointStruct(id=self._point_id(key), vector=vector.tolist(), payload={"key": key, "created_at": time.time()})])
+
+    def remove(self, key: str):
+        from qdrant_client.models import PointIdsList
+
+        if self._ready:
+            self.client.delete(self.collection, points_selector=PointIdsList(points=[self._point_id(key)]))
+
+    def search(self, vector: np.ndarray) -> tuple[str | None, float]:
+        self._ensure_collection(vector.shape[0])
+        hits = self.client.query_points(self.collection, query=vector.tolist(), limit=1, with_payload=True).points
+        if not hits:
+            return None, 0.0
+        return hits[0].payload.get("key"), float(hits[0].score)
+
+
+class AnswerCache:
+    """
+    Two-tier cache of chat answers.
+
+    The exact tier matches the normalized question. The semantic tier embeds the
+    question with `embed` and returns the closest cached answer whose cosine similarity
+    is at least `similarity_threshold`. Entries are evicted least-recently-used beyond
+    `max_entries` and expire after `ttl_seconds`; evicted entries are removed from the
+    vector index too. Pass embed=None to run with the exact tier only.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], np.ndarray] | None,
+        index,
+        max_entries: int = 2048,
+        ttl_seconds: float = 24 * 3600,
+        similarity_threshold: float = 0.92,
+    ):
+        self.embed = embed
+        self.index = index
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()  # key -> (value, created_at)
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def _get_entry(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, created_at = entry
+        if self._expired(created_at):
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _drop(self, key: str):
+        self._entries.pop(key, None)
+        if self.embed is not None:
+            try:
+                self.index.remove(key)
+            except Exception as e:
+                logger.warning(f"Could not remove {key!r} from the vector index: {e}")
+
+    def _embed(self, text: str) -> np.ndarray | None:
+        if self.embed is None:
+            return None
+        try:
+            return self.embed(text)
+        except Exception as e:
+            logger.error(f"Embedding failed, semantic tier skipped: {e}")
+            return None
+
+    def lookup(self, question: str) -> dict | None:
+        key = normalize_query(question)
+        with self._lock:
+            value = self._get_entry(key)
+            if value is not None:
+                self.exact_hits += 1
+                return value
+
+        vector = self._embed(key)
+        if vector is not None:
+            try:
+                match, score = self.index.search(vector)
+            except Exception as e:
+                logger.error(f"Vector search failed: {e}")
+                match, score = None, 0.0
+            if match is not None and score >= self.similarity_threshold:
+                with self._lock:
+                    value = self._get_entry(match)
+                    if value is not None:
+                        self.semantic_hits += 1
+                        logger.info(f"Semantic cache hit ({score:.3f}): '{question}' ~ '{match}'")
+                        return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, question: str, value: dict):
+        key = normalize_query(question)
+        if not key:
+            return
+        vector = self._embed(key)
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+            # Evict then index under one lock, so a concurrent eviction cannot strand a vector
+            # (and the in-memory index always has the slot this entry needs)
+            if vector is not None:
+                try:
+                    self.index.add(key, vector)
+                except Exception as e:
+                    logger.error(f"Could not index cached answer: {e}")
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "semantic_enabled": self.embed is not None,
+            }
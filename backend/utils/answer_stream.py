@@ -0,0 +1,97 @@
+# backend/utils/answer_stream.py
+
+import re
+import json
+
+# Locate the opening quote of the "response" string value and a completed "type" value.
+RESPONSE_KEY_RE = re.compile(r'"response"\s*:\s*"')
+TYPE_VALUE_RE = re.compile(r'"type"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class StreamingAnswerParser:
+    """
+    Incrementally extracts the "response" and "type" fields of the JSON answer
+    the Dify app produces (optionally wrapped in a ```json fence) while it is
+    still being generated.
+
+    feed() returns the newly decoded characters of the "response" string so they
+    can be forwarded to the client as soon as they arrive. The complete raw
+    answer is kept in `raw` for the final, authoritative parse.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.type = None
+        self._pos = None      # index in raw of the next undecoded response char
+        self._closed = False  # the response string has been fully decoded
+
+    def feed(self, delta: str) -> str:
+        self.raw += delta
+
+        if self.type is None:
+            match = TYPE_VALUE_RE.search(self.raw)
+            if match:
+                self.type = json.loads(f'"{match.group(1)}"')
+
+        if self._closed:
+            return ""
+
+        if self._pos is None:
+            match = RESPONSE_KEY_RE.search(self.raw)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        return self._decode()
+
+    def _decode(self) -> str:
+        out = []
+        raw = self.raw
+        i = self._pos
+        while i < len(raw):
+            ch = raw[i]
+            if ch == '"':
+                self._closed = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+
+            # Escape sequence; wait for more input if it is cut off
+            if i + 1 >= len(raw):
+                break
+            esc = raw[i + 1]
+            if esc == "u":
+                if i + 6 > len(raw):
+                    break
+                try:
+                    out.append(chr(int(raw[i + 2:i + 6], 16)))
+                except ValueError:
+                    out.append(raw[i:i + 6])
+                i += 6
+            else:
+                out.append(SIMPLE_ESCAPES.get(esc, esc))
+                i += 2
+
+        # Hold back a high surrogate until its low half arrives
+        if not self._closed and out and "\ud800" <= out[-1] <= "\udbff":
+            out.pop()
+            i -= 6
+
+        self._pos = i
+        text = "".join(out)
+        # Join UTF-16 surrogate pairs produced by consecutive \uXXXX escapes
+        return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace") if text else text
@@ -0,0 +1,244 @@
+# backend/utils/audio_cache.py
+
+import os
+import re
+import glob
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger("app.audio_cache")
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of the text used for cache keys."""
+    return WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def make_key(text: str, voice: str, speed: float, sample_rate: int) -> str:
+    raw = f"{normalize_text(text)}\x1f{voice}\x1f{speed:.3f}\x1f{sample_rate}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Content-addressed cache for synthesized audio.
+
+    Entries live in an in-memory LRU bounded by `max_bytes`. When `disk_dir` is set,
+    every entry is also written there as `<key>.pcm`, bounded by `disk_max_bytes`, so
+    the cache survives restarts. Both tiers evict least-recently-used entries first and
+    drop anything older than `ttl_seconds`; evicting from disk deletes the file. Expired
+    entries are swept from get() and put() at most once per `sweep_interval_seconds`, so
+    audio nobody asks for again does not stay resident. Disk reads and writes happen
+    outside the lock.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, disk_dir: str | None = None, disk_max_bytes: int = 0, sweep_interval_seconds: float = 60.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[bytes, float]] = OrderedDict()  # key -> (data, created_at)
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, tuple[int, float]] = OrderedDict()      # key -> (size, created_at)
+        self._disk_bytes = 0
+        self._last_sweep = time.time()
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pcm")
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def _load_disk_index(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.disk_dir, "*.pcm")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key = os.path.splitext(os.path.basename(path))[0]
+            entries.append((stat.st_mtime, key, stat.st_size))
+
+        for created_at, key, size in sorted(entries):
+            self._disk[key] = (size, created_at)
+            self._disk_bytes += size
+        self._evict_disk()
+        logger.info(f"Audio cache disk tier: {len(self._disk)} entries, {self._disk_bytes} bytes in {self.disk_dir}")
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            self._maybe_sweep()
+            entry = self._memory.get(key)
+            if entry is not None:
+                data, created_at = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return data
+                self._drop_memory(key)
+
+            disk_entry = self._disk.get(key)
+            if disk_entry is None:
+                self.misses += 1
+                return None
+            size, created_at = disk_entry
+            if self._expired(created_at):
+                self._drop_disk(key)
+                self.misses += 1
+                return None
+
+        # Read outside the lock so a slow disk does not stall memory hits
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+
+        with self._lock:
+            if data is None:
+                # Evicted meanwhile, or the file is gone: forget the entry
+                if self._disk.get(key) == disk_entry:
+                    self._drop_disk(key)
+                self.misses += 1
+                return None
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._put_memory(key, data, created_at)
+            self.hits_disk += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        if not data:
+            return
+        created_at = time.time()
+        with self._lock:
+            self._maybe_sweep()
+            self._put_memory(key, data, created_at)
+            write = self.disk_dir and key not in self._disk and len(data) <= self.disk_max_bytes
+        if not write:
+            return
+
+        try:
+            tmp_path = f"{self._disk_path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            logger.warning(f"Could not write audio cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = (len(data), created_at)
+                self._disk_bytes += len(data)
+                self._evict_disk()
+
+    def _put_memory(self, key: str, data: bytes, created_at: float):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._memory:
+            self._drop_memory(key)
+        self._memory[key] = (data, created_at)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_bytes:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self.evictions += 1
+
+    def _drop_memory(self, key: str):
+        data, _ = self._memory.pop(key)
+        self._memory_bytes -= len(data)
+
+    def _evict_disk(self):
+        # Expired entries first, then least recently used until under budget
+        for key in [k for k, (_, created_at) in self._disk.items() if self._expired(created_at)]:
+            self._drop_disk(key)
+            self.evictions += 1
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            self._drop_disk(next(iter(self._disk)))
+            self.evictions += 1
+
+    def _drop_disk(self, key: str):
+        size, _ = self._disk.pop(key)
+        self._disk_bytes -= size
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _maybe_sweep(self):
+        # Called with the lock held; a full scan at most once per sweep interval
+        now = time.time()
+        if self.ttl_seconds <= 0 or now - self._last_sweep < self.sweep_interval_seconds:
+            return
+        self._last_sweep = now
+        self._evict_expired()
+
+    def _evict_expired(self):
+        for key in [k for k, (_, created_at) in self._memory.items() if self._expired(created_at)]:
+            self._drop_memory(key)
+            self.evictions += 1
+        if self.disk_dir:
+            self._evict_disk()
+
+    def evict_expired(self):
+        """Drops every expired entry from both tiers now."""
+        with self._lock:
+            self._last_sweep = time.time()
+            self._evict_expired()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.hits_memory + self.hits_disk
+            lookups = hits + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.max_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes if self.disk_dir else 0,
+            }
+
+
+def purge_stale_files(directory: str, patterns: list[str], max_age_seconds: float) -> int:
+    """
+    Deletes files matching `patterns` in `directory` that are older than `max_age_seconds`.
+    Used to clean up audio written by earlier versions that never removed their output.
+    """
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(directory, pattern)):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+    if removed:
+        logger.info(f"Removed {removed} stale audio files from {directory}")
+    return removed
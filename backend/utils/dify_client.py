@@ -0,0 +1,265 @@
+# backend/utils/dify_client.py
+
+import os
+import json
+import time
+import asyncio
+import logging
+import httpx
+from contextlib import aclosing
+from dotenv import load_dotenv
+from utils.metrics import (
+    DIFY_CONNECT_SECONDS, DIFY_GENERATE_SECONDS, DIFY_FIRST_EVENT_SECONDS,
+    DIFY_RETRIES, DIFY_HEDGES, DIFY_CIRCUIT_STATE,
+)
+from utils.resilience import (
+    CircuitBreaker, ConcurrencyLimiter, LatencyTracker, UpstreamGuard,
+    CLOSED, HALF_OPEN, OPEN, backoff_delay, hedged, retry_async,
+)
+from utils.request_context import get_request_id
+
+load_dotenv()
+
+logger = logging.getLogger("app.dify_client")
+
+DIFY_API_BASE_URL = os.getenv("DIFY_API_BASE_URL", "http://localhost:80")
+DIFY_API_KEY = os.getenv("DIFY_API_KEY")
+DIFY_CHAT_ENDPOINT = f"{DIFY_API_BASE_URL}/v1/chat-messages"
+
+# Connection pool limits
+DIFY_MAX_CONNECTIONS = int(os.getenv("DIFY_MAX_CONNECTIONS", "200"))
+DIFY_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("DIFY_MAX_KEEPALIVE_CONNECTIONS", "50"))
+DIFY_KEEPALIVE_EXPIRY = float(os.getenv("DIFY_KEEPALIVE_EXPIRY", "30"))
+
+# Per-phase timeouts (seconds). The read timeout bounds the LLM generation.
+DIFY_CONNECT_TIMEOUT = float(os.getenv("DIFY_CONNECT_TIMEOUT", "5"))
+DIFY_READ_TIMEOUT = float(os.getenv("DIFY_READ_TIMEOUT", "30"))
+DIFY_WRITE_TIMEOUT = float(os.getenv("DIFY_WRITE_TIMEOUT", "10"))
+DIFY_POOL_TIMEOUT = float(os.getenv("DIFY_POOL_TIMEOUT", "10"))
+
+# Resilience: at most DIFY_MAX_CONCURRENCY calls in flight, each waiting at most
+# DIFY_QUEUE_TIMEOUT seconds for a slot; the circuit opens after DIFY_BREAKER_FAILURES
+# consecutive upstream failures and fails fast for DIFY_BREAKER_RESET_SECONDS.
+DIFY_MAX_CONCURRENCY = int(os.getenv("DIFY_MAX_CONCURRENCY", "64"))
+DIFY_QUEUE_TIMEOUT = float(os.getenv("DIFY_QUEUE_TIMEOUT", "2"))
+DIFY_BREAKER_FAILURES = int(os.getenv("DIFY_BREAKER_FAILURES", "5"))
+DIFY_BREAKER_RESET_SECONDS = float(os.getenv("DIFY_BREAKER_RESET_SECONDS", "15"))
+# Total tries for failures where Dify never processed the request
+DIFY_RETRY_ATTEMPTS = int(os.getenv("DIFY_RETRY_ATTEMPTS", "3"))
+DIFY_RETRY_BASE_DELAY = float(os.getenv("DIFY_RETRY_BASE_DELAY", "0.2"))
+DIFY_RETRY_MAX_DELAY = float(os.getenv("DIFY_RETRY_MAX_DELAY", "2"))
+# Hedging (blocking mode only): send a second copy when the first is slower than the
+# recent p95. Dify records both messages, so this is off by default.
+DIFY_HEDGE_ENABLED = os.getenv("DIFY_HEDGE_ENABLED", "0") == "1"
+DIFY_HEDGE_PERCENTILE = float(os.getenv("DIFY_HEDGE_PERCENTILE", "95"))
+DIFY_HEDGE_MIN_DELAY = float(os.getenv("DIFY_HEDGE_MIN_DELAY", "1"))
+
+# Statuses returned before Dify did any work
+RETRYABLE_STATUSES = {429, 502, 503}
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide AsyncClient, creating it on first use.
+    The client keeps connections alive so consecutive turns skip the TCP/HTTP handshake.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(
+            max_connections=DIFY_MAX_CONNECTIONS,
+            max_keepalive_connections=DIFY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=DIFY_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            connect=DIFY_CONNECT_TIMEOUT,
+            read=DIFY_READ_TIMEOUT,
+            write=DIFY_WRITE_TIMEOUT,
+            pool=DIFY_POOL_TIMEOUT,
+        )
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {DIFY_API_KEY}",
+        }
+        _client = httpx.AsyncClient(limits=limits, timeout=timeout, headers=headers)
+        logger.info(
+            f"Created Dify client (max_connections={DIFY_MAX_CONNECTIONS}, "
+            f"keepalive={DIFY_MAX_KEEPALIVE_CONNECTIONS}, connect_timeout={DIFY_CONNECT_TIMEOUT}s, "
+            f"read_timeout={DIFY_READ_TIMEOUT}s)"
+        )
+    return _client
+
+
+def is_upstream_failure(e: Exception) -> bool:
+    """Whether an error means Dify is unhealthy. Local pool exhaustion and 4xx do not count."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return isinstance(e, httpx.TransportError) and not isinstance(e, httpx.PoolTimeout)
+
+
+def is_retryable(e: Exception) -> bool:
+    """Failures where the request was never processed, so sending it again is safe."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code in RETRYABLE_STATUSES
+    return isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+breaker = CircuitBreaker(DIFY_BREAKER_FAILURES, DIFY_BREAKER_RESET_SECONDS, name="dify")
+guard = UpstreamGuard(ConcurrencyLimiter(DIFY_MAX_CONCURRENCY, DIFY_QUEUE_TIMEOUT), breaker, is_upstream_failure)
+latencies = LatencyTracker()
+DIFY_CIRCUIT_STATE.set_function(lambda: {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[breaker.state])
+
+
+def hedge_delay() -> float:
+    p = latencies.percentile(DIFY_HEDGE_PERCENTILE)
+    return max(DIFY_HEDGE_MIN_DELAY, p) if p is not None else DIFY_HEDGE_MIN_DELAY
+
+
+def upstream_stats() -> dict:
+    return {
+        **guard.stats(),
+        "retry_attempts": DIFY_RETRY_ATTEMPTS,
+        "hedging": {
+            "enabled": DIFY_HEDGE_ENABLED,
+            "delay_seconds": round(hedge_delay(), 3),
+        },
+    }
+
+
+async def close_client():
+    """Closes the shared client. Called from the application shutdown hook."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed Dify client")
+    _client = None
+
+
+class _PhaseTrace:
+    """
+    httpx trace hook that notes when the request headers start going out, which splits
+    a call into the connect phase (pool wait, TCP/TLS) and the generate phase.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.start = time.perf_counter()
+        self.sent_at = None
+        self.observed = False
+
+    async def __call__(self, event_name: str, info: dict):
+        if self.sent_at is None and event_name.endswith(".send_request_headers.started"):
+            self.sent_at = time.perf_counter()
+
+    def since_sent(self) -> float:
+        return time.perf_counter() - (self.sent_at or self.start)
+
+    def observe(self):
+        if self.observed:
+            return
+        self.observed = True
+        sent_at = self.sent_at or self.start
+        DIFY_CONNECT_SECONDS.labels(self.mode).observe(sent_at - self.start)
+        DIFY_GENERATE_SECONDS.labels(self.mode).observe(time.perf_counter() - sent_at)
+
+
+def _request_headers() -> dict:
+    # Lets Dify-side logs be matched to ours
+    return {"X-Request-ID": get_request_id()}
+
+
+async def _post_once(payload: dict) -> httpx.Response:
+    async with guard.call():
+        client = get_client()
+        trace = _PhaseTrace("blocking")
+        start = time.perf_counter()
+        response = await client.post(
+            DIFY_CHAT_ENDPOINT, json=payload, headers=_request_headers(), extensions={"trace": trace}
+        )
+        trace.observe()
+        response.raise_for_status()
+        latencies.observe(time.perf_counter() - start)
+        return response
+
+
+def _count_retry(e: Exception):
+    DIFY_RETRIES.labels(type(e).__name__).inc()
+
+
+async def post_chat_message(payload: dict) -> httpx.Response:
+    """
+    Sends a blocking chat-messages request to Dify and raises for non-2xx statuses.
+    Raises CircuitOpenError / QueueTimeoutError without calling Dify when it is unhealthy
+    or saturated; retries failures that never reached it.
+    """
+    async def attempt():
+        return await retry_async(
+            lambda: _post_once(payload),
+            DIFY_RETRY_ATTEMPTS, DIFY_RETRY_BASE_DELAY, DIFY_RETRY_MAX_DELAY,
+            is_retryable, on_retry=_count_retry,
+        )
+
+    if DIFY_HEDGE_ENABLED:
+        return await hedged(attempt, hedge_delay(), on_hedge=DIFY_HEDGES.inc)
+    return await attempt()
+
+
+async def stream_chat_message(payload: dict):
+    """
+    Sends a streaming chat-messages request to Dify and yields each SSE event as a dict.
+    The read timeout applies between chunks, not to the whole generation. Failures that
+    never reached Dify are retried as long as nothing has been yielded yet.
+    """
+    for attempt in range(DIFY_RETRY_ATTEMPTS):
+        started = False
+        try:
+            async with aclosing(_stream_once(payload)) as events:
+                async for event in events:
+                    started = True
+                    yield event
+            return
+        except Exception as e:
+            if started or attempt + 1 >= DIFY_RETRY_ATTEMPTS or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, DIFY_RETRY_BASE_DELAY, DIFY_RETRY_MAX_DELAY)
+            logger.warning(f"Retrying Dify stream in {delay:.2f}s after {type(e).__name__}: {e}")
+            _count_retry(e)
+            await asyncio.sleep(delay)
+
+
+async def _stream_once(payload: dict):
+    async with guard.call() as outcome:
+        client = get_client()
+        trace = _PhaseTrace("streaming")
+        first_event = True
+        async with client.stream(
+            "POST", DIFY_CHAT_ENDPOINT, json=payload, headers=_request_headers(), extensions={"trace": trace}
+        ) as response:
+            if response.is_error:
+                # Load the body so the HTTPError handler can report Dify's message
+                await response.aread()
+            response.raise_for_status()
+            # Dify accepted the request; callers often stop reading before the stream ends
+            outcome.succeeded()
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if not data:
+                    continue
+                try:
+                    event = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed Dify stream line: {data[:200]}")
+                    continue
+
+                if first_event:
+                    first_event = False
+                    DIFY_FIRST_EVENT_SECONDS.observe(trace.since_sent())
+                if event.get("event") == "message_end":
+                    # Callers usually stop reading here, so the generation is timed now
+                    trace.observe()
+                yield event
+            trace.observe()
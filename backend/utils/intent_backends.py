@@ -0,0 +1,82 @@
+# backend/utils/intent_backends.py
+
+import os
+import logging
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification
+
+logger = logging.getLogger("app.intent_backends")
+
+ONNX_FILENAME = "model.onnx"
+
+
+class TorchBackend:
+    """Full-precision PyTorch model, as trained."""
+
+    name = "torch"
+    tensor_type = "pt"
+
+    def __init__(self, model_path: str):
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_path)
+        self.model.eval()
+
+    def logits(self, inputs) -> np.ndarray:
+        with torch.no_grad():
+            return self.model(**inputs).logits.numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    Dynamic int8 quantization of every nn.Linear layer. Weights are quantized once at
+    load time; activations are quantized on the fly, so no calibration data is needed.
+    """
+
+    name = "quantized"
+
+    def __init__(self, model_path: str):
+        super().__init__(model_path)
+        self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend:
+    """
+    Exported ONNX graph running under ONNX Runtime (see scripts/export_intent_model.py).
+    """
+
+    name = "onnx"
+    tensor_type = "np"
+
+    def __init__(self, model_path: str, onnx_path: str | None = None, num_threads: int = 0):
+        import onnxruntime as ort
+
+        onnx_path = onnx_path or os.path.join(model_path, ONNX_FILENAME)
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"ONNX model not found at {onnx_path}. Run `python -m scripts.export_intent_model --export-onnx` first."
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def logits(self, inputs) -> np.ndarray:
+        feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in self.input_names}
+        return self.session.run(["logits"], feed)[0]
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def load_backend(name: str, model_path: str):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown intent backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    logger.info(f"Loading intent backend '{name}' from {model_path}")
+    return BACKENDS[name](model_path)
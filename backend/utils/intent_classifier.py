@@ -1,44 +1,68 @@
 # backend/utils/intent_classifier.py
 
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import numpy as np
+from transformers import AutoConfig, AutoTokenizer
 import os
 import logging
+from typing import List, Tuple
+from utils.intent_backends import load_backend
 
 logger = logging.getLogger("app.intent_classifier")
 
+MAX_LENGTH = int(os.getenv("INTENT_MAX_LENGTH", "512"))
+
+# Inference backend: "torch" (full precision), "quantized" (dynamic int8) or "onnx" (ONNX Runtime)
+INTENT_BACKEND = os.getenv("INTENT_BACKEND", "torch")
+
+def default_model_path() -> str:
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.getenv("FINETUNED_MODEL_PATH", os.path.join(base_dir, "..", "llm_models", "finetuned-model"))
+
 class IntentClassifier:
-    def __init__(self):
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(base_dir, "..", "llm_models", "finetuned-model")
+    def __init__(self, backend: str | None = None, model_path: str | None = None):
+        model_path = model_path or default_model_path()
+        backend = backend or INTENT_BACKEND
 
-        print(f"Loading fine-tuned model from: {model_path}")
+        print(f"Loading fine-tuned model from: {model_path} (backend: {backend})")
 
         self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_path)
-        
-        self.labels = list(self.model.config.id2label.values())
-        
 
+        self.backend = load_backend(backend, model_path)
 
-    def classify(self, text: str):
+        self.id2label = AutoConfig.from_pretrained(model_path).id2label
+        self.labels = list(self.id2label.values())
+
+
+    def predict_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
         """
-        Classifies the intent of a given text using the fine-tuned BERT model.
-        (This method requires no changes)
+        Classifies a batch of texts in one forward pass, padding to the longest sequence.
+        Returns (label, confidence) for each text, in order.
         """
-        # Tokenize the input text
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
+        # Tokenize the batch; padding=True pads to the longest text, not to max_length
+        inputs = self.tokenizer(
+            texts, return_tensors=self.backend.tensor_type, truncation=True, padding=True, max_length=MAX_LENGTH
+        )
 
         # Get model outputs (logits)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
+        logits = self.backend.logits(inputs)
 
-        # Get the predicted class index by finding the max logit
-        logits = outputs.logits
-        predicted_class_idx = torch.argmax(logits, dim=1).item()
+        # Get the predicted class index and its probability for each row
+        shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs = shifted / shifted.sum(axis=-1, keepdims=True)
+        predicted = probs.argmax(axis=-1)
 
-        # Return the corresponding label from the model's configuration
-        intent = self.model.config.id2label[predicted_class_idx]
+        return [
+            (self.id2label[int(idx)], float(probs[row, idx]))
+            for row, idx in enumerate(predicted)
+        ]
+
+    def classify_batch(self, texts: List[str]) -> List[str]:
+        return [label for label, _ in self.predict_batch(texts)]
+
+    def classify(self, text: str):
+        """
+        Classifies the intent of a given text using the fine-tuned BERT model.
+        """
+        intent = self.classify_batch([text])[0]
         logger.info(f"RECEVIED INTENT: {intent}")
         return intent
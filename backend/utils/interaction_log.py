@@ -0,0 +1,308 @@
+# backend/utils/interaction_log.py
+
+import time
+import queue
+import hashlib
+import asyncio
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+
+logger = logging.getLogger("app.interaction_log")
+
+# Columns added on top of the original application_logs(session_id, user_query, response, model, created_at).
+# `model` records which stage produced the answer: "dify", "fast_path" or "answer_cache".
+EXTRA_COLUMNS = {
+    "conversation_id": "TEXT",
+    "request_id": "TEXT",
+    "intent": "TEXT",
+    "intent_confidence": "REAL",
+    "response_type": "TEXT",
+    "latency_ms": "REAL",
+}
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_application_logs_created_at ON application_logs (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_application_logs_session ON application_logs (session_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_application_logs_intent ON application_logs (intent, created_at)",
+]
+
+INSERT_COLUMNS = ["session_id", "user_query", "response", "model", "created_at", *EXTRA_COLUMNS]
+INSERT_SQL = (
+    f"INSERT INTO application_logs ({', '.join(INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})"
+)
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=10)
+    # WAL lets the rollup queries read while the writer appends
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS application_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            user_query TEXT,
+            response TEXT,
+            model TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )"""
+    )
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(application_logs)")}
+    for column, column_type in EXTRA_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE application_logs ADD COLUMN {column} {column_type}")
+    for statement in INDEXES:
+        conn.execute(statement)
+    conn.commit()
+
+
+def utc_timestamp() -> str:
+    # Same format as SQLite's CURRENT_TIMESTAMP, so old and new rows sort together
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class InteractionLogWriter:
+    """
+    Appends chat turns to application_logs from a background thread.
+
+    log_async() only enqueues, so the request path never touches SQLite. The writer thread
+    inserts in batches of up to `batch_size` rows, one transaction each, and flushes a
+    partial batch after `flush_interval` seconds. When the queue is full, the "drop"
+    policy discards the row at once; with "block", log_async() waits up to
+    `block_timeout` seconds for space on a worker thread before dropping, which only
+    delays the turn being logged, never the event loop. Dropped rows are counted in
+    stats().
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        policy: str = "drop",
+        block_timeout: float = 0.05,
+    ):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown queue-full policy '{policy}'. Use 'drop' or 'block'.")
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="interaction-log-writer", daemon=True)
+                self._thread.start()
+
+    async def log_async(self, record: dict) -> bool:
+        """
+        Queues one row (keys from INSERT_COLUMNS). Returns False if it was dropped; the
+        "block" policy waits for queue space on a worker thread, never on the loop.
+        """
+        self.start()
+        row = tuple(record.get(column) for column in INSERT_COLUMNS)
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            if self.policy != "block":
+                self.dropped += 1
+                return False
+        try:
+            await asyncio.to_thread(self._queue.put, row, True, self.block_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        try:
+            conn = connect(self.db_path)
+            ensure_schema(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Interaction log disabled, could not open {self.db_path}: {e}")
+            return
+
+        try:
+            while not (self._stopping.is_set() and self._queue.empty()):
+                batch = self._next_batch()
+                if batch:
+                    self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def _next_batch(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if self._stopping.is_set():
+                    # Drain without waiting on shutdown
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, conn: sqlite3.Connection, batch: list):
+        try:
+            with conn:
+                conn.executemany(INSERT_SQL, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.failed += len(batch)
+            logger.error(f"Could not write {len(batch)} interaction log rows: {e}")
+
+    def close(self, timeout: float = 5.0):
+        """Flushes queued rows and stops the writer thread."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "policy": self.policy,
+        }
+
+
+def session_hash(session_id: str | None) -> str | None:
+    """Stable pseudonym for a session ID, which is a credential and must not be listed."""
+    if session_id is None:
+        return None
+    return hashlib.sha256(session_id.encode()).hexdigest()[:16]
+
+
+def _empty_rollup(since: str | None, until: str | None) -> dict:
+    return {
+        "since": since,
+        "until": until,
+        "turns": 0,
+        "sessions": 0,
+        "avg_turns_per_session": 0.0,
+        "avg_latency_ms": None,
+        "top_sessions": [],
+        "latency_by_model": {},
+        "intents": [],
+    }
+
+
+def rollup(db_path: str, since: str | None = None, until: str | None = None, top_sessions: int = 20) -> dict:
+    """
+    Aggregates application_logs between `since` and `until` (UTC, "YYYY-MM-DD[ HH:MM:SS]"):
+    totals, turns per session, latency per answering stage and intent distribution.
+    The database is opened read-only; before the writer has created the table (or
+    added its columns) the rollup is empty. Sessions are listed by session_hash().
+    """
+    try:
+        conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True, timeout=10)
+    except sqlite3.OperationalError:
+        return _empty_rollup(since, until)
+    try:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(application_logs)")}
+        if not existing.issuperset(EXTRA_COLUMNS):
+            return _empty_rollup(since, until)
+        conditions, params = [], []
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        turns, sessions, avg_latency = conn.execute(
+            f"SELECT COUNT(*), COUNT(DISTINCT session_id), AVG(latency_ms) FROM application_logs {where}", params
+        ).fetchone()
+
+        per_session = [
+            {"session": session_hash(row[0]), "turns": row[1], "first_at": row[2], "last_at": row[3]}
+            for row in conn.execute(
+                f"""SELECT session_id, COUNT(*) AS turns, MIN(created_at), MAX(created_at)
+                    FROM application_logs {where}
+                    GROUP BY session_id ORDER BY turns DESC LIMIT ?""",
+                [*params, top_sessions],
+            )
+        ]
+
+        bucket_cases = " ".join(
+            f"WHEN latency_ms < {edge} THEN '<{edge}'" for edge in LATENCY_BUCKETS_MS
+        )
+        latency = {}
+        for model, count, avg_ms, min_ms, max_ms in conn.execute(
+            f"""SELECT model, COUNT(latency_ms), AVG(latency_ms), MIN(latency_ms), MAX(latency_ms)
+                FROM application_logs {where} GROUP BY model""",
+            params,
+        ):
+            latency[model or "unknown"] = {
+                "count": count,
+                "avg_ms": round(avg_ms, 1) if avg_ms is not None else None,
+                "min_ms": min_ms,
+                "max_ms": max_ms,
+                "buckets": {},
+            }
+        for model, bucket, count in conn.execute(
+            f"""SELECT model, CASE {bucket_cases} ELSE '>={LATENCY_BUCKETS_MS[-1]}' END AS bucket, COUNT(*)
+                FROM application_logs {where} {'AND' if where else 'WHERE'} latency_ms IS NOT NULL
+                GROUP BY model, bucket""",
+            params,
+        ):
+            latency.setdefault(model or "unknown", {"buckets": {}})["buckets"][bucket] = count
+
+        intents = [
+            {"intent": row[0], "turns": row[1], "avg_confidence": round(row[2], 3) if row[2] is not None else None}
+            for row in conn.execute(
+                f"""SELECT intent, COUNT(*) AS turns, AVG(intent_confidence)
+                    FROM application_logs {where}
+                    GROUP BY intent ORDER BY turns DESC""",
+                params,
+            )
+        ]
+    finally:
+        conn.close()
+
+    return {
+        "since": since,
+        "until": until,
+        "turns": turns,
+        "sessions": sessions,
+        "avg_turns_per_session": round(turns / sessions, 2) if sessions else 0.0,
+        "avg_latency_ms": round(avg_latency, 1) if avg_latency is not None else None,
+        "top_sessions": per_session,
+        "latency_by_model": latency,
+        "intents": intents,
+    }
@@ -0,0 +1,127 @@
+# backend/utils/long_audio.py
+
+import re
+from typing import List, Tuple
+import numpy as np
+
+FRAME_MS = 30
+# Window energy is smoothed over this span, so a cut lands in a pause rather than a stop consonant
+SMOOTH_MS = 300
+WORD_KEY_RE = re.compile(r"[^\w]+")
+
+
+def frame_energy_db(audio: np.ndarray, sample_rate: int, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """Per-frame RMS level in dB; the last partial frame is dropped."""
+    frame = sample_rate * frame_ms // 1000
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10
+    return (20.0 * np.log10(rms)).astype(np.float32)
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    sample_rate: int,
+    window_s: float = 25.0,
+    overlap_s: float = 1.5,
+    search_s: float = 6.0,
+    min_window_s: float = 3.0,
+    silence_db: float = -45.0,
+) -> List[Tuple[int, int, bool]]:
+    """
+    Splits long audio into windows of at most `window_s` seconds for transcription.
+
+    Each window ends at the quietest point of its last `search_s` seconds, so cuts fall
+    in pauses between words, and the next window starts `overlap_s` earlier so a word
+    clipped at the cut is heard whole by one side (stitch_transcripts() drops the
+    repeat). A tail shorter than `min_window_s` is folded into the previous window.
+
+    Returns (start_sample, end_sample, silent) tuples; `silent` windows never rise above
+    `silence_db` and can be skipped instead of letting the model hallucinate on them.
+    """
+    total = len(audio)
+    window = int(window_s * sample_rate)
+    if total <= window:
+        return [(0, total, _is_silent(audio, sample_rate, silence_db))]
+
+    frame = sample_rate * FRAME_MS // 1000
+    energy = frame_energy_db(audio, sample_rate)
+    smooth = max(1, SMOOTH_MS // FRAME_MS)
+    smoothed = np.convolve(energy, np.ones(smooth) / smooth, mode="same")
+
+    overlap = int(overlap_s * sample_rate)
+    search = max(frame, min(int(search_s * sample_rate), window - overlap - frame))
+    min_window = int(min_window_s * sample_rate)
+
+    windows = []
+    start = 0
+    while start < total:
+        end = start + window
+        if end + min_window >= total:
+            end = total
+        else:
+            lo, hi = (end - search) // frame, end // frame
+            end = (lo + int(np.argmin(smoothed[lo:hi]))) * frame + frame // 2
+        windows.append((start, end, _is_silent(audio[start:end], sample_rate, silence_db)))
+        if end >= total:
+            break
+        start = end - overlap
+    return windows
+
+
+def _is_silent(audio: np.ndarray, sample_rate: int, silence_db: float) -> bool:
+    energy = frame_energy_db(audio, sample_rate)
+    return len(energy) == 0 or float(energy.max()) < silence_db
+
+
+def _word_key(word: str) -> str:
+    return WORD_KEY_RE.sub("", word.lower())
+
+
+def _overlap(left: List[str], right: List[str], max_words: int, max_fragments: int) -> Tuple[int, int, int]:
+    """
+    Finds the longest run of words that ends `left` and starts `right`, allowing up to
+    `max_fragments` clipped words at the end of `left` and the start of `right`.
+    Returns (words dropped from left, words dropped from right, run length).
+    """
+    left_keys = [_word_key(w) for w in left[-(max_words + max_fragments):]]
+    right_keys = [_word_key(w) for w in right[:max_words + max_fragments]]
+    best = (0, 0, 0)
+    for size in range(min(max_words, len(left_keys), len(right_keys)), 0, -1):
+        for skip_left in range(max_fragments + 1):
+            for skip_right in range(max_fragments + 1):
+                # A single shared word only counts when it lines up exactly
+                if size == 1 and (skip_left or skip_right):
+                    continue
+                end = len(left_keys) - skip_left
+                if end - size < 0 or skip_right + size > len(right_keys):
+                    continue
+                run = left_keys[end - size:end]
+                if all(run) and run == right_keys[skip_right:skip_right + size]:
+                    if best[2] == 0 or skip_left + skip_right < best[0] + best[1]:
+                        best = (skip_left, skip_right, size)
+        if best[2]:
+            return best
+    return best
+
+
+def stitch_transcripts(texts: List[str], max_words: int = 12, max_fragments: int = 2) -> str:
+    """
+    Joins the transcripts of overlapping windows, keeping one copy of the words both
+    sides of each overlap recognised. Where the overlap was silence or the words do not
+    line up, the texts are simply concatenated.
+    """
+    words: List[str] = []
+    for text in texts:
+        incoming = text.split()
+        if not incoming:
+            continue
+        skip_left, skip_right, size = _overlap(words, incoming, max_words, max_fragments)
+        if size:
+            # Keep the left side's copy of the shared run; both clipped fragments go
+            del words[len(words) - skip_left:]
+            incoming = incoming[skip_right + size:]
+        words.extend(incoming)
+    return " ".join(words)
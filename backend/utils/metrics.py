@@ -0,0 +1,130 @@
+# backend/utils/metrics.py
+
+import time
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Latency buckets from a few ms (cache hits, intent) up to a full LLM generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+RATIO_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0, 8.0, 16.0, 32.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# Dify: "connect" covers waiting for a pooled connection plus TCP/TLS setup (near zero when
+# a keep-alive connection is reused); "generate" runs from sending the request to the last byte.
+DIFY_CONNECT_SECONDS = Histogram(
+    "dify_connect_seconds", "Time to obtain a connection to Dify", ["mode"], buckets=LATENCY_BUCKETS
+)
+DIFY_GENERATE_SECONDS = Histogram(
+    "dify_generate_seconds", "Time from sending the request to the end of Dify's response", ["mode"], buckets=LATENCY_BUCKETS
+)
+DIFY_FIRST_EVENT_SECONDS = Histogram(
+    "dify_first_event_seconds", "Time from sending a streaming request to Dify's first event", buckets=LATENCY_BUCKETS
+)
+DIFY_RETRIES = Counter(
+    "dify_retries_total", "Dify calls sent again after a failure that never reached Dify", ["exception"]
+)
+DIFY_HEDGES = Counter(
+    "dify_hedges_total", "Second copies of slow blocking Dify calls"
+)
+CHAT_ERRORS = Counter(
+    "chat_errors_total", "Failed Dify interactions by exception class", ["exception"]
+)
+
+TTS_SYNTHESIS_SECONDS = Histogram(
+    "tts_synthesis_seconds", "Kokoro synthesis time per request (cache misses only)", ["mode"], buckets=LATENCY_BUCKETS
+)
+TTS_REAL_TIME_FACTOR = Histogram(
+    "tts_real_time_factor", "Synthesis time divided by the duration of the produced audio", ["mode"], buckets=RATIO_BUCKETS
+)
+
+STT_BATCH_SECONDS = Histogram(
+    "stt_batch_seconds", "Whisper inference time per batch", buckets=LATENCY_BUCKETS
+)
+STT_AUDIO_SPEED = Histogram(
+    "stt_audio_seconds_per_second", "Seconds of audio transcribed per wall-clock second, per batch", buckets=RATIO_BUCKETS
+)
+STT_BATCH_SIZE = Histogram(
+    "stt_batch_size", "Clips per Whisper forward pass", buckets=BATCH_BUCKETS
+)
+
+INTENT_INFERENCE_SECONDS = Histogram(
+    "intent_inference_seconds", "Intent classifier inference time per batch", buckets=LATENCY_BUCKETS
+)
+INTENT_BATCH_SIZE = Histogram(
+    "intent_batch_size", "Texts per intent classifier forward pass", buckets=BATCH_BUCKETS
+)
+
+IN_FLIGHT = Gauge(
+    "in_flight", "Work currently in progress, by stage", ["stage"], multiprocess_mode="livesum"
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests and WebSocket sessions currently being served", multiprocess_mode="livesum"
+)
+
+
+class Timer:
+    """Context manager measuring wall time with perf_counter; read `.seconds` afterwards."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        return False
+
+
+class CacheStatsCollector:
+    """
+    Exposes the hit/miss counters the caches already keep as cache_lookups_total{cache,result}.
+    Values are read from stats() at scrape time, so lookups pay nothing extra.
+    """
+
+    def __init__(self):
+        self._caches = {}
+
+    def add(self, name: str, stats_fn, results: dict):
+        """`results` maps a result label (e.g. "hit_memory") to a key of stats_fn()."""
+        self._caches[name] = (stats_fn, results)
+
+    def collect(self):
+        family = CounterMetricFamily("cache_lookups", "Cache lookups by cache and result", labels=["cache", "result"])
+        for name, (stats_fn, results) in self._caches.items():
+            stats = stats_fn()
+            for result, key in results.items():
+                family.add_metric([name, result], stats.get(key, 0))
+        yield family
+
+
+class FunctionGauge:
+    """
+    A gauge read from a callable at scrape time. Unlike Gauge.set_function it also works
+    with PROMETHEUS_MULTIPROC_DIR, where it reports the state of the worker that serves
+    the scrape (see LOCAL_COLLECTORS).
+    """
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._fn = None
+
+    def set_function(self, fn):
+        self._fn = fn
+
+    def collect(self):
+        if self._fn is None:
+            return
+        family = GaugeMetricFamily(self.name, self.documentation)
+        family.add_metric([], self._fn())
+        yield family
+
+
+DIFY_CIRCUIT_STATE = FunctionGauge("dify_circuit_state", "Dify circuit breaker: 0 closed, 1 half-open, 2 open")
+cache_stats = CacheStatsCollector()
+
+# Read in-process state at scrape time rather than writing samples, so the multiprocess
+# collector cannot see them; /metrics registers them next to it (values of one worker)
+LOCAL_COLLECTORS = [cache_stats, DIFY_CIRCUIT_STATE]
+for collector in LOCAL_COLLECTORS:
+    REGISTRY.register(collector)
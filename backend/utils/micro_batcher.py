@@ -0,0 +1,139 @@
+# backend/utils/micro_batcher.py
+
+import asyncio
+import logging
+import contextvars
+from typing import Any, Callable, List
+from utils.request_context import get_request_id
+
+logger = logging.getLogger("app.micro_batcher")
+
+
+class BatcherFullError(Exception):
+    """Raised by submit() when the pending queue is at capacity."""
+
+
+class MicroBatcher:
+    """
+    Collects concurrent submit() calls into batches and runs `handler` once per batch.
+
+    A batch is dispatched as soon as it holds `max_batch_size` items or `max_wait_ms`
+    has passed since its first item arrived. `handler` is a blocking callable mapping a
+    list of items to a list of results of the same length; it runs in the default
+    thread pool so the event loop stays free. Each caller gets back its own result, or
+    the exception the handler raised for the batch.
+
+    `max_pending` bounds the number of queued items (0 = unbounded); when the queue is
+    full, submit() raises BatcherFullError instead of waiting.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        max_pending: int = 0,
+        num_workers: int = 1,
+        name: str = "batcher",
+    ):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pending = max_pending
+        self.num_workers = num_workers
+        self.name = name
+
+        self._queue: asyncio.Queue | None = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.last_batch_size = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        # Workers outlive the request that started them, so they must not inherit its context
+        # (its request ID would end up on every later batch log line)
+        self._workers = [loop.create_task(self._run(), context=contextvars.Context()) for _ in range(self.num_workers)]
+        logger.info(
+            f"Started {self.name} (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000:.1f}, workers={self.num_workers})"
+        )
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((item, future, get_request_id()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise BatcherFullError(f"{self.name} queue is full ({self.max_pending} pending)")
+        return await future
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        return list(await asyncio.gather(*(self.submit(item) for item in items)))
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Callers that gave up (e.g. client disconnected) don't need a slot in the batch
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                continue
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = await self._loop.run_in_executor(None, self.handler, items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name} handler returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                request_ids = ",".join(sorted({request_id for _, _, request_id in batch}))
+                logger.error(f"{self.name} batch of {len(items)} failed (requests {request_ids}): {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            self.last_batch_size = len(items)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "pending": self.pending(),
+            "rejected": self.rejected,
+        }
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
@@ -0,0 +1,165 @@
+# backend/utils/model_registry.py
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger("app.model_registry")
+
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+# After a failed load, get() fails fast for this long before trying the loader again
+MODEL_RETRY_SECONDS = float(os.getenv("MODEL_RETRY_SECONDS", "60"))
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelLoadError(RuntimeError):
+    """Raised by get() while a model's last load failed and its retry backoff has not passed."""
+
+
+class ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any], warmup: Callable[[Any], Any] | None, required: bool = True):
+        self.name = name
+        self.required = required
+        self.loader = loader
+        self.warmup = warmup
+        self.instance = None
+        self.state = NOT_LOADED
+        self.error: str | None = None
+        self.load_seconds: float | None = None
+        self.warmup_seconds: float | None = None
+        self.failed_at: float | None = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Loads models on first use, or all at once in parallel, and tracks their state.
+
+    Controllers register a loader (and optionally a warmup inference) at import time
+    instead of constructing the model, so importing the app is cheap. get() loads the
+    model if needed; concurrent callers wait for the same load. After a failed load,
+    get() raises ModelLoadError at once for `retry_seconds`, so callers do not queue up
+    behind a loader that keeps failing; reload() retries a failed model immediately.
+    """
+
+    def __init__(self, retry_seconds: float = MODEL_RETRY_SECONDS):
+        self.retry_seconds = retry_seconds
+        self._entries: Dict[str, ModelEntry] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: Callable[[Any], Any] | None = None, required: bool = True):
+        """`required=False` marks a model the app degrades without; readiness does not wait for it."""
+        self._entries[name] = ModelEntry(name, loader, warmup, required)
+
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def required_names(self) -> List[str]:
+        return [name for name, entry in self._entries.items() if entry.required]
+
+    def override(self, name: str, instance: Any):
+        """Installs a ready instance (e.g. a stub model) without running the loader."""
+        entry = self._entries.setdefault(name, ModelEntry(name, lambda: instance, None))
+        with entry.lock:
+            entry.instance = instance
+            entry.state = READY
+            entry.error = None
+            entry.failed_at = None
+            entry.load_seconds = 0.0
+
+    def _backing_off(self, entry: ModelEntry) -> bool:
+        return entry.state == FAILED and time.monotonic() - entry.failed_at < self.retry_seconds
+
+    def get(self, name: str) -> Any:
+        entry = self._entries[name]
+        if entry.state == READY:
+            return entry.instance
+        if self._backing_off(entry):
+            raise ModelLoadError(f"Model '{name}' is unavailable: {entry.error}")
+        with entry.lock:
+            if entry.state != READY:
+                # Another caller may have failed the load while this one waited for the lock
+                if self._backing_off(entry):
+                    raise ModelLoadError(f"Model '{name}' is unavailable: {entry.error}")
+                self._load(entry)
+            return entry.instance
+
+    def reload(self, name: str) -> Any:
+        """
+        Retries loading a model that is not ready now, without waiting out its backoff.
+        A loaded model is left alone, so in-flight calls keep their instance.
+        """
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.state != READY:
+                self._load(entry)
+            return entry.instance
+
+    def _load(self, entry: ModelEntry):
+        entry.state = LOADING
+        entry.error = None
+        logger.info(f"Loading model '{entry.name}'")
+        start = time.perf_counter()
+        try:
+            instance = entry.loader()
+            entry.load_seconds = time.perf_counter() - start
+
+            if entry.warmup and MODEL_WARMUP:
+                warmup_start = time.perf_counter()
+                entry.warmup(instance)
+                entry.warmup_seconds = time.perf_counter() - warmup_start
+        except Exception as e:
+            entry.state = FAILED
+            entry.failed_at = time.monotonic()
+            entry.error = f"{type(e).__name__}: {e}"
+            logger.error(f"Failed to load model '{entry.name}': {entry.error}")
+            raise
+
+        entry.instance = instance
+        entry.state = READY
+        logger.info(
+            f"Model '{entry.name}' ready in {entry.load_seconds:.2f}s"
+            + (f" (warmup {entry.warmup_seconds:.2f}s)" if entry.warmup_seconds is not None else "")
+        )
+
+    def load_all(self, names: List[str] | None = None, parallel: bool = True):
+        """Loads the given models (default: all registered), concurrently when `parallel`."""
+        names = names if names is not None else self.names()
+        names = [name for name in names if name in self._entries]
+
+        def load(name: str):
+            try:
+                self.get(name)
+            except Exception:
+                pass  # recorded in the entry state
+
+        if parallel and len(names) > 1:
+            with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="model-load") as pool:
+                list(pool.map(load, names))
+        else:
+            for name in names:
+                load(name)
+
+    def is_ready(self, names: List[str]) -> bool:
+        return all(name in self._entries and self._entries[name].state == READY for name in names)
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "state": entry.state,
+                "load_seconds": round(entry.load_seconds, 3) if entry.load_seconds is not None else None,
+                "warmup_seconds": round(entry.warmup_seconds, 3) if entry.warmup_seconds is not None else None,
+                "error": entry.error,
+                "required": entry.required,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+registry = ModelRegistry()
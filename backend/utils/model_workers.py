@@ -0,0 +1,471 @@
+# backend/utils/model_workers.py
+"""
+Runs a model family (tts, stt, intent) in its own pool of worker processes.
+
+Each worker process pins itself to the family's core budget, caps torch's thread pool
+and loads one copy of the model. The API process only holds a proxy with the model's
+call signature, so controllers, batchers and the registry are unchanged. Small values
+(texts, labels) are pickled over the pool's pipe; audio travels through
+multiprocessing.shared_memory and only the block name crosses the pipe.
+
+Pools live inside the API process by default. With MODEL_WORKERS_ADDRESS set, proxies
+instead talk to a shared model server (scripts/model_server.py) on the same host, so
+API workers can be scaled without loading another copy of every model.
+"""
+import os
+import re
+import logging
+import importlib
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from multiprocessing.managers import BaseManager
+from typing import Dict, List
+
+logger = logging.getLogger("app.model_workers")
+
+# Families served out of process, e.g. "tts,stt,intent"; empty keeps every model in-process
+MODEL_WORKERS = {name.strip() for name in os.getenv("MODEL_WORKERS", "").split(",") if name.strip()}
+# "host:port" of a shared model server; empty starts the pools inside this process
+MODEL_WORKERS_ADDRESS = os.getenv("MODEL_WORKERS_ADDRESS", "")
+# Shared secret of the model server. Its RPC is pickle-based, so anyone holding the key can
+# run code in it: there is no default, and server and clients refuse to start without one
+MODEL_WORKERS_AUTHKEY = os.getenv("MODEL_WORKERS_AUTHKEY", "").encode()
+MIN_AUTHKEY_BYTES = 16
+# Client-side threads per family when calling a model server (bounds in-flight requests)
+MODEL_WORKERS_CLIENT_THREADS = int(os.getenv("MODEL_WORKERS_CLIENT_THREADS", "16"))
+
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def family_spec(family: str) -> tuple[str, dict]:
+    """
+    The "module:callable" that builds a family's model inside a worker, and its kwargs.
+    MODEL_WORKER_SPEC_<FAMILY> replaces it with another callable (e.g. a benchmark stub).
+    """
+    override = os.getenv(f"MODEL_WORKER_SPEC_{family.upper()}")
+    if override:
+        return override, {}
+    if family == "tts":
+        return "kokoro:KPipeline", {"lang_code": "a"}
+    if family == "stt":
+        from models.entities import SpeechToTextModel
+
+        return "utils.stt_service:build_pipeline", {
+            "model_name": os.getenv("STT_MODEL", SpeechToTextModel.PHO_WHISPER.value),
+            "device": os.getenv("STT_DEVICE", "cpu"),
+        }
+    if family == "intent":
+        return "utils.intent_classifier:IntentClassifier", {}
+    raise ValueError(f"Unknown model family '{family}'")
+
+
+def parse_cores(value: str) -> List[int]:
+    """Parses a CPU list such as "0-3,8" into [0, 1, 2, 3, 8]."""
+    cores = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    return cores
+
+
+def pool_config(family: str) -> dict:
+    """
+    MODEL_WORKER_PROCESSES_<FAMILY>, MODEL_WORKER_CORES_<FAMILY> (CPU list, empty = no
+    pinning) and MODEL_WORKER_THREADS_<FAMILY> (default: the core budget split evenly).
+    """
+    suffix = family.upper()
+    processes = int(os.getenv(f"MODEL_WORKER_PROCESSES_{suffix}", "1"))
+    cores = parse_cores(os.getenv(f"MODEL_WORKER_CORES_{suffix}", ""))
+    budget = len(cores) or os.cpu_count() or 1
+    threads = int(os.getenv(f"MODEL_WORKER_THREADS_{suffix}", str(max(1, budget // processes))))
+    return {"processes": processes, "threads": threads, "cores": cores}
+
+
+# --- shared memory -----------------------------------------------------------------
+
+def _untracked(name: str | None = None, size: int = 0) -> shared_memory.SharedMemory:
+    # The block is handed between processes and unlinked by whoever reads it last, so no
+    # resource tracker may unlink it when the process that happened to touch it exits
+    create = name is None
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:  # Python < 3.13
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def export_array(samples: np.ndarray) -> tuple[str, int] | None:
+    """Copies float32 samples into a new shared-memory block; the reader must unlink it."""
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    if samples.size == 0:
+        return None
+    shm = _untracked(size=samples.nbytes)
+    try:
+        view = np.ndarray(samples.shape, dtype=np.float32, buffer=shm.buf)
+        view[:] = samples
+        del view
+        return shm.name, samples.size
+    finally:
+        shm.close()
+
+
+def import_array(block: tuple[str, int] | None) -> np.ndarray:
+    """Reads and unlinks a block written by export_array()."""
+    if block is None:
+        return np.zeros(0, dtype=np.float32)
+    name, size = block
+    shm = _untracked(name)
+    try:
+        view = np.ndarray((size,), dtype=np.float32, buffer=shm.buf)
+        samples = view.copy()
+        del view
+        return samples
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def discard_block(future: Future):
+    """Done-callback that frees the block of a result nobody is going to read."""
+    if not future.cancelled() and future.exception() is None:
+        import_array(future.result())
+
+
+# --- worker process side -------------------------------------------------------------
+
+_model = None
+
+
+def _init_worker(spec: str, kwargs: dict, threads: int, cores: List[int]):
+    global _model
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    # Must be set before torch (and its OpenMP runtime) is imported
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+
+    module_name, attr = spec.split(":")
+    _model = getattr(importlib.import_module(module_name), attr)(**kwargs)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _tts_task(text: str, voice: str, speed: float):
+    chunks = [np.asarray(audio, dtype=np.float32) for _, _, audio in _model(text, voice=voice, speed=speed) if audio is not None]
+    return export_array(np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32))
+
+
+def _asr_task(block: str, lengths: List[int], sampling_rate: int, batch_size: int) -> List[str]:
+    shm = _untracked(block)
+    try:
+        flat = np.ndarray((sum(lengths),), dtype=np.float32, buffer=shm.buf)
+        inputs, offset = [], 0
+        for length in lengths:
+            inputs.append({"raw": flat[offset:offset + length].copy(), "sampling_rate": sampling_rate})
+            offset += length
+        del flat
+    finally:
+        shm.close()
+    outputs = _model(inputs, batch_size=batch_size)
+    return [output["text"] for output in outputs]
+
+
+def _intent_task(texts: List[str]):
+    return _model.predict_batch(texts)
+
+
+TASKS = {
+    "ping": _ping,
+    "tts": _tts_task,
+    "stt": _asr_task,
+    "intent": _intent_task,
+}
+
+
+# --- API process side ----------------------------------------------------------------
+
+class ModelWorkerPool:
+    """
+    A spawn-context process pool whose workers each hold one copy of a family's model.
+    A worker that dies (e.g. killed for memory) breaks the executor; the failing call
+    raises and the pool is rebuilt for the next one.
+    """
+
+    def __init__(self, family: str, processes: int, threads: int, cores: List[int]):
+        self.family = family
+        self.processes = processes
+        self.threads = threads
+        self.cores = cores
+        self.spec, self.kwargs = family_spec(family)
+        self.submitted = 0
+        self.failed = 0
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.spec, self.kwargs, self.threads, self.cores),
+        )
+
+    def submit(self, task: str, *args) -> Future:
+        with self._lock:
+            executor = self._executor
+            self.submitted += 1
+        try:
+            future = executor.submit(TASKS[task], *args)
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, executor))
+        return future
+
+    def call(self, task: str, *args):
+        return self.submit(task, *args).result()
+
+    def _on_done(self, future: Future, executor: ProcessPoolExecutor):
+        if future.cancelled() or future.exception() is None:
+            return
+        self.failed += 1
+        if isinstance(future.exception(), BrokenProcessPool):
+            self._restart(executor)
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is not broken:
+                return
+            logger.error(f"A '{self.family}' model worker died; restarting the pool")
+            self._executor = self._new_executor()
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Spawns the workers and waits until each has loaded its model."""
+        futures = [self.submit("ping") for _ in range(self.processes)]
+        pids = {future.result() for future in futures}
+        logger.info(
+            f"'{self.family}' model pool up: {len(pids)} process(es), "
+            f"{self.threads} thread(s) each, cores {self.cores or 'unpinned'}"
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "processes": self.processes,
+            "threads_per_process": self.threads,
+            "cores": self.cores,
+            "submitted": self.submitted,
+            "failed": self.failed,
+            "restarts": self.restarts,
+        }
+
+
+class ModelServerClient:
+    """Same submit()/call() interface as ModelWorkerPool, backed by a shared model server."""
+
+    def __init__(self, family: str, address: str):
+        if len(MODEL_WORKERS_AUTHKEY) < MIN_AUTHKEY_BYTES:
+            raise RuntimeError(f"MODEL_WORKERS_AUTHKEY must be set to a secret of at least {MIN_AUTHKEY_BYTES} bytes to use a model server")
+        self.family = family
+        host, port = address.rsplit(":", 1)
+        self._manager = ModelServerManager(address=(host, int(port)), authkey=MODEL_WORKERS_AUTHKEY)
+        self._manager.connect()
+        self._server = self._manager.model_server()
+        self._threads = ThreadPoolExecutor(MODEL_WORKERS_CLIENT_THREADS, thread_name_prefix=f"model-{family}")
+        # Worker processes behind the server, read in start(); proxies shard batches by it
+        self.processes = 1
+
+    def submit(self, task: str, *args) -> Future:
+        return self._threads.submit(self._server.call, self.family, task, args)
+
+    def call(self, task: str, *args):
+        return self._server.call(self.family, task, args)
+
+    def start(self):
+        self.call("ping")
+        self.processes = self._server.processes(self.family)
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {"server": MODEL_WORKERS_ADDRESS, "processes": self.processes}
+
+
+class ModelServer:
+    """Runs inside scripts/model_server.py; each client connection gets its own thread."""
+
+    def __init__(self, pools: Dict[str, ModelWorkerPool]):
+        self.pools = pools
+
+    def call(self, family: str, task: str, args: tuple):
+        return self.pools[family].call(task, *args)
+
+    def processes(self, family: str) -> int:
+        return self.pools[family].processes
+
+    def stats(self) -> dict:
+        return {family: pool.stats() for family, pool in self.pools.items()}
+
+
+class ModelServerManager(BaseManager):
+    pass
+
+
+# Clients only need the name; scripts/model_server.py registers it with the server object
+ModelServerManager.register("model_server")
+
+
+class RemoteTTSPipeline:
+    """
+    Yields (graphemes, phonemes, audio) like kokoro.KPipeline. Sentences are submitted
+    all at once, so a long answer is synthesized on several workers in parallel, and
+    yielded in order as they complete.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __call__(self, text: str, voice: str = "af_heart", speed: float = 1.0):
+        sentences = [s for s in SENTENCE_SPLIT_RE.split(text.strip()) if s.strip()] or [text]
+        futures = [self.pool.submit("tts", sentence, voice, speed) for sentence in sentences]
+        consumed = 0
+        try:
+            for sentence, future in zip(sentences, futures):
+                audio = import_array(future.result())
+                consumed += 1
+                yield sentence, None, audio
+        finally:
+            # The consumer stopped early (barge-in, disconnect): drop or free the rest
+            for future in futures[consumed:]:
+                if not future.cancel():
+                    future.add_done_callback(discard_block)
+
+
+class RemoteASRPipeline:
+    """
+    Accepts the same inputs as a transformers ASR pipeline and returns [{"text": ...}].
+    A batch is split into one shard per worker process, so the windows of a long
+    recording are decoded in parallel rather than on a single worker.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _submit(self, clips: List[np.ndarray], sampling_rate: int):
+        lengths = [len(clip) for clip in clips]
+        shm = _untracked(size=max(1, sum(lengths)) * 4)
+        flat = np.ndarray((sum(lengths),), dtype=np.float32, buffer=shm.buf)
+        offset = 0
+        for clip in clips:
+            flat[offset:offset + len(clip)] = clip
+            offset += len(clip)
+        del flat
+        try:
+            return shm, self.pool.submit("stt", shm.name, lengths, sampling_rate, len(clips))
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+    def __call__(self, inputs, batch_size: int = 1, **kwargs):
+        single = isinstance(inputs, dict)
+        items = [inputs] if single else list(inputs)
+        clips = [np.ascontiguousarray(item["raw"], dtype=np.float32) for item in items]
+
+        shards = max(1, min(len(clips), self.pool.processes))
+        size = -(-len(clips) // shards)
+        submitted = []
+        try:
+            for i in range(0, len(clips), size):
+                submitted.append(self._submit(clips[i:i + size], items[0]["sampling_rate"]))
+            texts = [text for _, future in submitted for text in future.result()]
+        finally:
+            # Workers may still be reading a block when another shard fails
+            wait([future for _, future in submitted])
+            for shm, _ in submitted:
+                shm.close()
+                shm.unlink()
+
+        outputs = [{"text": text} for text in texts]
+        return outputs[0] if single else outputs
+
+
+class RemoteIntentClassifier:
+    """Exposes IntentClassifier.predict_batch; texts and labels are small enough to pickle."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def predict_batch(self, texts: List[str]):
+        return self.pool.call("intent", list(texts))
+
+
+PROXIES = {
+    "tts": RemoteTTSPipeline,
+    "stt": RemoteASRPipeline,
+    "intent": RemoteIntentClassifier,
+}
+
+_pools: Dict[str, object] = {}
+
+
+def runs_in_worker(family: str) -> bool:
+    return family in MODEL_WORKERS
+
+
+def remote_loader(family: str):
+    """Registry loader that starts (or connects to) the family's pool and returns its proxy."""
+
+    def load():
+        if family not in _pools:
+            if MODEL_WORKERS_ADDRESS:
+                pool = ModelServerClient(family, MODEL_WORKERS_ADDRESS)
+            else:
+                pool = ModelWorkerPool(family, **pool_config(family))
+            try:
+                pool.start()
+            except Exception:
+                pool.shutdown()
+                raise
+            _pools[family] = pool
+        return PROXIES[family](_pools[family])
+
+    return load
+
+
+def worker_stats() -> dict:
+    return {family: pool.stats() for family, pool in _pools.items()}
+
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
@@ -0,0 +1,63 @@
+# backend/utils/request_context.py
+
+import uuid
+import logging
+from contextvars import ContextVar
+from utils.metrics import HTTP_IN_FLIGHT
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# "-" outside of a request (startup, background workers)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+def get_request_id() -> str:
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request ID to every record as %(request_id)s."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RequestContextMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware, so streaming responses are not buffered).
+
+    Reuses the caller's X-Request-ID or generates one, stores it in request_id_var for
+    log lines and outgoing Dify calls, echoes it on the response and counts in-flight
+    requests. run_in_threadpool copies the context, so sync handlers see the same ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            request_id_var.reset(token)
@@ -0,0 +1,266 @@
+# backend/utils/resilience.py
+
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("app.resilience")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The upstream is marked unhealthy; the call was not attempted."""
+
+
+class QueueTimeoutError(Exception):
+    """No concurrency slot became free within the queue-wait deadline."""
+
+
+class ConcurrencyLimiter:
+    """
+    Caps concurrent upstream calls. Callers wait at most `max_wait` seconds for a slot
+    and then get QueueTimeoutError, so a slow upstream cannot pile up unbounded work.
+    """
+
+    def __init__(self, max_concurrent: int, max_wait: float):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise QueueTimeoutError(f"no upstream slot free after {self.max_wait}s")
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_wait_seconds": self.max_wait,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. Then one trial call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, name: str = "upstream"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_failure: str | None = None
+
+    def allow(self):
+        """Raises CircuitOpenError unless a call may go out now."""
+        if self.state == CLOSED:
+            return
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError(f"circuit '{self.name}' is {self.state}")
+
+    def record_success(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            logger.info(f"Circuit '{self.name}' closed after a successful trial call")
+        self.state = CLOSED
+        self._trial_in_flight = False
+
+    def record_failure(self, error: Exception):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_failure = f"{type(error).__name__}: {error}"
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+                logger.error(
+                    f"Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failures; "
+                    f"failing fast for {self.reset_timeout}s. Last error: {self.last_failure}"
+                )
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """Frees the half-open trial when a call ended without a verdict (e.g. cancelled)."""
+        self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 2)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+            "retry_in_seconds": retry_in,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "last_failure": self.last_failure,
+        }
+
+
+class CallOutcome:
+    """Lets a guarded call report its result to the breaker before it finishes (e.g. a stream)."""
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.recorded = False
+
+    def succeeded(self):
+        if not self.recorded:
+            self.recorded = True
+            self.breaker.record_success()
+
+    def failed(self, error: Exception):
+        self.recorded = True
+        self.breaker.record_failure(error)
+
+
+class UpstreamGuard:
+    """
+    Wraps one upstream call: fail fast if the circuit is open, then wait for a
+    concurrency slot, then feed the outcome back to the breaker. `is_failure(e)` decides
+    which exceptions mean the upstream is unhealthy (others, e.g. a 4xx, count as healthy).
+
+        async with guard.call() as outcome:
+            response = await client.post(...)
+    """
+
+    def __init__(self, limiter: ConcurrencyLimiter, breaker: CircuitBreaker, is_failure):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.is_failure = is_failure
+
+    @asynccontextmanager
+    async def call(self):
+        self.breaker.allow()
+        outcome = CallOutcome(self.breaker)
+        try:
+            async with self.limiter.slot():
+                try:
+                    yield outcome
+                except Exception as e:
+                    if self.is_failure(e):
+                        outcome.failed(e)
+                    else:
+                        outcome.succeeded()
+                    raise
+                outcome.succeeded()
+        finally:
+            if not outcome.recorded:
+                self.breaker.release()
+
+    def stats(self) -> dict:
+        return {"breaker": self.breaker.stats(), "limiter": self.limiter.stats()}
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies, for picking a hedge delay."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if len(self._samples) < 20:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+async def retry_async(call, attempts: int, base_delay: float, max_delay: float, is_retryable, on_retry=None):
+    """
+    Awaits call() up to `attempts` times, sleeping a jittered backoff between tries.
+    Only exceptions for which is_retryable(e) is true are retried.
+    """
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt + 1 >= attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"Retrying upstream call in {delay:.2f}s after {type(e).__name__}: {e}")
+            if on_retry:
+                on_retry(e)
+            await asyncio.sleep(delay)
+
+
+async def hedged(call, delay: float, on_hedge=None):
+    """
+    Starts call(); if it has not finished after `delay` seconds, starts a second copy and
+    returns whichever succeeds first, cancelling the other. Only use for idempotent calls.
+    """
+    tasks = {asyncio.ensure_future(call())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            if on_hedge:
+                on_hedge()
+            tasks.add(asyncio.ensure_future(call()))
+
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
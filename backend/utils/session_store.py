@@ -0,0 +1,205 @@
+# backend/utils/session_store.py
+
+import json
+import time
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger("app.session_store")
+
+# Rough per-session overhead on top of the stored text, for the memory cap
+SESSION_OVERHEAD_BYTES = 512
+
+
+class Session:
+    """
+    One user's server-side state: the Dify conversation_id, the last `max_turns`
+    (question, answer) pairs and small metadata (last intent, answering stage, ...).
+    """
+
+    __slots__ = ("session_id", "conversation_id", "turns", "turn_count", "created_at", "last_seen", "metadata")
+
+    def __init__(self, session_id: str, max_turns: int):
+        self.session_id = session_id
+        self.conversation_id: str | None = None
+        self.turns: deque = deque(maxlen=max_turns)
+        self.turn_count = 0
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.metadata: dict = {}
+
+    def add_turn(self, question: str, answer: str):
+        self.turns.append((question, answer))
+        self.turn_count += 1
+
+    def size(self) -> int:
+        return SESSION_OVERHEAD_BYTES + sum(len(q) + len(a) for q, a in self.turns)
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "conversation_id": self.conversation_id,
+            "turns": [list(turn) for turn in self.turns],
+            "turn_count": self.turn_count,
+            "created_at": self.created_at,
+            "last_seen": self.last_seen,
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, max_turns: int) -> "Session":
+        session = cls(data["session_id"], max_turns)
+        session.conversation_id = data.get("conversation_id")
+        session.turns.extend(tuple(turn) for turn in data.get("turns", []))
+        session.turn_count = data.get("turn_count", len(session.turns))
+        session.created_at = data.get("created_at", session.created_at)
+        session.last_seen = data.get("last_seen", session.last_seen)
+        session.metadata = data.get("metadata", {})
+        return session
+
+
+class InMemorySessionStore:
+    """
+    Sessions in an OrderedDict kept in least-recently-used order, so lookups are O(1) and
+    eviction only ever looks at the front. A session expires after `ttl_seconds` without
+    activity; the least recently used sessions are dropped once there are more than
+    `max_sessions` or their estimated size exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_turns: int = 6, ttl_seconds: float = 1800, max_sessions: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    async def get(self, session_id: str) -> Session | None:
+        session = self._sessions.get(session_id)
+        if session is None:
+            self.misses += 1
+            return None
+        now = time.time()
+        if now - session.last_seen > self.ttl_seconds:
+            self._remove(session_id)
+            self.expired += 1
+            self.misses += 1
+            return None
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+        self.hits += 1
+        return session
+
+    async def record_turn(self, session_id: str, conversation_id: str | None, question: str, answer: str, metadata: dict | None = None) -> Session:
+        session = await self.get(session_id)
+        if session is None:
+            session = Session(session_id, self.max_turns)
+            self._sessions[session_id] = session
+        session.conversation_id = conversation_id or session.conversation_id
+        session.add_turn(question, answer)
+        session.metadata.update(metadata or {})
+        session.last_seen = time.time()
+
+        size = session.size()
+        self._bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+        self._evict()
+        return session
+
+    async def delete(self, session_id: str):
+        self._remove(session_id)
+
+    def _remove(self, session_id: str):
+        if self._sessions.pop(session_id, None) is not None:
+            self._bytes -= self._sizes.pop(session_id, 0)
+
+    def _evict(self):
+        now = time.time()
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_seen > self.ttl_seconds:
+                self.expired += 1
+            elif len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes:
+                self.evicted += 1
+            else:
+                break
+            self._remove(session_id)
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "max_turns": self.max_turns,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class RedisSessionStore:
+    """
+    Sessions as one JSON value per key in Redis (see the redis service in compose.yaml),
+    so every worker and node sees the same state. Reads refresh the key's TTL (GETEX),
+    which makes it an idle timeout; the memory cap is Redis' own maxmemory policy.
+    """
+
+    def __init__(self, host: str, port: int, max_turns: int = 6, ttl_seconds: float = 1800, prefix: str = "session:", db: int = 0, password: str | None = None):
+        import redis.asyncio as redis
+
+        self.max_turns = max_turns
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        self._redis = redis.Redis(host=host, port=port, db=db, password=password, decode_responses=True)
+
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    async def get(self, session_id: str) -> Session | None:
+        raw = await self._redis.getex(self._key(session_id), ex=self.ttl_seconds)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Session.from_dict(json.loads(raw), self.max_turns)
+
+    async def record_turn(self, session_id: str, conversation_id: str | None, question: str, answer: str, metadata: dict | None = None) -> Session:
+        session = await self.get(session_id) or Session(session_id, self.max_turns)
+        session.conversation_id = conversation_id or session.conversation_id
+        session.add_turn(question, answer)
+        session.metadata.update(metadata or {})
+        session.last_seen = time.time()
+        await self._redis.set(self._key(session_id), json.dumps(session.to_dict(), ensure_ascii=False), ex=self.ttl_seconds)
+        return session
+
+    async def delete(self, session_id: str):
+        await self._redis.delete(self._key(session_id))
+
+    async def close(self):
+        await self._redis.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "max_turns": self.max_turns,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,174 @@
+# backend/utils/stt_service.py
+
+import io
+import logging
+import subprocess
+import numpy as np
+import soundfile as sf
+from utils.micro_batcher import MicroBatcher
+from utils.metrics import IN_FLIGHT, STT_BATCH_SECONDS, STT_AUDIO_SPEED, STT_BATCH_SIZE, Timer
+
+logger = logging.getLogger("app.stt_service")
+
+SAMPLE_RATE = 16000
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class AudioDecodeError(ValueError):
+    """The uploaded bytes could not be decoded as audio."""
+
+
+def _decode_with_ffmpeg(data: bytes) -> np.ndarray:
+    # Pipes in and out, so compressed uploads (webm/opus, mp3, m4a) never touch disk
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            input=data,
+            capture_output=True,
+            check=True,
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError("ffmpeg is required to decode this audio format")
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(f"ffmpeg could not decode audio: {e.stderr.decode(errors='ignore')[:200]}")
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def _resample(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    if sample_rate == SAMPLE_RATE:
+        return audio
+    duration = len(audio) / sample_rate
+    target = np.linspace(0, duration, int(duration * SAMPLE_RATE), endpoint=False)
+    source = np.arange(len(audio)) / sample_rate
+    return np.interp(target, source, audio).astype(np.float32)
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """
+    Decodes an uploaded file in memory to mono float32 at 16 kHz.
+    WAV/FLAC/OGG are read with soundfile; anything else goes through an ffmpeg pipe.
+    """
+    if not data:
+        raise AudioDecodeError("empty audio upload")
+    try:
+        audio, sample_rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except Exception:
+        return _decode_with_ffmpeg(data)
+
+    audio = audio.mean(axis=1)
+    if sample_rate != SAMPLE_RATE:
+        try:
+            return _decode_with_ffmpeg(data)
+        except AudioDecodeError:
+            return _resample(audio, sample_rate)
+    return audio
+
+
+async def read_upload(file, max_bytes: int) -> bytes:
+    """Reads an UploadFile in chunks, refusing uploads larger than `max_bytes`."""
+    buffer = bytearray()
+    while True:
+        chunk = await file.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise ValueError(f"upload exceeds {max_bytes} bytes")
+    return bytes(buffer)
+
+
+def build_pipeline(model_name: str, device: str = "cpu", chunk_length_s: float = 30.0):
+    from transformers import pipeline
+
+    logger.info(f"Loading speech-to-text model: {model_name} on {device}")
+    return pipeline(
+        "automatic-speech-recognition",
+        model=model_name,
+        device=device,
+        chunk_length_s=chunk_length_s,
+    )
+
+
+class TranscriptionService:
+    """
+    Serves transcriptions from one shared Whisper pipeline through bounded queues.
+    `model_provider` returns the pipeline (see build_pipeline) and is called per batch,
+    so the model can be loaded lazily or ahead of time by the caller.
+
+    Clips up to `batch_max_seconds` long are batched together (up to `batch_size` per
+    forward pass); longer clips are queued separately and run one at a time with
+    chunked long-form decoding. Background work (long-audio jobs) has a queue of its
+    own with batches of at most `background_batch_size` and a single worker, so it
+    never holds a slot an interactive clip is waiting for. Each queue accepts at most
+    `max_pending` clips, after which transcribe() raises BatcherFullError so the API can
+    shed load.
+    """
+
+    def __init__(
+        self,
+        model_provider,
+        batch_size: int = 8,
+        batch_wait_ms: float = 20.0,
+        batch_max_seconds: float = 30.0,
+        max_pending: int = 32,
+        num_workers: int = 1,
+        background_batch_size: int = 4,
+    ):
+        self.model_provider = model_provider
+        self.batch_max_seconds = batch_max_seconds
+
+        self.short_clips = MicroBatcher(
+            self.transcribe_batch,
+            max_batch_size=batch_size,
+            max_wait_ms=batch_wait_ms,
+            max_pending=max_pending,
+            num_workers=num_workers,
+            name="stt-short",
+        )
+        self.long_clips = MicroBatcher(
+            self.transcribe_batch,
+            max_batch_size=1,
+            max_wait_ms=0,
+            max_pending=max_pending,
+            num_workers=num_workers,
+            name="stt-long",
+        )
+        self.background = MicroBatcher(
+            self.transcribe_batch,
+            max_batch_size=background_batch_size,
+            max_wait_ms=batch_wait_ms,
+            max_pending=max_pending,
+            num_workers=1,
+            name="stt-background",
+        )
+
+    def transcribe_batch(self, clips: list) -> list:
+        pipe = self.model_provider()
+        inputs = [{"raw": clip, "sampling_rate": SAMPLE_RATE} for clip in clips]
+        with IN_FLIGHT.labels("stt").track_inprogress(), Timer() as timer:
+            outputs = pipe(inputs, batch_size=len(inputs))
+
+        audio_seconds = sum(len(clip) for clip in clips) / SAMPLE_RATE
+        STT_BATCH_SECONDS.observe(timer.seconds)
+        STT_BATCH_SIZE.observe(len(clips))
+        if timer.seconds > 0:
+            STT_AUDIO_SPEED.observe(audio_seconds / timer.seconds)
+        return [output["text"].strip() for output in outputs]
+
+    async def transcribe(self, audio: np.ndarray, background: bool = False) -> str:
+        if background:
+            return await self.background.submit(audio)
+        duration = len(audio) / SAMPLE_RATE
+        batcher = self.short_clips if duration <= self.batch_max_seconds else self.long_clips
+        return await batcher.submit(audio)
+
+    def pending(self) -> int:
+        """Interactive clips waiting for a worker (background work is not counted)."""
+        return self.short_clips.pending() + self.long_clips.pending()
+
+    def stats(self) -> dict:
+        return {
+            "short_clips": self.short_clips.stats(),
+            "long_clips": self.long_clips.stats(),
+            "background": self.background.stats(),
+        }
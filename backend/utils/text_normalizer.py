@@ -0,0 +1,387 @@
+# backend/utils/text_normalizer.py
+"""
+Turns LLM output into text a TTS model can read, and cuts it into chunks.
+
+normalize_for_speech() strips what should not be spoken (markdown, code fences and
+JSON leftovers, links, emoji) and spells out what Kokoro reads badly (ranges such as
+"20-40 giây", units, percentages, prices and, for Vietnamese, numbers, dates, times and
+phone numbers). chunk_text() splits the
+result at sentence and clause boundaries into chunks of similar length that can be
+synthesized in parallel and concatenated in order. canonical_key() is the
+case- and punctuation-insensitive form used for cache keys.
+
+All patterns are compiled once at import.
+"""
+import re
+import json
+import math
+import unicodedata
+from typing import List
+
+# --- patterns ------------------------------------------------------------------------
+
+FENCE_RE = re.compile(r"```[\w+-]*")
+INLINE_CODE_RE = re.compile(r"`([^`]*)`")
+HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s*", re.MULTILINE)
+BULLET_RE = re.compile(r"^\s*[-*+•]\s+", re.MULTILINE)
+NUMBERED_RE = re.compile(r"^\s*(\d{1,2})[.)]\s+", re.MULTILINE)
+BOLD_RE = re.compile(r"(\*\*|__)(.+?)\1")
+ITALIC_RE = re.compile(r"(?<![\w*])\*(?!\s)([^*\n]+?)\*(?![\w*])|(?<![\w_])_(?!\s)([^_\n]+?)_(?![\w_])")
+LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+URL_RE = re.compile(r"(?:https?://|www\.)\S+?(?=[.,!?;:)]*(?:\s|$))")
+HTML_TAG_RE = re.compile(r"</?[a-zA-Z][^>]*>")
+TABLE_RULE_RE = re.compile(r"^\s*\|?\s*:?-{3,}.*$", re.MULTILINE)
+EMOJI_RE = re.compile(
+    "["
+    "\U0001F000-\U0001FAFF"  # pictographs, emoticons, transport, supplemental symbols
+    "\U00002600-\U000027BF"  # misc symbols and dingbats
+    "\U00002B00-\U00002BFF"  # arrows and stars (⭐)
+    "\U0000FE0F\U0000200D"   # variation selector, zero-width joiner
+    "]+"
+)
+ELLIPSIS_RE = re.compile(r"\.{3,}")
+REPEATED_PUNCT_RE = re.compile(r"([!?.,;:])\1+")
+SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([,.!?;:…])")
+WHITESPACE_RE = re.compile(r"\s+")
+PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+LINE_END_RE = re.compile(r"[.!?…:;,]$")
+
+# "20-40", "1.000 - 2.000": two numbers only, at most a space either side of the dash. The
+# lookarounds keep phone numbers (0912-345-678) and dates (12-5-2024) out.
+RANGE_RE = re.compile(
+    r"(?<![\d.,/:-])(\d{1,3}(?:\.\d{3})+|\d+(?:[.,]\d+)?) ?[-–—] ?(\d{1,3}(?:\.\d{3})+|\d+(?:[.,]\d+)?)(?![.,]?\d| ?[-–—/:] ?\d)"
+)
+# 12/5/2024, 12-5-2024, 12.5.2024 (day first); "ngày 12/5" without a year
+DATE_RE = re.compile(r"(?:\b(ngày) )?(?<![\d.,/:-])(\d{1,2})([/.-])(\d{1,2})\3(\d{4})(?![\d/.-]\d)", re.IGNORECASE)
+FRACTION_RE = re.compile(r"(?<![\d/])(\d+)/(\d+)(?![\d/])")
+SHORT_DATE_RE = re.compile(r"\b(ngày) (\d{1,2})/(\d{1,2})(?![\d/])", re.IGNORECASE)
+# 8:30, 08:30, 8h30, 8h
+TIME_RE = re.compile(r"(?<![\d:])([01]?\d|2[0-3])(?::|h)([0-5]\d)(?![\d:])|(?<![\d:])([01]?\d|2[0-3])h\b")
+# Phone numbers written in groups: 0912-345-678, 0912 345 678, 028.3822.1234
+PHONE_RE = re.compile(r"(?<![\d.,])0\d{2,3}(?:[-. ]\d{3,4}){2}(?![\d])")
+CURRENCY_RE = re.compile(r"(\d)\s*(vnđ|vnd|đồng|đ|₫|k)(?!\w)", re.IGNORECASE)
+PERCENT_RE = re.compile(r"(\d)\s*%")
+DEGREE_RE = re.compile(r"(\d)\s*°\s*([CF])\b")
+UNIT_RE = re.compile(r"(\d)\s*(ml|mg|kg|g|cm|mm|m|l|h|p|s)\b", re.IGNORECASE)
+# 1.000.000 (Vietnamese thousands separators), 1,5 or 1.5 (decimals), plain integers
+NUMBER_RE = re.compile(r"\d{1,3}(?:\.\d{3})+(?![\d.])|\d+[.,]\d+|\d+")
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?…;])\s+|\n+")
+CLAUSE_END_RE = re.compile(r"(?<=[,:])\s+")
+ABBREVIATIONS = {"v.v.", "tp.", "ts.", "ths.", "bs.", "gs.", "pgs.", "mr.", "mrs.", "ms.", "dr.", "e.g.", "i.e.", "etc.", "vs.", "no."}
+
+UNITS = {
+    "vi": {"ml": "mi li lít", "mg": "mi li gam", "kg": "ki lô gam", "g": "gam", "cm": "xen ti mét",
+           "mm": "mi li mét", "m": "mét", "l": "lít", "h": "giờ", "p": "phút", "s": "giây"},
+    "en": {"ml": "milliliters", "mg": "milligrams", "kg": "kilograms", "g": "grams", "cm": "centimeters",
+           "mm": "millimeters", "m": "meters", "l": "liters", "h": "hours", "p": "minutes", "s": "seconds"},
+}
+WORDS = {
+    "vi": {"to": "đến", "percent": "phần trăm", "degree": "độ", "dong": "đồng", "thousand": "nghìn"},
+    "en": {"to": "to", "percent": "percent", "degree": "degrees", "dong": "dong", "thousand": "thousand"},
+}
+
+# Letters English text does not use, for lang="auto" (àáè... are shared with French, but
+# the choice here is only between Vietnamese and English)
+VI_LETTERS_RE = re.compile(r"[ăâđêôơưàáãèéìíòóõùúýạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịĩọỏốồổỗộớờởỡợụủũứừửữựỳỵỷỹ]", re.IGNORECASE)
+
+VI_DIGITS = ["không", "một", "hai", "ba", "bốn", "năm", "sáu", "bảy", "tám", "chín"]
+VI_SCALES = ["", "nghìn", "triệu", "tỷ"]
+
+
+# --- numbers -------------------------------------------------------------------------
+
+def _vi_triple(n: int, full: bool) -> List[str]:
+    """Reads 0..999; `full` also reads a zero hundreds digit ("không trăm linh năm")."""
+    hundreds, tens, units = n // 100, n // 10 % 10, n % 10
+    words = []
+    if full or hundreds:
+        words += [VI_DIGITS[hundreds], "trăm"]
+    if tens == 0:
+        if units and words:
+            words.append("linh")
+    elif tens == 1:
+        words.append("mười")
+    else:
+        words += [VI_DIGITS[tens], "mươi"]
+    if units:
+        if units == 1 and tens > 1:
+            words.append("mốt")
+        elif units == 5 and tens > 0:
+            words.append("lăm")
+        elif units == 4 and tens > 1:
+            words.append("tư")
+        else:
+            words.append(VI_DIGITS[units])
+    return words
+
+
+def vi_number(n: int) -> str:
+    """Vietnamese words for a non-negative integer below 10^12."""
+    if n == 0:
+        return VI_DIGITS[0]
+    groups = []
+    while n:
+        groups.append(n % 1000)
+        n //= 1000
+    words = []
+    for scale in range(len(groups) - 1, -1, -1):
+        value = groups[scale]
+        if value == 0:
+            continue
+        words += _vi_triple(value, full=bool(words))
+        if VI_SCALES[scale]:
+            words.append(VI_SCALES[scale])
+    return " ".join(words)
+
+
+def _vi_digits(digits: str) -> str:
+    return " ".join(VI_DIGITS[int(d)] for d in digits)
+
+
+def _vi_integer(digits: str) -> str:
+    # Beyond vi_number's range (13+ digits), read digit by digit
+    return _vi_digits(digits) if len(digits.lstrip("0")) > 12 else vi_number(int(digits))
+
+
+def _vi_number_token(match: re.Match) -> str:
+    token = match.group(0)
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+", token):
+        return _vi_integer(token.replace(".", ""))
+    if "," in token or "." in token:
+        whole, fraction = re.split(r"[.,]", token, maxsplit=1)
+        spoken = _vi_digits(fraction) if fraction.startswith("0") else _vi_integer(fraction)
+        return f"{_vi_integer(whole)} phẩy {spoken}"
+    # Long digit runs are codes or phone numbers, read digit by digit
+    if len(token) > 12 or (len(token) > 1 and token.startswith("0")):
+        return _vi_digits(token)
+    return vi_number(int(token))
+
+
+def _vi_date(match: re.Match) -> str:
+    day, month, year = int(match.group(2)), int(match.group(4)), match.group(5)
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        return match.group(0)
+    return f"{match.group(1) or 'ngày'} {day} tháng {month} năm {year}"
+
+
+def _vi_short_date(match: re.Match) -> str:
+    day, month = int(match.group(2)), int(match.group(3))
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        return match.group(0)
+    return f"{match.group(1)} {day} tháng {month}"
+
+
+def _vi_time(match: re.Match) -> str:
+    if match.group(3) is not None:
+        return f"{int(match.group(3))} giờ"
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    return f"{hours} giờ {minutes} phút" if minutes else f"{hours} giờ"
+
+
+def _vi_phone(match: re.Match) -> str:
+    # Grouped the way it was written, digit by digit, with a pause between groups
+    return ", ".join(_vi_digits(group) for group in re.split(r"[-. ]", match.group(0)))
+
+
+def _currency(match: re.Match, words: dict) -> str:
+    if match.group(2).lower() == "k":
+        return f"{match.group(1)} {words['thousand']}"
+    return f"{match.group(1)} {words['dong']}"
+
+
+# --- normalization -------------------------------------------------------------------
+
+def _unwrap_json(text: str) -> str:
+    """Dify answers that escaped handle_chat's cleaning still carry {"response": ...}."""
+    stripped = FENCE_RE.sub("", text).strip()
+    if not stripped.startswith("{"):
+        return text
+    try:
+        parsed = json.loads(stripped)
+    except ValueError:
+        return text
+    response = parsed.get("response") if isinstance(parsed, dict) else None
+    if isinstance(response, list):
+        return "\n".join(str(item) for item in response)
+    return response if isinstance(response, str) else text
+
+
+def strip_markup(text: str) -> str:
+    """Removes markdown, code fences, HTML tags, links and emoji, keeping line breaks."""
+    text = _unwrap_json(unicodedata.normalize("NFC", text))
+    text = FENCE_RE.sub("", text)
+    text = INLINE_CODE_RE.sub(r"\1", text)
+    text = LINK_RE.sub(r"\1", text)
+    text = URL_RE.sub("", text)
+    text = HTML_TAG_RE.sub("", text)
+    text = TABLE_RULE_RE.sub("", text)
+    text = HEADING_RE.sub("", text)
+    text = BULLET_RE.sub("", text)
+    text = NUMBERED_RE.sub(r"\1, ", text)
+    text = BOLD_RE.sub(r"\2", text)
+    text = ITALIC_RE.sub(lambda m: m.group(1) or m.group(2), text)
+    text = text.replace("|", ", ")
+    return EMOJI_RE.sub("", text)
+
+
+def detect_lang(text: str) -> str:
+    return "vi" if VI_LETTERS_RE.search(text) else "en"
+
+
+def normalize_for_speech(text: str, lang: str = "auto") -> str:
+    """
+    Speakable form of `text` on one line. Each input line ends with punctuation so
+    list items and headings keep their pause. `lang` ("vi", "en" or "auto") picks the
+    words for ranges, units, percentages and prices; numbers, dates, times and phone
+    numbers are spelled out for Vietnamese only, since Kokoro's English G2P already
+    reads digits.
+    """
+    if lang == "auto":
+        lang = detect_lang(text)
+    words = WORDS.get(lang, WORDS["en"])
+    units = UNITS.get(lang, UNITS["en"])
+
+    lines = []
+    for line in strip_markup(text).splitlines():
+        line = WHITESPACE_RE.sub(" ", line).strip(" ,")
+        if not line:
+            continue
+        lines.append(line if LINE_END_RE.search(line) else line + ".")
+    text = " ".join(lines)
+
+    text = ELLIPSIS_RE.sub("…", text)
+    if lang == "vi":
+        # Before ranges and numbers, which would otherwise take these apart
+        text = PHONE_RE.sub(_vi_phone, text)
+        text = DATE_RE.sub(_vi_date, text)
+        text = SHORT_DATE_RE.sub(_vi_short_date, text)
+        text = TIME_RE.sub(_vi_time, text)
+        text = FRACTION_RE.sub(r"\1 phần \2", text)
+    text = RANGE_RE.sub(rf"\1 {words['to']} \2", text)
+    text = CURRENCY_RE.sub(lambda m: _currency(m, words), text)
+    text = PERCENT_RE.sub(rf"\1 {words['percent']}", text)
+    text = DEGREE_RE.sub(rf"\1 {words['degree']} \2", text)
+    text = UNIT_RE.sub(lambda m: f"{m.group(1)} {units[m.group(2).lower()]}", text)
+    if lang == "vi":
+        text = NUMBER_RE.sub(_vi_number_token, text)
+
+    text = REPEATED_PUNCT_RE.sub(r"\1", text)
+    text = SPACE_BEFORE_PUNCT_RE.sub(r"\1", text)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def canonical_key(text: str, lang: str = "auto") -> str:
+    """Lower-cased, punctuation-free speech form; equal for texts that read the same."""
+    text = normalize_for_speech(text, lang).lower()
+    return WHITESPACE_RE.sub(" ", PUNCT_RE.sub(" ", text)).strip()
+
+
+# --- segmentation --------------------------------------------------------------------
+
+def _ends_with_abbreviation(piece: str) -> bool:
+    last = piece.rsplit(" ", 1)[-1].lower()
+    return last in ABBREVIATIONS
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of `text`; a break after an abbreviation such as "v.v." is not a sentence end."""
+    sentences: List[str] = []
+    for piece in SENTENCE_END_RE.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if sentences and _ends_with_abbreviation(sentences[-1]):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Cuts a sentence longer than max_chars at commas/colons, then at spaces."""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces: List[str] = []
+    for clause in CLAUSE_END_RE.split(sentence):
+        while len(clause) > max_chars:
+            cut = clause.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if pieces and len(pieces[-1]) + 1 + len(clause) <= max_chars:
+            pieces[-1] = f"{pieces[-1]} {clause}"
+        elif clause:
+            pieces.append(clause)
+    return pieces
+
+
+def _pack(pieces: List[str], goal: float, max_chars: int) -> List[str]:
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if not current:
+            current = piece
+            continue
+        joined = len(current) + 1 + len(piece)
+        # Close the chunk when adding the piece lands further from the goal than stopping
+        if joined > max_chars or abs(joined - goal) > abs(len(current) - goal):
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}"
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_text(text: str, target_chars: int = 180, max_chars: int = 300, first_chars: int | None = None) -> List[str]:
+    """
+    Splits normalized text into chunks of roughly equal length near `target_chars`,
+    never above `max_chars`, breaking only between sentences (or clauses of an overlong
+    sentence). With `first_chars`, the first chunk is kept short so streamed audio
+    starts sooner. The same text always yields the same chunks.
+    """
+    pieces: List[str] = []
+    for sentence in split_sentences(text):
+        pieces.extend(_split_long(sentence, max_chars))
+    if not pieces:
+        return []
+
+    chunks: List[str] = []
+    if first_chars and len(pieces) > 1:
+        head, pieces = pieces[0], pieces[1:]
+        while pieces and len(head) + 1 + len(pieces[0]) <= first_chars:
+            head = f"{head} {pieces.pop(0)}"
+        chunks.append(head)
+        if not pieces:
+            return chunks
+
+    total = sum(len(piece) for piece in pieces) + len(pieces) - 1
+    count = max(1, math.ceil(total / target_chars))
+    return chunks + _pack(pieces, total / count, max_chars)
+
+
+class SentenceSplitter:
+    """Buffers streamed text and releases it one complete sentence at a time."""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        parts = SENTENCE_END_RE.split(self._buffer)
+        last = parts.pop()
+        sentences, pending = [], ""
+        for part in parts:
+            part = f"{pending} {part.strip()}".strip()
+            # A break after an abbreviation is not a sentence end; carry it forward
+            pending = part if _ends_with_abbreviation(part) else ""
+            if part and not pending:
+                sentences.append(part)
+        self._buffer = f"{pending} {last}" if pending else last
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
@@ -0,0 +1,184 @@
+# backend/utils/transcription_jobs.py
+
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import List
+
+logger = logging.getLogger("app.transcription_jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobStoreFullError(Exception):
+    """Raised by create() when no more jobs can be accepted."""
+
+
+class TranscriptionJob:
+    """
+    State of one long-audio transcription: its windows, the text of each finished
+    window and the overall status. Every change bumps `version` and wakes watch(),
+    which is what the progress stream follows.
+    """
+
+    def __init__(self, job_id: str, duration_s: float, windows: List[tuple], sample_rate: int):
+        self.job_id = job_id
+        self.status = QUEUED
+        self.duration_s = duration_s
+        self.windows = [(start / sample_rate, end / sample_rate) for start, end, _ in windows]
+        self.texts: List[str | None] = [None] * len(windows)
+        self.completed = 0
+        self.text = ""
+        self.partial_text = ""
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def touch(self):
+        self.version += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def watch(self, version: int, timeout: float):
+        """Waits until the job changes past `version` or `timeout` seconds pass."""
+        if self.version != version or self.finished:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def progress(self) -> dict:
+        total = len(self.windows)
+        done_seconds = sum(end - start for (start, end), text in zip(self.windows, self.texts) if text is not None)
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        fraction = self.completed / total if total else 1.0
+        eta = elapsed * (1 - fraction) / fraction if 0 < fraction < 1 else None
+        return {
+            "windows_done": self.completed,
+            "windows_total": total,
+            "fraction": round(fraction, 3),
+            "audio_seconds_done": round(min(done_seconds, self.duration_s), 2),
+            "elapsed_seconds": round(elapsed, 2),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+
+    def to_dict(self, include_windows: bool = False) -> dict:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "duration_seconds": round(self.duration_s, 2),
+            "progress": self.progress(),
+            "partial_text": self.partial_text,
+            "text": self.text if self.status == DONE else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if include_windows:
+            data["windows"] = [
+                {"start": round(start, 2), "end": round(end, 2), "text": text}
+                for (start, end), text in zip(self.windows, self.texts)
+            ]
+        return data
+
+
+class TranscriptionJobStore:
+    """
+    Jobs in insertion order. Finished jobs (done, failed or cancelled) are kept
+    `ttl_seconds` for polling, then dropped; beyond `max_jobs` the oldest finished jobs go first. At most `max_active`
+    jobs are queued or running at once, and create() raises JobStoreFullError rather
+    than evict a job that is still in progress.
+    """
+
+    def __init__(self, max_jobs: int = 100, max_active: int = 2, ttl_seconds: float = 3600):
+        self.max_jobs = max_jobs
+        self.max_active = max_active
+        self.ttl_seconds = ttl_seconds
+        self._jobs: "OrderedDict[str, TranscriptionJob]" = OrderedDict()
+
+        self.created = 0
+        self.rejected = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def active(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def create(self, duration_s: float, windows: List[tuple], sample_rate: int) -> TranscriptionJob:
+        self.cleanup()
+        if self.active() >= self.max_active:
+            self.rejected += 1
+            raise JobStoreFullError(f"{self.max_active} transcription jobs already in progress")
+        # Make room by dropping the oldest finished jobs
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs + 1)]:
+            del self._jobs[job_id]
+            self.evicted += 1
+        if len(self._jobs) >= self.max_jobs:
+            self.rejected += 1
+            raise JobStoreFullError(f"job store is full ({self.max_jobs} jobs)")
+
+        job = TranscriptionJob(uuid.uuid4().hex, duration_s, windows, sample_rate)
+        self._jobs[job.job_id] = job
+        self.created += 1
+        return job
+
+    def get(self, job_id: str) -> TranscriptionJob | None:
+        self.cleanup()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> TranscriptionJob | None:
+        """
+        Stops a job that is still in progress. The job stays in the store as "cancelled"
+        until the TTL sweep, so clients polling it see why it stopped.
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.task and not job.task.done():
+            job.task.cancel()
+        job.status = CANCELLED
+        job.finished_at = time.time()
+        job.touch()
+        return job
+
+    def cleanup(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and now - job.finished_at > self.ttl_seconds:
+                del self._jobs[job_id]
+                self.expired += 1
+
+    def shutdown(self):
+        for job in self._jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "jobs": len(self._jobs),
+            "active": self.active(),
+            "max_jobs": self.max_jobs,
+            "max_active": self.max_active,
+            "ttl_seconds": self.ttl_seconds,
+            "created": self.created,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,117 @@
+# backend/utils/vad.py
+
+from collections import deque
+import numpy as np
+
+
+class EnergyVAD:
+    """
+    Frame-energy voice activity detector for 16-bit mono PCM.
+
+    Speech starts after `start_frames` consecutive frames above the threshold and ends
+    after `end_silence_ms` of frames below it. The threshold follows the background
+    noise floor (`margin_db` above it, never below `min_db`), so it adapts to quiet and
+    noisy microphones alike. `preroll_ms` of audio before the detected start is kept so
+    the first syllable is not clipped.
+
+    feed() accepts chunks of any size, even ones that split a sample, and returns a list of events:
+      ("start", None)        speech began
+      ("end", np.ndarray)    speech ended; float32 samples of the whole utterance
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        start_frames: int = 3,
+        end_silence_ms: int = 700,
+        preroll_ms: int = 300,
+        margin_db: float = 12.0,
+        min_db: float = -50.0,
+        max_utterance_s: float = 30.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.start_frames = start_frames
+        self.end_frames = max(1, end_silence_ms // frame_ms)
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.max_utterance_frames = int(max_utterance_s * 1000 / frame_ms)
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        # Odd trailing byte of the last chunk, completed by the next one
+        self._odd_byte = b""
+        self._preroll = deque(maxlen=max(1, preroll_ms // frame_ms))
+        self._noise_db = min_db - margin_db
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._utterance: list = []
+        self.speaking = False
+
+    @property
+    def threshold_db(self) -> float:
+        return max(self.min_db, self._noise_db + self.margin_db)
+
+    def utterance(self) -> np.ndarray:
+        """Audio of the utterance in progress (empty when not speaking)."""
+        if not self._utterance:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self._utterance)
+
+    def _frame_db(self, frame: np.ndarray) -> float:
+        rms = np.sqrt(np.mean(frame * frame)) + 1e-10
+        return 20.0 * np.log10(rms)
+
+    def feed(self, pcm16: bytes) -> list:
+        pcm16 = self._odd_byte + pcm16
+        usable = len(pcm16) & ~1
+        self._odd_byte = pcm16[usable:]
+        samples = np.frombuffer(pcm16[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        self._pending = np.concatenate([self._pending, samples])
+
+        events = []
+        n_frames = len(self._pending) // self.frame_samples
+        for i in range(n_frames):
+            frame = self._pending[i * self.frame_samples:(i + 1) * self.frame_samples]
+            event = self._process(frame)
+            if event:
+                events.append(event)
+        self._pending = self._pending[n_frames * self.frame_samples:]
+        return events
+
+    def _process(self, frame: np.ndarray):
+        db = self._frame_db(frame)
+        voiced = db > self.threshold_db
+
+        if not self.speaking:
+            self._preroll.append(frame)
+            if voiced:
+                self._voiced_run += 1
+            else:
+                self._voiced_run = 0
+                # Track the noise floor only while nobody is talking
+                self._noise_db = 0.95 * self._noise_db + 0.05 * db
+            if self._voiced_run >= self.start_frames:
+                self.speaking = True
+                self._silent_run = 0
+                self._utterance = list(self._preroll)
+                self._preroll.clear()
+                return ("start", None)
+            return None
+
+        self._utterance.append(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self.end_frames or len(self._utterance) >= self.max_utterance_frames:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Ends the current utterance (e.g. on an explicit end-of-speech message)."""
+        if not self.speaking:
+            return None
+        audio = self.utterance()
+        self.speaking = False
+        self._utterance = []
+        self._voiced_run = 0
+        self._silent_run = 0
+        return ("end", audio)
@@ -148,6 +148,16 @@ export const recordVoiceUntilSilence = async ({
   }
 }
 
+// One session per browser, so the backend keeps each user's conversation apart
+const getSessionId = () => {
+  let sessionId = localStorage.getItem("session_id")
+  if (!sessionId) {
+    sessionId = crypto.randomUUID()
+    localStorage.setItem("session_id", sessionId)
+  }
+  return sessionId
+}
+
 export default function ChatInterface() {
   const [messages, setMessages] = useState([])
   const [inputText, setInputText] = useState("")
@@ -410,7 +420,7 @@ export default function ChatInterface() {
         },
         body: JSON.stringify({
           question: text,
-          session_id: "c9eddb5c-020b-55d3-90cf-9a3c66b03dc1",
+          session_id: getSessionId(),
           timestamp: new Date().toISOString(),
         }),
         credentials: 'include'
@@ -464,7 +474,7 @@ export default function ChatInterface() {
         },
         body: JSON.stringify({
           question: text,
-          session_id: "c9eddb5c-020b-55d3-90cf-9a3c66b03dc1",
+          session_id: getSessionId(),
           timestamp: new Date().toISOString(),
         }),
         credentials: 'include'